@@ -0,0 +1,36 @@
+# agrotiquiza/estaticos.py
+"""
+WhiteNoise para WSGI y ASGI.
+
+WhiteNoiseMiddleware solo sabe ser síncrono: bajo ASGI Django tendría
+que pasar cada petición (no solo las de estáticos) a un hilo y de vuelta
+al event loop. Esta versión busca el archivo en memoria dentro del loop y
+solo usa un hilo para servir un estático; el resto sigue async.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class WhiteNoiseAsincronoMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
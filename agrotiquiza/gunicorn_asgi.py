@@ -0,0 +1,38 @@
+# agrotiquiza/gunicorn_asgi.py
+"""
+Perfil ASGI: gunicorn administra workers de uvicorn.
+
+    gunicorn agrotiquiza.asgi:application -c agrotiquiza/gunicorn_asgi.py
+
+Las búsquedas por arete son async y, mientras esperan a la base o a la
+caché, el worker atiende otras peticiones. Las demás vistas siguen
+siendo síncronas y bajo ASGI corren en un hilo, con algo de costo extra:
+este perfil conviene cuando la base está en otra máquina.
+Las descargas se envían por bloques (agrotiquiza.streaming).
+
+Los aretes y las fichas de animal se guardan en la caché "compartida"
+(Redis con REDIS_URL, disco local sin él) para que una invalidación
+llegue a todos los workers. Con DEBUG esa caché es la memoria de cada
+proceso; si además hay más de un worker, al arrancar se avisa.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = 5
+
+
+def on_starting(server):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "agrotiquiza.settings")
+    from django.conf import settings
+
+    backend = settings.CACHES["compartida"]["BACKEND"]
+    if server.cfg.workers > 1 and backend.endswith("LocMemCache"):
+        server.log.warning(
+            "La caché 'compartida' es memoria de cada proceso (%s) y hay %s workers: "
+            "un worker puede servir aretes o fichas viejos después de una escritura. "
+            "Configure REDIS_URL o DEBUG=False, o use un solo worker.",
+            backend, server.cfg.workers,
+        )
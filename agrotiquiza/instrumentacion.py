@@ -0,0 +1,252 @@
+# agrotiquiza/instrumentacion.py
+"""
+Instrumentación de SQL por petición.
+
+InstrumentacionSQLMiddleware envuelve las conexiones con
+connection.execute_wrapper() durante la petición y anota cada consulta:
+cuántas, cuánto tiempo de base de datos y cuántas veces se repitió la
+misma "forma" de SQL (la sentencia con los valores normalizados). Una
+forma que se repite SQL_REPETIDAS_UMBRAL veces o más es casi siempre un
+N+1; se informa con la vista y la línea de plantilla que la originó.
+
+El resultado sale en la cabecera Server-Timing, en una línea JSON del
+logger "agrotiquiza.sql" y en un acumulado por nombre de URL
+(estadisticas_por_ruta()). Con SQL_MUESTREO < 1 solo se instrumenta esa
+fracción de peticiones, para dejarlo prendido en producción.
+
+En respuestas streaming (CSV/NDJSON, XLSX, FileResponse) las consultas
+del cuerpo corren después de que el middleware devuelve la respuesta: el
+conteo sigue abierto hasta response.close() y la línea JSON sale ahí,
+con "streaming": true. La cabecera ya se envió antes del cuerpo, así
+que solo lleva lo anterior y lo dice ("parcial").
+
+Funciona igual bajo ASGI: con vistas async el ORM corre en el hilo de la
+petición (sync_to_async con thread_sensitive), así que las envolturas se
+ponen y se quitan en ese mismo hilo.
+"""
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger("agrotiquiza.sql")
+
+# Literales que pudieran venir embebidos (RawSQL, extra) y listas IN de largo variable.
+_NUMEROS = re.compile(r"\b\d+(\.\d+)?\b")
+_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_LISTAS = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)")
+_ESPACIOS = re.compile(r"\s+")
+
+_ARCHIVO_PROPIO = __file__.rsplit(".", 1)[0]
+
+
+def forma_sql(sql):
+    """La sentencia sin valores: dos consultas con la misma forma son 'la misma consulta'."""
+    forma = _CADENAS.sub("?", sql)
+    forma = _LISTAS.sub("(...)", forma)
+    forma = _NUMEROS.sub("?", forma)
+    return _ESPACIOS.sub(" ", forma).strip()
+
+
+def origen_consulta():
+    """
+    (archivo:línea del código del proyecto, plantilla:línea) desde donde
+    se lanzó la consulta actual. Se calcula solo para formas repetidas.
+    """
+    base = str(settings.BASE_DIR)
+    codigo = plantilla = None
+    marco = sys._getframe(1)
+    while marco is not None:
+        archivo = marco.f_code.co_filename
+        if plantilla is None and marco.f_code.co_name == "render_annotated":
+            nodo = marco.f_locals.get("self")
+            token = getattr(nodo, "token", None)
+            origen = getattr(nodo, "origin", None)
+            if token is not None and origen is not None:
+                plantilla = f"{origen.template_name or origen.name}:{token.lineno}"
+        if (codigo is None and archivo.startswith(base) and "site-packages" not in archivo
+                and not archivo.startswith(_ARCHIVO_PROPIO)):
+            codigo = f"{archivo[len(base) + 1:]}:{marco.f_lineno} ({marco.f_code.co_name})"
+        if codigo and plantilla:
+            break
+        marco = marco.f_back
+    return codigo, plantilla
+
+
+class RegistroConsultas:
+    """execute_wrapper que cuenta consultas, tiempo y formas repetidas."""
+
+    def __init__(self, umbral):
+        self.umbral = umbral
+        self.consultas = 0
+        self.tiempo = 0.0
+        self.formas = Counter()
+        self.origenes = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo += time.perf_counter() - inicio
+            self.consultas += 1
+            forma = forma_sql(sql)
+            self.formas[forma] += 1
+            if self.formas[forma] == self.umbral:
+                self.origenes[forma] = origen_consulta()
+
+    def repetidas(self):
+        return [
+            {"veces": veces, "sql": forma[:300], "codigo": self.origenes[forma][0],
+             "plantilla": self.origenes[forma][1]}
+            for forma, veces in self.formas.most_common()
+            if veces >= self.umbral
+        ]
+
+
+_estadisticas = {}
+_candado = threading.Lock()
+
+
+def _acumular(ruta, registro, repetidas):
+    with _candado:
+        fila = _estadisticas.setdefault(ruta, {
+            "peticiones": 0, "consultas": 0, "tiempo_ms": 0.0, "max_consultas": 0, "con_n_mas_1": 0,
+        })
+        fila["peticiones"] += 1
+        fila["consultas"] += registro.consultas
+        fila["tiempo_ms"] += registro.tiempo * 1000
+        fila["max_consultas"] = max(fila["max_consultas"], registro.consultas)
+        fila["con_n_mas_1"] += bool(repetidas)
+
+
+def estadisticas_por_ruta():
+    """Copia del acumulado de este proceso: {nombre de URL: {peticiones, consultas, ...}}."""
+    with _candado:
+        return {ruta: dict(fila) for ruta, fila in _estadisticas.items()}
+
+
+def reiniciar_estadisticas():
+    with _candado:
+        _estadisticas.clear()
+
+
+class InstrumentacionSQLMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.muestreo = getattr(settings, "SQL_MUESTREO", 1.0)
+        self.umbral = getattr(settings, "SQL_REPETIDAS_UMBRAL", 5)
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def _muestrear(self):
+        return self.muestreo > 0 and (self.muestreo >= 1 or random.random() < self.muestreo)
+
+    @staticmethod
+    def _envolver(pila, registro):
+        for conexion in connections.all():
+            pila.enter_context(conexion.execute_wrapper(registro))
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        if not self._muestrear():
+            return self.get_response(request)
+
+        registro = RegistroConsultas(self.umbral)
+        inicio = time.perf_counter()
+        pila = ExitStack()
+        self._envolver(pila, registro)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            pila.close()
+            raise
+        return self._informar(request, response, registro, inicio, pila)
+
+    async def __acall__(self, request):
+        if not self._muestrear():
+            return await self.get_response(request)
+
+        registro = RegistroConsultas(self.umbral)
+        inicio = time.perf_counter()
+        pila = ExitStack()
+        await sync_to_async(self._envolver)(pila, registro)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            await sync_to_async(pila.close)()
+            raise
+        if response.streaming:
+            # El cuerpo y close() corren en el hilo de la petición, igual que las envolturas.
+            return self._informar(request, response, registro, inicio, pila)
+        await sync_to_async(pila.close)()
+        return self._informar(request, response, registro, inicio)
+
+    def _informar(self, request, response, registro, inicio, pila=None):
+        coincidencia = getattr(request, "resolver_match", None)
+        ruta = coincidencia.view_name if coincidencia else request.path
+
+        if response.streaming:
+            self._cabecera(response, registro, inicio, parcial=True)
+
+            cerrar_original = response.close
+
+            # El servidor llama a close() cuando termina de enviar el cuerpo.
+            def cerrar():
+                try:
+                    if pila is not None:
+                        pila.close()
+                    self._registrar(ruta, request, response, registro, inicio, streaming=True)
+                finally:
+                    cerrar_original()
+
+            response.close = cerrar
+            return response
+
+        if pila is not None:
+            pila.close()
+        self._cabecera(response, registro, inicio)
+        self._registrar(ruta, request, response, registro, inicio)
+        return response
+
+    @staticmethod
+    def _cabecera(response, registro, inicio, parcial=False):
+        total_ms = (time.perf_counter() - inicio) * 1000
+        consultas = f"{registro.consultas} consultas" + (" (parcial)" if parcial else "")
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={registro.tiempo * 1000:.1f};desc="{consultas}"',
+            f'dbrep;desc="{len(registro.repetidas())} repetidas"',
+            f"total;dur={total_ms:.1f}",
+        ])
+
+    @staticmethod
+    def _registrar(ruta, request, response, registro, inicio, streaming=False):
+        repetidas = registro.repetidas()
+        _acumular(ruta, registro, repetidas)
+        datos = {
+            "ruta": ruta,
+            "metodo": request.method,
+            "estado": response.status_code,
+            "consultas": registro.consultas,
+            "db_ms": round(registro.tiempo * 1000, 1),
+            "total_ms": round((time.perf_counter() - inicio) * 1000, 1),
+        }
+        if streaming:
+            datos["streaming"] = True
+        if repetidas:
+            datos["repetidas"] = repetidas
+        logger.log(logging.WARNING if repetidas else logging.INFO, json.dumps(datos, ensure_ascii=False))
@@ -0,0 +1,20 @@
+# agrotiquiza/pruebas.py
+"""
+En las pruebas cada petición instrumentada dejaría su línea JSON del
+logger "agrotiquiza.sql" en la salida. Se calla desde el runner de
+`manage.py test` y desde conftest.py con pytest; assertLogs sigue
+funcionando porque baja el nivel mientras dura.
+"""
+import logging
+
+from django.test.runner import DiscoverRunner
+
+
+def silenciar_log_sql():
+    logging.getLogger("agrotiquiza.sql").setLevel(logging.CRITICAL)
+
+
+class PruebasRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        silenciar_log_sql()
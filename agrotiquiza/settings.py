@@ -35,14 +35,18 @@ INSTALLED_APPS = [
     "apps.ganaderia",
     "apps.finca",
     "apps.salud",
+    "apps.exportaciones",
+    "apps.inventario",
 ]
 
 # -------------------------------
 # MIDDLEWARE
 # -------------------------------
 MIDDLEWARE = [
+    "agrotiquiza.streaming.StreamingAsincronoMiddleware",  # bajo ASGI, descargas sin cargar el archivo en memoria
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",  # debe ir aquí JUSTO debajo de SecurityMiddleware
+    "agrotiquiza.estaticos.WhiteNoiseAsincronoMiddleware",  # WhiteNoise; debe ir aquí JUSTO debajo de SecurityMiddleware
+    "agrotiquiza.instrumentacion.InstrumentacionSQLMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -56,12 +60,20 @@ ROOT_URLCONF = "agrotiquiza.urls"
 # -------------------------------
 # TEMPLATES
 # -------------------------------
+# Plantillas compiladas una vez por proceso (cached.Loader). Es lo que
+# Django hace por defecto desde 4.1; se deja explícito para que nadie lo
+# apague al tocar "loaders". runserver lo vacía al editar una plantilla.
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
         "OPTIONS": {
+            "loaders": [
+                ("django.template.loaders.cached.Loader", [
+                    "django.template.loaders.filesystem.Loader",
+                    "django.template.loaders.app_directories.Loader",
+                ]),
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -130,6 +142,96 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# -------------------------------
+# CACHÉ Y SESIONES
+# -------------------------------
+# Con REDIS_URL (requiere el paquete redis) la caché la comparten todos
+# los servidores. Sin Redis, "default" es la memoria de cada proceso
+# (fragmentos de plantilla, con la versión de los datos en la llave) y
+# las sesiones y "compartida" van a disco local: los workers de gunicorn
+# del mismo servidor ven el mismo archivo, así un logout o una
+# invalidación (aretes, perfiles de animal) no queda vieja en otro
+# worker. Con DEBUG (runserver, pruebas) basta memoria.
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL},
+        "sesiones": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "sesion",
+        },
+        "compartida": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL},
+    }
+elif DEBUG:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "sesiones": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "sesiones"},
+        "compartida": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "compartida"},
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "sesiones": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("SESIONES_CACHE_DIR", str(BASE_DIR / ".cache" / "sesiones")),
+            "OPTIONS": {"MAX_ENTRIES": 20000},
+        },
+        "compartida": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("COMPARTIDA_CACHE_DIR", str(BASE_DIR / ".cache" / "compartida")),
+            "OPTIONS": {"MAX_ENTRIES": 20000},
+        },
+    }
+
+# cached_db: la sesión se lee de la caché y solo va a la base si no está;
+# se escribe en ambas, así que la base sigue siendo la fuente de verdad.
+SESSION_ENGINE = os.getenv("SESSION_ENGINE", "django.contrib.sessions.backends.cached_db")
+SESSION_CACHE_ALIAS = "sesiones"
+# Solo se guarda la sesión cuando una vista la modifica; las páginas de
+# consulta no escriben nada.
+SESSION_SAVE_EVERY_REQUEST = False
+
+# Los mensajes van primero en una cookie y solo pasan a la sesión si no
+# caben (más de ~2 KB). CookieStorage nunca toca la sesión.
+MESSAGE_STORAGE = os.getenv("MESSAGE_STORAGE", "django.contrib.messages.storage.fallback.FallbackStorage")
+
+# -------------------------------
+# EXPORTACIONES
+# -------------------------------
+# Con True las exportaciones a Excel se encolan y las genera el worker
+# `python manage.py procesar_exportaciones`; con False se generan en la
+# misma petición.
+EXPORTACIONES_ASINCRONAS = os.getenv("EXPORTACIONES_ASINCRONAS", "True") == "True"
+
+# -------------------------------
+# INSTRUMENTACIÓN SQL
+# -------------------------------
+# Fracción de peticiones que pasan por InstrumentacionSQLMiddleware
+# (0 la apaga). Una forma de SQL repetida SQL_REPETIDAS_UMBRAL veces en
+# la misma petición se reporta como N+1.
+SQL_MUESTREO = float(os.getenv("SQL_MUESTREO", "1.0" if DEBUG else "0.05"))
+SQL_REPETIDAS_UMBRAL = int(os.getenv("SQL_REPETIDAS_UMBRAL", "5"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "consola": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "agrotiquiza.sql": {
+            "handlers": ["consola"],
+            "level": os.getenv("SQL_LOG_NIVEL", "INFO" if DEBUG else "WARNING"),
+            "propagate": False,
+        },
+    },
+}
+
+# Las pruebas callan el logger agrotiquiza.sql (ver agrotiquiza/pruebas.py).
+TEST_RUNNER = "agrotiquiza.pruebas.PruebasRunner"
+
 # -------------------------------
 # AUTENTICACIÓN
 # -------------------------------
@@ -139,6 +241,15 @@ LOGOUT_REDIRECT_URL = "/login/"
 
 AUTH_USER_MODEL = "users.User"
 
+# Carga el usuario de la sesión con rol y empresa en una sola consulta.
+# ModelBackend se deja para que las sesiones abiertas antes del cambio
+# (guardadas con su ruta) sigan siendo válidas; los logins nuevos usan el
+# primero de la lista.
+AUTHENTICATION_BACKENDS = [
+    "apps.users.backends.UsuarioConRolBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+
 
 # -------------------------------
 # SMTP CORREGIDO
@@ -0,0 +1,55 @@
+# agrotiquiza/streaming.py
+"""
+Descargas en streaming bajo ASGI.
+
+Las exportaciones CSV/NDJSON y los Excel (FileResponse) se generan con un
+iterador síncrono. Bajo ASGI Django no puede recorrerlo desde el event
+loop y lo lee completo con sync_to_async(list) antes de enviar el primer
+byte (StreamingHttpResponse.__aiter__): la exportación entera queda en
+memoria. Este middleware cambia ese iterador por uno async que pide los
+bloques en el hilo de la petición, de a ~64 KB por salto. Bajo WSGI no
+hace nada.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+TAMANO_BLOQUE = 64 * 1024
+
+
+def _siguiente_bloque(iterador):
+    partes = []
+    tamano = 0
+    for parte in iterador:
+        partes.append(parte)
+        tamano += len(parte)
+        if tamano >= TAMANO_BLOQUE:
+            break
+    return b"".join(partes)
+
+
+async def por_bloques(iterador):
+    iterador = iter(iterador)
+    siguiente = sync_to_async(_siguiente_bloque, thread_sensitive=True)
+    while bloque := await siguiente(iterador):
+        yield bloque
+
+
+class StreamingAsincronoMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if response.streaming and not response.is_async:
+            response.streaming_content = por_bloques(response.streaming_content)
+        return response
@@ -26,6 +26,7 @@ urlpatterns = [
     path('finca/', include('apps.finca.urls')),
     path('salud/', include('apps.salud.urls')),
     path('inventario/', include('apps.inventario.urls')),
+    path('exportaciones/', include('apps.exportaciones.urls')),
  
 
 ]
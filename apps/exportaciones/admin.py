@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import Exportacion
+
+@admin.register(Exportacion)
+class ExportacionAdmin(admin.ModelAdmin):
+    list_display = ('tipo', 'usuario', 'estado', 'filas', 'reutilizada', 'creado_en', 'terminado_en')
+    list_filter = ('estado', 'tipo')
+    list_select_related = ('usuario',)
@@ -0,0 +1,80 @@
+# apps/exportaciones/management/commands/procesar_exportaciones.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.exportaciones.models import Exportacion
+from apps.exportaciones.services import ExportacionService
+
+
+class Command(BaseCommand):
+    help = 'Worker que genera los archivos de las exportaciones en cola'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesa la cola pendiente y termina (útil en cron)'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2.0,
+            help='Segundos de espera cuando la cola está vacía (default: 2)'
+        )
+        parser.add_argument(
+            '--liberar-tras',
+            type=int,
+            default=30,
+            help='Minutos tras los cuales un trabajo "procesando" se devuelve a la cola (default: 30)'
+        )
+        parser.add_argument(
+            '--conservar-dias',
+            type=int,
+            default=7,
+            help='Días que se conservan las exportaciones terminadas (default: 7)'
+        )
+
+    def handle(self, *args, **options):
+        una_vez = options['una_vez']
+        intervalo = options['intervalo']
+
+        liberadas = ExportacionService.liberar_bloqueadas(options['liberar_tras'])
+        if liberadas:
+            self.stdout.write(self.style.WARNING(f'{liberadas} exportaciones devueltas a la cola'))
+
+        self.stdout.write(self.style.SUCCESS('Worker de exportaciones iniciado'))
+
+        ultima_limpieza = None
+        while True:
+            close_old_connections()
+            exportacion = ExportacionService.reclamar_siguiente()
+
+            if exportacion is None:
+                # Con la cola vacía, a lo sumo una limpieza por hora.
+                if ultima_limpieza is None or time.monotonic() - ultima_limpieza > 3600:
+                    borradas = ExportacionService.limpiar(options['conservar_dias'])
+                    if borradas:
+                        self.stdout.write(f'{borradas} exportaciones viejas o reemplazadas borradas')
+                    ultima_limpieza = time.monotonic()
+                if una_vez:
+                    break
+                time.sleep(intervalo)
+                continue
+
+            inicio = time.monotonic()
+            exportacion = ExportacionService.procesar(exportacion)
+            duracion = time.monotonic() - inicio
+
+            if exportacion.estado == Exportacion.COMPLETADA:
+                origen = 'reutilizada' if exportacion.reutilizada else 'generada'
+                self.stdout.write(
+                    f'[{exportacion.pk}] {exportacion.tipo}: {exportacion.filas} filas, '
+                    f'{origen} en {duracion:.1f}s'
+                )
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f'[{exportacion.pk}] {exportacion.tipo}: {exportacion.mensaje_error}'
+                ))
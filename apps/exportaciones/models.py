@@ -0,0 +1,50 @@
+from django.db import models
+from django.urls import reverse
+
+from apps.users.models import User
+
+
+class Exportacion(models.Model):
+    PENDIENTE = 'pendiente'
+    PROCESANDO = 'procesando'
+    COMPLETADA = 'completada'
+    ERROR = 'error'
+    ESTADO_CHOICES = [
+        (PENDIENTE, 'Pendiente'),
+        (PROCESANDO, 'Procesando'),
+        (COMPLETADA, 'Completada'),
+        (ERROR, 'Error'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    tipo = models.CharField(max_length=50)
+    filtros = models.JSONField(default=dict, blank=True)
+    clave_cache = models.CharField(max_length=64, db_index=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=PENDIENTE)
+    archivo = models.FileField(upload_to='exportaciones/', blank=True)
+    filas = models.PositiveIntegerField(null=True, blank=True)
+    reutilizada = models.BooleanField(default=False)
+    mensaje_error = models.TextField(blank=True)
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='exportaciones')
+    creado_en = models.DateTimeField(auto_now_add=True)
+    iniciado_en = models.DateTimeField(null=True, blank=True)
+    terminado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-creado_en']
+        verbose_name = 'Exportación'
+        verbose_name_plural = 'Exportaciones'
+        indexes = [
+            models.Index(fields=['estado', 'creado_en']),
+            models.Index(fields=['usuario', '-creado_en']),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} ({self.get_estado_display()}) - {self.usuario}"
+
+    @property
+    def terminada(self):
+        return self.estado in (self.COMPLETADA, self.ERROR)
+
+    def get_download_url(self):
+        return reverse('exportaciones:descargar', args=[self.pk])
@@ -0,0 +1,114 @@
+# apps/exportaciones/registro.py
+from datetime import timedelta
+
+from apps.finca.models import Finca
+from apps.ganaderia.models import Animal, Pesaje, Parto, ProduccionLeche
+from apps.ganaderia.exports import (
+    ENCABEZADOS_PESAJES, filas_pesajes,
+    ENCABEZADOS_PARTOS, filas_partos,
+    ENCABEZADOS_PRODUCCION, filas_produccion,
+)
+from apps.ganaderia.periodos import PARAMETROS_PERIODO, filtrar_periodo, periodo_desde
+from apps.salud.models import EventoSanitario
+from apps.salud.exports import ENCABEZADOS_EVENTOS, filas_eventos_sanitarios
+
+
+class TipoExportacion:
+    """
+    Describe una exportación: qué filtros acepta, cómo se arma el queryset
+    y de qué modelos depende (para saber cuándo un archivo quedó obsoleto).
+    """
+
+    def __init__(self, nombre, nombre_archivo, titulo, encabezados,
+                 queryset, filas, modelos, filtros=()):
+        self.nombre = nombre
+        self.nombre_archivo = nombre_archivo
+        self.titulo = titulo
+        self.encabezados = encabezados
+        self.queryset = queryset
+        self.filas = filas
+        self.modelos = modelos
+        self.filtros = filtros
+
+    def limpiar_filtros(self, datos):
+        """
+        Filtros que se guardan con el trabajo y entran en la clave del
+        artefacto. El período se resuelve aquí, al encolar, a fechas
+        desde/hasta (inclusivas): ?mes=5 sin año depende del día en que se
+        pide, y mes=2025-05 y mes=5&anio=2025 son el mismo archivo.
+        """
+        limpios = {}
+        for campo in self.filtros:
+            if campo in PARAMETROS_PERIODO:
+                continue
+            valor = (datos.get(campo) or "").strip()
+            if valor:
+                limpios[campo] = valor
+        if set(PARAMETROS_PERIODO) & set(self.filtros):
+            periodo = periodo_desde(datos)
+            if periodo is not None and periodo.desde:
+                limpios["desde"] = periodo.desde.isoformat()
+            if periodo is not None and periodo.hasta:
+                limpios["hasta"] = (periodo.hasta - timedelta(days=1)).isoformat()
+        return limpios
+
+    def construir_filas(self, filtros):
+        return self.filas(self.queryset(filtros))
+
+
+def _por_periodo(modelo):
+    def queryset(filtros):
+        return filtrar_periodo(modelo.objects.all(), filtros)[0]
+    return queryset
+
+
+TIPOS = {
+    tipo.nombre: tipo for tipo in [
+        TipoExportacion(
+            nombre="pesajes",
+            nombre_archivo="pesajes.xlsx",
+            titulo="Pesajes",
+            encabezados=ENCABEZADOS_PESAJES,
+            queryset=_por_periodo(Pesaje),
+            filas=filas_pesajes,
+            modelos=(Pesaje, Animal, Finca),
+            filtros=PARAMETROS_PERIODO,
+        ),
+        TipoExportacion(
+            nombre="partos",
+            nombre_archivo="partos.xlsx",
+            titulo="Partos",
+            encabezados=ENCABEZADOS_PARTOS,
+            queryset=lambda filtros: Parto.objects.all(),
+            filas=filas_partos,
+            modelos=(Parto, Animal, Finca),
+        ),
+        TipoExportacion(
+            nombre="produccion",
+            nombre_archivo="produccion_leche.xlsx",
+            titulo="Producción",
+            encabezados=ENCABEZADOS_PRODUCCION,
+            queryset=_por_periodo(ProduccionLeche),
+            filas=filas_produccion,
+            modelos=(ProduccionLeche, Animal, Finca),
+            filtros=PARAMETROS_PERIODO,
+        ),
+        TipoExportacion(
+            nombre="eventos_sanitarios",
+            nombre_archivo="eventos_sanitarios.xlsx",
+            titulo="Eventos Sanitarios",
+            encabezados=ENCABEZADOS_EVENTOS,
+            queryset=_por_periodo(EventoSanitario),
+            filas=filas_eventos_sanitarios,
+            modelos=(EventoSanitario, Animal),
+            filtros=PARAMETROS_PERIODO,
+        ),
+    ]
+}
+
+
+def obtener_tipo(nombre):
+    try:
+        return TIPOS[nombre]
+    except KeyError:
+        raise ValueError(f"Tipo de exportación desconocido: {nombre}")
@@ -0,0 +1,182 @@
+# apps/exportaciones/services.py
+import hashlib
+import json
+import tempfile
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from apps.ganaderia.exports import escribir_xlsx
+from apps.ganaderia.models import VersionDatos
+from .models import Exportacion
+from .registro import obtener_tipo
+
+
+class _ContadorFilas:
+    def __init__(self, filas):
+        self.filas = filas
+        self.total = 0
+
+    def __iter__(self):
+        for fila in self.filas:
+            self.total += 1
+            yield fila
+
+
+class ExportacionService:
+
+    @staticmethod
+    def calcular_clave(tipo, filtros):
+        """
+        Clave del artefacto: tipo + filtros + versión actual de cada modelo
+        del que depende. Cualquier escritura en esos modelos cambia la clave.
+        """
+        versiones = VersionDatos.objects.versiones(*tipo.modelos)
+        contenido = json.dumps(
+            {"tipo": tipo.nombre, "filtros": filtros, "versiones": versiones},
+            sort_keys=True,
+        )
+        return hashlib.sha256(contenido.encode()).hexdigest()
+
+    @staticmethod
+    def buscar_artefacto(clave):
+        return (
+            Exportacion.objects
+            .filter(clave_cache=clave, estado=Exportacion.COMPLETADA)
+            .exclude(archivo="")
+            .order_by('-terminado_en')
+            .first()
+        )
+
+    @staticmethod
+    def encolar(nombre_tipo, datos, usuario):
+        tipo = obtener_tipo(nombre_tipo)
+        filtros = tipo.limpiar_filtros(datos)
+        clave = ExportacionService.calcular_clave(tipo, filtros)
+
+        exportacion = Exportacion(
+            tipo=tipo.nombre,
+            filtros=filtros,
+            clave_cache=clave,
+            usuario=usuario,
+        )
+
+        existente = ExportacionService.buscar_artefacto(clave)
+        if existente and existente.archivo.storage.exists(existente.archivo.name):
+            ExportacionService._reutilizar(exportacion, existente)
+
+        exportacion.save()
+        return exportacion
+
+    @staticmethod
+    def reclamar_siguiente():
+        """
+        Toma el trabajo pendiente más antiguo. El UPDATE condicionado al
+        estado evita que dos workers procesen el mismo trabajo.
+        """
+        candidatos = (
+            Exportacion.objects
+            .filter(estado=Exportacion.PENDIENTE)
+            .order_by('creado_en')
+            .values_list('pk', flat=True)[:10]
+        )
+        for pk in candidatos:
+            tomado = Exportacion.objects.filter(
+                pk=pk, estado=Exportacion.PENDIENTE
+            ).update(estado=Exportacion.PROCESANDO, iniciado_en=timezone.now())
+            if tomado:
+                return Exportacion.objects.get(pk=pk)
+        return None
+
+    @staticmethod
+    def liberar_bloqueadas(minutos):
+        """Devuelve a la cola los trabajos de un worker que murió a mitad de camino."""
+        limite = timezone.now() - timedelta(minutes=minutos)
+        return Exportacion.objects.filter(
+            estado=Exportacion.PROCESANDO, iniciado_en__lt=limite
+        ).update(estado=Exportacion.PENDIENTE, iniciado_en=None)
+
+    @staticmethod
+    def limpiar(dias, horas_reemplazadas=1):
+        """
+        Borra las exportaciones terminadas hace más de `dias` y las completadas
+        que ya reemplazó una más nueva con el mismo tipo y filtros (los datos
+        cambiaron y la clave es otra). Un archivo se borra cuando ya ninguna
+        fila lo usa: las reutilizadas comparten el de la original.
+        """
+        ahora = timezone.now()
+        borrar = set(
+            Exportacion.objects
+            .filter(estado__in=(Exportacion.COMPLETADA, Exportacion.ERROR),
+                    terminado_en__lt=ahora - timedelta(days=dias))
+            .values_list('pk', flat=True)
+        )
+
+        vigentes = {}
+        completadas = (
+            Exportacion.objects
+            .filter(estado=Exportacion.COMPLETADA)
+            .order_by('-terminado_en', '-pk')
+            .values_list('pk', 'tipo', 'filtros', 'clave_cache', 'terminado_en')
+        )
+        limite = ahora - timedelta(hours=horas_reemplazadas)
+        for pk, tipo, filtros, clave, terminado_en in completadas.iterator():
+            consulta = (tipo, json.dumps(filtros, sort_keys=True))
+            clave_vigente = vigentes.setdefault(consulta, clave)
+            if clave != clave_vigente and terminado_en < limite:
+                borrar.add(pk)
+
+        if not borrar:
+            return 0
+
+        borradas = Exportacion.objects.filter(pk__in=borrar)
+        with transaction.atomic():
+            archivos = set(borradas.exclude(archivo='').values_list('archivo', flat=True))
+            borradas.delete()
+            en_uso = set(
+                Exportacion.objects.filter(archivo__in=archivos).values_list('archivo', flat=True)
+            )
+
+        almacenamiento = Exportacion._meta.get_field('archivo').storage
+        for nombre in archivos - en_uso:
+            almacenamiento.delete(nombre)
+        return len(borrar)
+
+    @staticmethod
+    def procesar(exportacion):
+        # Otro trabajo con los mismos filtros pudo terminar mientras este esperaba.
+        existente = ExportacionService.buscar_artefacto(exportacion.clave_cache)
+        if existente and existente.archivo.storage.exists(existente.archivo.name):
+            ExportacionService._reutilizar(exportacion, existente)
+            exportacion.save()
+            return exportacion
+
+        tipo = obtener_tipo(exportacion.tipo)
+        try:
+            filas = _ContadorFilas(tipo.construir_filas(exportacion.filtros))
+            with tempfile.TemporaryFile() as temporal:
+                escribir_xlsx(temporal, tipo.titulo, tipo.encabezados, filas)
+                temporal.seek(0)
+                exportacion.archivo.save(
+                    f"{exportacion.clave_cache}.xlsx", File(temporal), save=False
+                )
+        except Exception as e:
+            exportacion.estado = Exportacion.ERROR
+            exportacion.mensaje_error = str(e)
+        else:
+            exportacion.estado = Exportacion.COMPLETADA
+            exportacion.filas = filas.total
+
+        exportacion.terminado_en = timezone.now()
+        exportacion.save()
+        return exportacion
+
+    @staticmethod
+    def _reutilizar(exportacion, existente):
+        exportacion.archivo = existente.archivo.name
+        exportacion.filas = existente.filas
+        exportacion.reutilizada = True
+        exportacion.estado = Exportacion.COMPLETADA
+        exportacion.terminado_en = timezone.now()
@@ -0,0 +1,114 @@
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from apps.finca.models import Finca
+from apps.ganaderia.models import Animal, ProduccionLeche
+from apps.users.models import User, Rol
+from .models import Exportacion
+from .services import ExportacionService
+
+MEDIA_TEMPORAL = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEMPORAL, EXPORTACIONES_ASINCRONAS=True)
+class ExportacionAsincronaTestCase(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TEMPORAL, ignore_errors=True)
+
+    def setUp(self):
+        self.finca = Finca.objects.create(nombre="Finca Cola", codigo="COL01")
+        rol = Rol.objects.create(nombre_rol="Gerente")
+        self.gerente = User.objects.create_user(cedula='100', email='g1@test.com', password='pass', rol=rol)
+        self.otro_gerente = User.objects.create_user(cedula='200', email='g2@test.com', password='pass', rol=rol)
+        self.animal = Animal.objects.create(numero_arete='C001', nombre='Nube', sexo='F', finca=self.finca)
+        ProduccionLeche.objects.create(animal=self.animal, finca=self.finca, fecha=date(2025, 5, 2), peso_am=12, peso_pm=8)
+
+    def test_encola_procesa_y_descarga(self):
+        self.client.force_login(self.gerente)
+        response = self.client.get(reverse('ganaderia:produccion_exportar'), {'mes': '5', 'anio': '2025'})
+        self.assertRedirects(response, reverse('exportaciones:mis_exportaciones'))
+
+        exportacion = Exportacion.objects.get()
+        self.assertEqual(exportacion.estado, Exportacion.PENDIENTE)
+        self.assertEqual(exportacion.filtros, {'desde': '2025-05-01', 'hasta': '2025-05-31'})
+
+        ExportacionService.procesar(ExportacionService.reclamar_siguiente())
+        exportacion.refresh_from_db()
+        self.assertEqual(exportacion.estado, Exportacion.COMPLETADA)
+        self.assertEqual(exportacion.filas, 1)
+
+        response = self.client.get(exportacion.get_download_url())
+        ws = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        self.assertEqual(ws.max_row, 2)
+
+    def test_segunda_solicitud_reutiliza_el_archivo(self):
+        primera = ExportacionService.encolar('produccion', {'mes': '5'}, self.gerente)
+        ExportacionService.procesar(ExportacionService.reclamar_siguiente())
+
+        segunda = ExportacionService.encolar('produccion', {'mes': '5'}, self.otro_gerente)
+        primera.refresh_from_db()
+        self.assertTrue(segunda.reutilizada)
+        self.assertEqual(segunda.estado, Exportacion.COMPLETADA)
+        self.assertEqual(segunda.archivo.name, primera.archivo.name)
+        self.assertIsNone(ExportacionService.reclamar_siguiente())
+
+    def test_clave_por_periodo_resuelto(self):
+        primera = ExportacionService.encolar('produccion', {'mes': '2025-05'}, self.gerente)
+        segunda = ExportacionService.encolar('produccion', {'mes': '5', 'anio': '2025'}, self.gerente)
+        otra = ExportacionService.encolar('produccion', {'mes': '6', 'anio': '2025'}, self.gerente)
+        self.assertEqual(primera.clave_cache, segunda.clave_cache)
+        self.assertNotEqual(primera.clave_cache, otra.clave_cache)
+
+    def test_escritura_invalida_el_artefacto(self):
+        ExportacionService.encolar('produccion', {'mes': '5'}, self.gerente)
+        ExportacionService.procesar(ExportacionService.reclamar_siguiente())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProduccionLeche.objects.create(animal=self.animal, finca=self.finca, fecha=date(2025, 5, 3), peso_am=11)
+
+        nueva = ExportacionService.encolar('produccion', {'mes': '5'}, self.otro_gerente)
+        self.assertFalse(nueva.reutilizada)
+        self.assertEqual(nueva.estado, Exportacion.PENDIENTE)
+
+    def test_descarga_solo_para_el_propietario(self):
+        exportacion = ExportacionService.encolar('partos', {}, self.gerente)
+        ExportacionService.procesar(ExportacionService.reclamar_siguiente())
+
+        self.client.force_login(self.otro_gerente)
+        response = self.client.get(reverse('exportaciones:descargar', args=[exportacion.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_limpiar_borra_reemplazadas_y_viejas(self):
+        primera = ExportacionService.encolar('produccion', {'mes': '5'}, self.gerente)
+        ExportacionService.procesar(ExportacionService.reclamar_siguiente())
+        reutilizada = ExportacionService.encolar('produccion', {'mes': '5'}, self.otro_gerente)
+        partos = ExportacionService.encolar('partos', {}, self.gerente)
+        ExportacionService.procesar(ExportacionService.reclamar_siguiente())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProduccionLeche.objects.create(animal=self.animal, finca=self.finca, fecha=date(2025, 5, 3), peso_am=11)
+        nueva = ExportacionService.encolar('produccion', {'mes': '5'}, self.gerente)
+        ExportacionService.procesar(ExportacionService.reclamar_siguiente())
+
+        # La original es vieja pero su archivo lo sigue usando la reutilizada.
+        hace = timezone.now() - timedelta(days=10)
+        Exportacion.objects.filter(pk=primera.pk).update(terminado_en=hace)
+        primera.refresh_from_db()
+        almacenamiento = primera.archivo.storage
+        self.assertEqual(ExportacionService.limpiar(7), 1)
+        self.assertTrue(almacenamiento.exists(primera.archivo.name))
+
+        # Reemplazada por `nueva` hace más de una hora: se va con su archivo.
+        Exportacion.objects.filter(pk=reutilizada.pk).update(terminado_en=timezone.now() - timedelta(hours=2))
+        self.assertEqual(ExportacionService.limpiar(7), 1)
+        self.assertFalse(almacenamiento.exists(primera.archivo.name))
+        self.assertEqual(set(Exportacion.objects.values_list('pk', flat=True)), {partos.pk, nueva.pk})
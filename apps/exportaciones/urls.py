@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+app_name = 'exportaciones'
+
+urlpatterns = [
+    path('', views.mis_exportaciones, name='mis_exportaciones'),
+    path('estado/', views.estado_exportaciones, name='estado'),
+    path('<int:pk>/descargar/', views.descargar_exportacion, name='descargar'),
+]
@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+
+from apps.ganaderia.exports import xlsx_response, XLSX_CONTENT_TYPE
+from .models import Exportacion
+from .registro import obtener_tipo
+from .services import ExportacionService
+
+
+def exportar(request, nombre_tipo):
+    """
+    Punto de entrada común de las vistas de exportación: encola el trabajo
+    y lleva al usuario a "Mis exportaciones", o genera el archivo en la
+    misma petición si las exportaciones asíncronas están desactivadas.
+    """
+    if not settings.EXPORTACIONES_ASINCRONAS:
+        tipo = obtener_tipo(nombre_tipo)
+        filtros = tipo.limpiar_filtros(request.GET)
+        return xlsx_response(
+            tipo.nombre_archivo, tipo.titulo, tipo.encabezados,
+            tipo.construir_filas(filtros),
+        )
+
+    exportacion = ExportacionService.encolar(nombre_tipo, request.GET, request.user)
+    if exportacion.reutilizada:
+        messages.success(request, "El archivo ya estaba generado y está listo para descargar.")
+    else:
+        messages.info(request, "La exportación quedó en cola. Podrás descargarla aquí cuando termine.")
+    return redirect('exportaciones:mis_exportaciones')
+
+
+@login_required
+def mis_exportaciones(request):
+    exportaciones = Exportacion.objects.filter(usuario=request.user)[:50]
+    return render(request, 'exportaciones/mis_exportaciones.html', {
+        'exportaciones': exportaciones,
+    })
+
+
+@login_required
+def estado_exportaciones(request):
+    ids = [int(pk) for pk in request.GET.getlist('id') if pk.isdigit()]
+    exportaciones = Exportacion.objects.filter(usuario=request.user, pk__in=ids)
+    return JsonResponse({
+        'exportaciones': [
+            {
+                'id': e.pk,
+                'estado': e.estado,
+                'terminada': e.terminada,
+                'filas': e.filas,
+                'url': e.get_download_url() if e.estado == Exportacion.COMPLETADA else None,
+            }
+            for e in exportaciones
+        ]
+    })
+
+
+@login_required
+def descargar_exportacion(request, pk):
+    exportacion = get_object_or_404(
+        Exportacion, pk=pk, usuario=request.user, estado=Exportacion.COMPLETADA
+    )
+    if not exportacion.archivo or not exportacion.archivo.storage.exists(exportacion.archivo.name):
+        raise Http404("El archivo de la exportación ya no está disponible.")
+
+    tipo = obtener_tipo(exportacion.tipo)
+    return FileResponse(
+        exportacion.archivo.open('rb'),
+        as_attachment=True,
+        filename=tipo.nombre_archivo,
+        content_type=XLSX_CONTENT_TYPE,
+    )
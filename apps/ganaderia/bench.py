@@ -0,0 +1,159 @@
+# apps/ganaderia/bench.py
+"""
+Banco de rendimiento de las rutas calientes (manage.py bench).
+
+sembrar() llena una base de prueba de tamaño configurable con el
+generador de datos (generador.py); escenarios() arma las llamadas a medir (vistas con el
+cliente de pruebas de Django, servicios directamente) y medir() devuelve
+p50/p95/p99, consultas por llamada y memoria pico de cada una.
+
+La semilla fija el azar: con los mismos parámetros dos corridas generan
+los mismos datos, así que los JSON se pueden comparar entre commits.
+"""
+import statistics
+import time
+import tracemalloc
+from math import ceil
+
+from django.db import connections
+from django.urls import reverse
+from django.utils import timezone
+
+from agrotiquiza.instrumentacion import RegistroConsultas
+from apps.exportaciones.registro import TIPOS
+from apps.users.models import Rol, User
+
+from .generador import NOMBRES_HEMBRAS, crear_fincas, generar, reconstruir_derivados
+from .models import Animal
+from .services import AnimalService, ProduccionService
+
+# Vista de cada exportación de apps.exportaciones.registro.TIPOS.
+URLS_EXPORTACION = {
+    "pesajes": ("ganaderia:pesajes_list", "?exportar=1"),
+    "partos": ("ganaderia:partos_excel", ""),
+    "produccion": ("ganaderia:produccion_exportar", ""),
+    "eventos_sanitarios": ("salud:export_eventos_excel", ""),
+}
+
+
+class Datos:
+    """Lo que sembrar() deja listo para los escenarios."""
+
+    def __init__(self, usuario, fincas, aretes, hembras):
+        self.usuario = usuario
+        self.fincas = fincas
+        self.aretes = aretes
+        self.hembras = hembras
+
+
+class Escenario:
+    def __init__(self, nombre, grupo, llamada):
+        self.nombre = nombre
+        self.grupo = grupo
+        # llamada(i): i es el número de llamada, para variar aretes y fechas.
+        self.llamada = llamada
+
+
+def sembrar(animales=2000, fincas=5, dias=60, semilla=1):
+    """Hato sintético (ver generador.py) repartido en `fincas` fincas."""
+    rol, _ = Rol.objects.get_or_create(nombre_rol="Gerente")
+    usuario = User.objects.create_user(cedula="bench", email="bench@agrotiquiza.local",
+                                       password="bench", rol=rol)
+    lista_fincas = crear_fincas(fincas, prefijo="BEN")
+    generar(lista_fincas, ceil(animales / fincas), dias, semilla, usuario=usuario)
+    reconstruir_derivados()
+
+    activos = Animal.objects.filter(estado='activo').order_by('numero_arete')
+    return Datos(
+        usuario, lista_fincas,
+        list(activos.values_list('numero_arete', flat=True)),
+        list(activos.filter(sexo='F')),
+    )
+
+
+def _get(cliente, url):
+    response = cliente.get(url)
+    if response.status_code != 200:
+        raise AssertionError(f"{url} respondió {response.status_code}")
+    # Las exportaciones son streaming: el tiempo incluye armar todo el archivo.
+    if response.streaming:
+        return sum(len(parte) for parte in response.streaming_content)
+    return len(response.content)
+
+
+def escenarios(datos, cliente):
+    aretes, hembras, fincas = datos.aretes, datos.hembras, datos.fincas
+    hoy = timezone.localdate()
+    animales_url = reverse('ganaderia:animales_list')
+
+    def arete(i):
+        return aretes[(i * 7919) % len(aretes)]
+
+    # Cada llamada mueve el siguiente grupo de la primera finca a la segunda y de vuelta.
+    grupos = [a.numero_arete for a in Animal.objects.filter(finca=fincas[0], estado='activo')[:250]]
+
+    def trasladar(i):
+        grupo = grupos[(i // 2 * 25) % len(grupos):][:25]
+        AnimalService.trasladar_animales(grupo, fincas[1] if i % 2 == 0 else fincas[0], datos.usuario)
+
+    lista = [
+        Escenario("dashboard", "vistas", lambda i: _get(cliente, reverse('dashboard'))),
+        Escenario("animales_list", "vistas", lambda i: _get(cliente, animales_url)),
+        Escenario("animales_list_por_peso", "vistas", lambda i: _get(cliente, f"{animales_url}?orden=peso")),
+        Escenario("animales_buscar", "vistas",
+                  lambda i: _get(cliente, f"{animales_url}?q={NOMBRES_HEMBRAS[i % len(NOMBRES_HEMBRAS)]}")),
+        Escenario("api_buscar_animales", "vistas",
+                  lambda i: _get(cliente, f"{reverse('ganaderia:api_buscar_animales')}?q={arete(i)[:4]}")),
+        Escenario("buscar_animal_arete", "vistas",
+                  lambda i: _get(cliente, f"{reverse('ganaderia:buscar_animal')}?arete={arete(i)}")),
+        Escenario("api_animal_info", "vistas",
+                  lambda i: _get(cliente, f"{reverse('ganaderia:api_animal_info')}?arete={arete(i)}")),
+        Escenario("get_by_arete", "servicios", lambda i: AnimalService.get_by_arete(arete(i))),
+        Escenario("registrar_pesaje", "servicios", lambda i: AnimalService.registrar_pesaje(
+            arete(i), hoy, 300 + i % 200, fincas[0], datos.usuario)),
+        Escenario("registrar_turno_produccion", "servicios", lambda i: ProduccionService.registrar_turno(
+            hembras[(i // 2) % len(hembras)], hoy, "AM" if i % 2 == 0 else "PM", 8.5)),
+        Escenario("trasladar_animales", "servicios", trasladar),
+    ]
+    for nombre in TIPOS:
+        ruta, parametros = URLS_EXPORTACION[nombre]
+        url = reverse(ruta) + parametros
+        lista.append(Escenario(f"exportar_{nombre}", "exportaciones", lambda i, url=url: _get(cliente, url)))
+    return lista
+
+
+def percentiles(tiempos):
+    if len(tiempos) < 2:
+        return {"p50_ms": tiempos[0], "p95_ms": tiempos[0], "p99_ms": tiempos[0]} if tiempos else {}
+    cortes = statistics.quantiles(tiempos, n=100, method='inclusive')
+    return {"p50_ms": cortes[49], "p95_ms": cortes[94], "p99_ms": cortes[98]}
+
+
+def medir(escenario, repeticiones=30, calentamiento=3):
+    """Corre `escenario`; la memoria pico se mide aparte, en una llamada bajo tracemalloc."""
+    for i in range(calentamiento):
+        escenario.llamada(i)
+
+    registro = RegistroConsultas(umbral=float('inf'))
+    tiempos = []
+    for i in range(calentamiento, calentamiento + repeticiones):
+        with connections['default'].execute_wrapper(registro):
+            inicio = time.perf_counter()
+            escenario.llamada(i)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    tracemalloc.start()
+    try:
+        escenario.llamada(calentamiento + repeticiones)
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    resultado = {"grupo": escenario.grupo, "repeticiones": repeticiones}
+    resultado.update(percentiles(tiempos))
+    resultado.update({
+        "media_ms": statistics.fmean(tiempos),
+        "consultas": registro.consultas / repeticiones,
+        "memoria_pico_kib": pico / 1024,
+    })
+    return {campo: round(valor, 2) if isinstance(valor, float) else valor for campo, valor in resultado.items()}
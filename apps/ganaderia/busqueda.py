@@ -0,0 +1,225 @@
+# apps/ganaderia/busqueda.py
+"""
+Búsqueda de animales por arete / nombre sobre `Animal.clave_busqueda`
+(arete + nombre sin tildes y en minúsculas, ver normalizar_busqueda).
+
+- Prefijo: índice B-tree de la columna (LIKE 'x%' con varchar_pattern_ops
+  en PostgreSQL, un rango de comparación en SQLite/MySQL).
+- Subcadena y aproximada: en PostgreSQL un índice GIN pg_trgm; en SQLite
+  una tabla FTS5 con tokenizer trigram que mantienen unos triggers. Si no
+  hay ninguno de los dos se cae a LIKE sobre la clave ya normalizada.
+
+Los índices se crean en la migración 0003 con crear_indice_busqueda().
+"""
+from functools import lru_cache
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Func, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Animal, normalizar_busqueda
+
+TABLA_FTS = "ganaderia_animal_fts"
+INDICE_TRGM = "ganaderia_animal_clave_trgm"
+
+# El tokenizer trigram (y pg_trgm) no indexa términos de menos de 3 letras.
+MINIMO_TRIGRAMA = 3
+
+SQL_SQLITE = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(
+        clave_busqueda, content='ganaderia_animal', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON ganaderia_animal BEGIN
+        INSERT INTO {TABLA_FTS}(rowid, clave_busqueda) VALUES (new.id, new.clave_busqueda);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON ganaderia_animal BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, clave_busqueda)
+        VALUES ('delete', old.id, old.clave_busqueda);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au AFTER UPDATE OF clave_busqueda ON ganaderia_animal BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, clave_busqueda)
+        VALUES ('delete', old.id, old.clave_busqueda);
+        INSERT INTO {TABLA_FTS}(rowid, clave_busqueda) VALUES (new.id, new.clave_busqueda);
+    END""",
+    f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')",
+]
+
+SQL_POSTGRES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"""CREATE INDEX IF NOT EXISTS {INDICE_TRGM}
+        ON ganaderia_animal USING gin (clave_busqueda gin_trgm_ops)""",
+]
+
+
+def crear_indice_busqueda(schema_editor):
+    """
+    Crea (o repone) el índice de texto. En SQLite hay que volver a llamarla
+    si una migración reconstruye la tabla ganaderia_animal, porque al
+    copiarla se pierden los triggers.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        sentencias = SQL_POSTGRES
+    elif vendor == "sqlite" and _sqlite_tiene_trigram():
+        sentencias = SQL_SQLITE
+    else:
+        return
+    for sql in sentencias:
+        schema_editor.execute(sql)
+    _fts_disponible.cache_clear()
+
+
+def eliminar_indice_busqueda(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {INDICE_TRGM}")
+    elif vendor == "sqlite":
+        for sufijo in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {TABLA_FTS}_{sufijo}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLA_FTS}")
+    _fts_disponible.cache_clear()
+
+
+def _sqlite_tiene_trigram():
+    # El tokenizer trigram llegó en SQLite 3.34.
+    from sqlite3 import sqlite_version_info
+    return sqlite_version_info >= (3, 34, 0)
+
+
+@lru_cache(maxsize=None)
+def _fts_disponible(nombre_bd):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLA_FTS]
+        )
+        return cursor.fetchone() is not None
+
+
+def _motor():
+    if connection.vendor == "postgresql":
+        return "postgresql"
+    if connection.vendor == "sqlite" and _fts_disponible(connection.settings_dict["NAME"]):
+        return "fts5"
+    return None
+
+
+def _frase_fts(clave):
+    return '"' + clave.replace('"', '""') + '"'
+
+
+def _ids_fts(consulta, limite=None):
+    sql = f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s ORDER BY rank"
+    parametros = [consulta]
+    if limite:
+        sql += " LIMIT %s"
+        parametros.append(limite)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+class _Similitud(Func):
+    function = "SIMILARITY"
+    output_field = FloatField()
+
+
+def _condicion_prefijo(clave):
+    if connection.vendor == "postgresql":
+        return Q(clave_busqueda__startswith=clave)
+    # El LIKE de SQLite no distingue mayúsculas y no usa el índice; el rango sí.
+    return Q(clave_busqueda__gte=clave, clave_busqueda__lt=clave + "\uffff")
+
+
+def _condicion_subcadena(clave):
+    if len(clave) >= MINIMO_TRIGRAMA and _motor() == "fts5":
+        return Q(id__in=RawSQL(
+            f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s", [_frase_fts(clave)]
+        ))
+    # En PostgreSQL el LIKE '%...%' lo resuelve el índice GIN de trigramas.
+    return Q(clave_busqueda__contains=clave)
+
+
+def filtrar_animales(queryset, texto):
+    """
+    Restringe `queryset` a los animales cuyo arete o nombre contiene
+    `texto`, sin importar tildes ni mayúsculas. Sirve para listados que
+    conservan su propio orden (y su paginación).
+    """
+    clave = normalizar_busqueda(texto)
+    if not clave:
+        return queryset
+    return queryset.filter(_condicion_subcadena(clave))
+
+
+def _relevancia(animal, clave):
+    arete = normalizar_busqueda(animal.numero_arete)
+    if arete == clave:
+        return 0
+    if arete.startswith(clave):
+        return 1
+    nombre = normalizar_busqueda(animal.nombre)
+    if nombre.startswith(clave) or f" {clave}" in f" {nombre}":
+        return 2
+    return 3
+
+
+def buscar_animales(texto, limite=10, queryset=None):
+    """
+    Devuelve hasta `limite` animales ordenados por relevancia:
+    arete exacto, prefijo de arete, palabra del nombre, subcadena y por
+    último coincidencias aproximadas (errores de tipeo). Cada etapa solo
+    se consulta si la anterior no llenó el cupo.
+    """
+    clave = normalizar_busqueda(texto)
+    if not clave:
+        return []
+    if queryset is None:
+        queryset = Animal.objects.all()
+    queryset = queryset.select_related("finca")
+
+    resultados = list(
+        queryset.filter(_condicion_prefijo(clave)).order_by("clave_busqueda")[:limite]
+    )
+
+    if len(resultados) < limite:
+        vistos = [a.id for a in resultados]
+        resultados += list(
+            queryset.filter(_condicion_subcadena(clave))
+            .exclude(id__in=vistos)
+            .order_by("clave_busqueda")[:limite - len(resultados)]
+        )
+
+    if len(resultados) < limite and len(clave) >= MINIMO_TRIGRAMA:
+        vistos = [a.id for a in resultados]
+        resultados += _aproximados(queryset, clave, vistos, limite - len(resultados))
+
+    # sort es estable: dentro de cada nivel se respeta el orden de la etapa.
+    resultados.sort(key=lambda a: _relevancia(a, clave))
+    return resultados
+
+
+def _aproximados(queryset, clave, excluir, limite):
+    motor = _motor()
+
+    if motor == "postgresql":
+        # El operador % usa el índice GIN y el umbral pg_trgm.similarity_threshold.
+        return list(
+            queryset
+            .filter(RawSQL(
+                "ganaderia_animal.clave_busqueda %% %s", [clave], output_field=BooleanField()
+            ))
+            .exclude(id__in=excluir)
+            .annotate(similitud=_Similitud("clave_busqueda", Value(clave)))
+            .order_by("-similitud", "clave_busqueda")[:limite]
+        )
+
+    if motor == "fts5":
+        # Cualquier trigrama en común; bm25 ordena por cuántos comparten.
+        trigramas = {clave[i:i + 3] for i in range(len(clave) - 2)}
+        consulta = " OR ".join(_frase_fts(t) for t in sorted(trigramas))
+        excluir = set(excluir)
+        ids = [i for i in _ids_fts(consulta, limite + len(excluir)) if i not in excluir]
+        por_id = queryset.in_bulk(ids[:limite])
+        return [por_id[i] for i in ids[:limite] if i in por_id]
+
+    return []
@@ -0,0 +1,188 @@
+# apps/ganaderia/cache.py
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.connection import ConnectionProxy
+
+# Caché que ven todos los workers (ver CACHES en settings): con la
+# memoria de cada proceso una invalidación solo llegaría al que escribe.
+cache = ConnectionProxy(caches, "compartida")
+
+# Marca para "este arete no existe" (caché negativa).
+NO_EXISTE = "__no_existe__"
+
+PREFIJO = "ganaderia:arete"
+LLAVE_GENERACION = f"{PREFIJO}:generacion"
+
+
+def normalizar_arete(numero_arete):
+    # La búsqueda original es numero_arete__iexact.
+    return (numero_arete or "").strip().casefold()
+
+
+class CacheAretes:
+    """
+    Caché de Animal por número de arete en dos niveles:
+
+    1. Un LRU en memoria del proceso con TTL corto, que sirve el caso
+       común (el mismo arete consultado en cada tecla del formulario) sin
+       salir del proceso.
+    2. El caché "compartida" (Redis, o disco local sin REDIS_URL), que
+       ven todos los workers, con el animal ya traído junto a su finca.
+
+    Guardar o borrar un Animal elimina sus llaves (arete nuevo y anterior);
+    cualquier cambio en Finca sube la generación y deja obsoletas todas
+    las entradas. En otros procesos el LRU local puede servir un dato
+    viejo como máximo `ttl_local` segundos.
+    """
+
+    def __init__(self, maximo=2048, ttl_local=5, ttl=300, ttl_negativo=60):
+        self.maximo = maximo
+        self.ttl_local = ttl_local
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, numero_arete):
+        clave = normalizar_arete(numero_arete)
+        if not clave:
+            return None
+
+        valor = self._leer_local(clave)
+        if valor is None:
+            llave = self._llave(clave)
+            valor = cache.get(llave)
+            if valor is None:
+                valor = self._consultar(clave)
+                cache.set(llave, valor, self.ttl_negativo if valor == NO_EXISTE else self.ttl)
+            self._guardar_local(clave, valor)
+
+        if valor == NO_EXISTE:
+            return None
+        # Copia: quien la reciba puede modificarla y guardarla sin tocar la del caché.
+        return copy.copy(valor)
+
+    async def aobtener(self, numero_arete):
+        """
+        obtener() para vistas async: el LRU local se lee sin salir del
+        event loop; el caché de Django y la base, con aget/aset y afirst.
+        """
+        clave = normalizar_arete(numero_arete)
+        if not clave:
+            return None
+
+        valor = self._leer_local(clave)
+        if valor is None:
+            llave = self._llave(clave, await cache.aget_or_set(LLAVE_GENERACION, 0, None))
+            valor = await cache.aget(llave)
+            if valor is None:
+                valor = await self._aconsultar(clave)
+                await cache.aset(llave, valor, self.ttl_negativo if valor == NO_EXISTE else self.ttl)
+            self._guardar_local(clave, valor)
+
+        if valor == NO_EXISTE:
+            return None
+        return copy.copy(valor)
+
+    def invalidar(self, *aretes):
+        claves = {normalizar_arete(a) for a in aretes if a}
+        if not claves:
+            return
+        with self._lock:
+            for clave in claves:
+                self._local.pop(clave, None)
+        generacion = self._generacion()
+        cache.delete_many([self._llave(clave, generacion) for clave in claves])
+
+    def invalidar_todo(self):
+        with self._lock:
+            self._local.clear()
+        try:
+            cache.incr(LLAVE_GENERACION)
+        except ValueError:
+            cache.set(LLAVE_GENERACION, 1, None)
+
+    def _consultar(self, clave):
+        from .models import Animal
+        animal = (
+            Animal.objects.select_related("finca")
+            .filter(numero_arete__iexact=clave)
+            .first()
+        )
+        return animal or NO_EXISTE
+
+    async def _aconsultar(self, clave):
+        from .models import Animal
+        animal = await (
+            Animal.objects.select_related("finca")
+            .filter(numero_arete__iexact=clave)
+            .afirst()
+        )
+        return animal or NO_EXISTE
+
+    def _generacion(self):
+        return cache.get_or_set(LLAVE_GENERACION, 0, None)
+
+    def _llave(self, clave, generacion=None):
+        if generacion is None:
+            generacion = self._generacion()
+        return f"{PREFIJO}:{generacion}:{clave}"
+
+    def _leer_local(self, clave):
+        with self._lock:
+            entrada = self._local.get(clave)
+            if entrada is None:
+                return None
+            valor, vence = entrada
+            if vence < time.monotonic():
+                del self._local[clave]
+                return None
+            self._local.move_to_end(clave)
+            return valor
+
+    def _guardar_local(self, clave, valor):
+        with self._lock:
+            self._local[clave] = (valor, time.monotonic() + self.ttl_local)
+            self._local.move_to_end(clave)
+            while len(self._local) > self.maximo:
+                self._local.popitem(last=False)
+
+
+cache_aretes = CacheAretes()
+
+
+def invalidar_aretes(*aretes):
+    """
+    Invalida ya y otra vez al confirmar la transacción, para que una
+    lectura concurrente no vuelva a guardar la versión anterior.
+    """
+    cache_aretes.invalidar(*aretes)
+    transaction.on_commit(lambda: cache_aretes.invalidar(*aretes))
+
+
+def invalidar_todo():
+    cache_aretes.invalidar_todo()
+    transaction.on_commit(cache_aretes.invalidar_todo)
+
+
+# Perfil completo de animal_detail (AnimalProfileService), también en "compartida".
+PREFIJO_PERFIL = "ganaderia:perfil"
+TTL_PERFIL = 300
+
+
+def llave_perfil(animal_id):
+    return f"{PREFIJO_PERFIL}:{animal_id}"
+
+
+def invalidar_perfiles(*animal_ids):
+    """Igual que invalidar_aretes: ya y al confirmar."""
+    llaves = [llave_perfil(animal_id) for animal_id in set(animal_ids) if animal_id]
+    if not llaves:
+        return
+    cache.delete_many(llaves)
+    transaction.on_commit(lambda: cache.delete_many(llaves))
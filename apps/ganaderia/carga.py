@@ -0,0 +1,145 @@
+# apps/ganaderia/carga.py
+"""
+Prueba de carga de las búsquedas por arete (manage.py carga_busquedas).
+
+Golpea un servidor ya levantado (gunicorn con workers WSGI o uvicorn)
+con `concurrencia` clientes HTTP/1.1 keep-alive sobre asyncio y
+devuelve peticiones por segundo y p50/p95/p99. No usa el cliente de
+pruebas de Django: lo que se mide es el servidor real, con su modelo de
+workers.
+
+La sesión se crea directamente en el SessionStore configurado, así que
+el comando tiene que apuntar a la misma base que el servidor.
+"""
+import asyncio
+import random
+import time
+from importlib import import_module
+from itertools import cycle
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.urls import reverse
+
+from .bench import percentiles
+from .models import Animal
+
+# Vista -> (nombre de URL, parámetro del arete).
+VISTAS = {
+    "buscar_animal": ("ganaderia:buscar_animal", "arete"),
+    "api_animal_info": ("ganaderia:api_animal_info", "arete"),
+    "salud_buscar_animal": ("salud:buscar_animal", "arete"),
+}
+
+
+def crear_sesion(usuario):
+    """Sesión autenticada de `usuario`, como la deja login(); devuelve la llave."""
+    sesion = import_module(settings.SESSION_ENGINE).SessionStore()
+    sesion[SESSION_KEY] = usuario._meta.pk.value_to_string(usuario)
+    sesion[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    sesion[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+    sesion.save()
+    return sesion.session_key
+
+
+def rutas(vistas, muestra=500, fallos=0.1, semilla=1):
+    """Rutas a pedir: aretes reales de la base y una fracción `fallos` que no existe."""
+    azar = random.Random(semilla)
+    aretes = list(Animal.objects.order_by("?").values_list("numero_arete", flat=True)[:muestra])
+    if not aretes:
+        raise ValueError("No hay animales en la base; corra generar_datos primero.")
+    lista = []
+    for i in range(max(muestra, len(aretes))):
+        arete = f"NOEXISTE-{i}" if azar.random() < fallos else aretes[i % len(aretes)]
+        nombre, parametro = VISTAS[vistas[i % len(vistas)]]
+        lista.append(f"{reverse(nombre)}?{urlencode({parametro: arete})}")
+    azar.shuffle(lista)
+    return lista
+
+
+class Resultado:
+    def __init__(self):
+        self.tiempos = []
+        self.errores = 0
+        self.estados = {}
+        self.duracion = 0.0
+
+
+async def _leer_respuesta(lector):
+    linea = await lector.readline()
+    if not linea:
+        raise ConnectionError("el servidor cerró la conexión")
+    estado = int(linea.split()[1])
+    largo, cerrar = 0, False
+    while True:
+        cabecera = await lector.readline()
+        if cabecera in (b"\r\n", b"\n", b""):
+            break
+        nombre, _, valor = cabecera.decode("latin-1").partition(":")
+        nombre = nombre.strip().lower()
+        if nombre == "content-length":
+            largo = int(valor)
+        elif nombre == "connection" and valor.strip().lower() == "close":
+            cerrar = True
+    await lector.readexactly(largo)
+    return estado, cerrar
+
+
+async def _cliente(host, puerto, pendientes, cabeceras, fin, resultado):
+    conexion = None
+    while time.perf_counter() < fin:
+        if conexion is None:
+            conexion = await asyncio.open_connection(host, puerto)
+        lector, escritor = conexion
+        ruta = next(pendientes)
+        inicio = time.perf_counter()
+        try:
+            escritor.write(f"GET {ruta} HTTP/1.1\r\n{cabeceras}\r\n".encode())
+            await escritor.drain()
+            estado, cerrar = await _leer_respuesta(lector)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            resultado.errores += 1
+            escritor.close()
+            conexion = None
+            continue
+        resultado.tiempos.append((time.perf_counter() - inicio) * 1000)
+        resultado.estados[estado] = resultado.estados.get(estado, 0) + 1
+        if cerrar:
+            escritor.close()
+            conexion = None
+    if conexion is not None:
+        conexion[1].close()
+
+
+async def _correr(url, lista, llave_sesion, concurrencia, segundos):
+    partes = urlsplit(url)
+    host, puerto = partes.hostname, partes.port or 80
+    cabeceras = (
+        f"Host: {partes.netloc}\r\n"
+        f"Cookie: {settings.SESSION_COOKIE_NAME}={llave_sesion}\r\n"
+        "Accept: application/json\r\n"
+        "Connection: keep-alive\r\n"
+    )
+    resultado = Resultado()
+    pendientes = cycle(lista)
+    inicio = time.perf_counter()
+    fin = inicio + segundos
+    await asyncio.gather(*(
+        _cliente(host, puerto, pendientes, cabeceras, fin, resultado) for _ in range(concurrencia)
+    ))
+    resultado.duracion = time.perf_counter() - inicio
+    return resultado
+
+
+def correr(url, lista, llave_sesion, concurrencia=50, segundos=10):
+    resultado = asyncio.run(_correr(url, lista, llave_sesion, concurrencia, segundos))
+    informe = {
+        "peticiones": len(resultado.tiempos),
+        "por_segundo": len(resultado.tiempos) / resultado.duracion,
+        "errores": resultado.errores,
+        "estados": {str(estado): n for estado, n in sorted(resultado.estados.items())},
+    }
+    if resultado.tiempos:
+        informe.update(percentiles(resultado.tiempos))
+    return {campo: round(valor, 2) if isinstance(valor, float) else valor for campo, valor in informe.items()}
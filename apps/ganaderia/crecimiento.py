@@ -0,0 +1,311 @@
+# apps/ganaderia/crecimiento.py
+"""
+Ganancia diaria de peso (GDP) y curvas de crecimiento a partir de Pesaje.
+
+Las series de una finca se leen con una sola consulta en columnas
+(values_list -> arreglos de NumPy) y todo se calcula por grupos con
+bincount/searchsorted, sin recorrer animal por animal:
+
+- GDP: pendiente de mínimos cuadrados del peso contra la fecha.
+- Peso a edades estándar (205 y 365 días), interpolado entre los dos
+  pesajes que rodean esa edad; no se extrapola.
+- Percentiles de referencia por raza y tramo de edad, calculados sobre
+  todo el hato.
+
+El reporte se guarda en caché por finca con un sello de los datos de esa
+finca en la clave (animales, su última modificación, cantidad de pesajes
+y el último id), así que un pesaje nuevo lo invalida y los de otras
+fincas no. La referencia del hato va en su propia caché, por versiones.
+"""
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Window
+from django.db.models.functions import Lower, RowNumber, Trim
+from django.utils import timezone
+
+from .models import Animal, Pesaje, VersionDatos, normalizar_busqueda
+
+EDADES_ESTANDAR = (205, 365)
+PERCENTILES = (10, 50, 90)
+ANCHO_TRAMO = 30            # días de edad por punto de la curva de referencia
+MINIMO_REFERENCIA = 5       # pesajes por (raza, tramo) para publicar percentiles
+MAXIMO_REFERENCIA = 50000   # pesajes más recientes por raza que entran en la referencia
+COHORTES = (
+    (0, '0-205 días'),
+    (205, '205-365 días'),
+    (365, '1-2 años'),
+    (730, 'Más de 2 años'),
+)
+TTL_REPORTE = 60 * 60
+SIN_RAZA = 'sin raza'
+
+
+def _clave_raza(raza):
+    return normalizar_busqueda(raza) or SIN_RAZA
+
+
+def _numero(valor, decimales=3):
+    return None if np.isnan(valor) else round(float(valor), decimales)
+
+
+def _redondear(arreglo, decimales=3):
+    return [_numero(v, decimales) for v in arreglo]
+
+
+def _fechas(valores):
+    return np.array([np.datetime64(v, 'D') if v else np.datetime64('NaT') for v in valores],
+                    dtype='datetime64[D]')
+
+
+def _dias(desde, hasta):
+    """hasta - desde en días como float; NaN si falta alguna fecha."""
+    dias = (hasta - desde).astype('float64')
+    dias[np.isnat(desde) | np.isnat(hasta)] = np.nan
+    return dias
+
+
+def cargar_series(queryset):
+    """
+    (animal_id, fecha, peso) ordenados por animal y fecha, en arreglos.
+    `queryset` es un queryset de Pesaje ya filtrado.
+    """
+    filas = list(queryset.order_by('animal_id', 'fecha', 'id').values_list('animal_id', 'fecha', 'peso'))
+    if not filas:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype='datetime64[D]'), np.empty(0)
+    animal_ids, fechas, pesos = zip(*filas)
+    return np.array(animal_ids, dtype=np.int64), _fechas(fechas), np.array(pesos, dtype='float64')
+
+
+def ganancia_diaria(grupo, dias, pesos, n_grupos):
+    """Pendiente (kg/día) por grupo; NaN con menos de dos fechas distintas."""
+    n = np.bincount(grupo, minlength=n_grupos).astype('float64')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media_x = np.bincount(grupo, dias, n_grupos) / n
+        media_y = np.bincount(grupo, pesos, n_grupos) / n
+        dx = dias - media_x[grupo]
+        sxx = np.bincount(grupo, dx * dx, n_grupos)
+        sxy = np.bincount(grupo, dx * (pesos - media_y[grupo]), n_grupos)
+        return np.where(sxx > 0, sxy / np.where(sxx > 0, sxx, 1), np.nan)
+
+
+def peso_a_edad(grupo, edades, pesos, n_grupos, edad):
+    """
+    Peso interpolado a `edad` días por grupo. Las filas deben venir
+    ordenadas por grupo y edad; las que no tienen edad (o la tienen
+    negativa por un error de fechas) se ignoran.
+    """
+    resultado = np.full(n_grupos, np.nan)
+    validas = np.nan_to_num(edades, nan=-1) >= 0
+    grupo, edades, pesos = grupo[validas], edades[validas], pesos[validas]
+    if not len(grupo):
+        return resultado
+
+    escala = edades.max() + edad + 1
+    clave = grupo * escala + edades
+    objetivo = np.arange(n_grupos) * escala + edad
+    derecha = np.searchsorted(clave, objetivo)
+    izquierda = derecha - 1
+    d = np.clip(derecha, 0, len(clave) - 1)
+    i = np.clip(izquierda, 0, len(clave) - 1)
+    grupos = np.arange(n_grupos)
+
+    exacto = (derecha < len(clave)) & (grupo[d] == grupos) & (edades[d] == edad)
+    entre = (~exacto & (derecha < len(clave)) & (izquierda >= 0)
+             & (grupo[d] == grupos) & (grupo[i] == grupos))
+
+    resultado[exacto] = pesos[d[exacto]]
+    fraccion = (edad - edades[i[entre]]) / (edades[d[entre]] - edades[i[entre]])
+    resultado[entre] = pesos[i[entre]] + fraccion * (pesos[d[entre]] - pesos[i[entre]])
+    return resultado
+
+
+def percentiles_por_grupo(grupo, valores, n_grupos, percentiles=PERCENTILES):
+    """
+    Percentiles (interpolación lineal, como np.percentile) de `valores`
+    dentro de cada grupo. Devuelve (n por grupo, matriz n_grupos x percentiles).
+    """
+    orden = np.lexsort((valores, grupo))
+    valores = valores[orden]
+    n = np.bincount(grupo, minlength=n_grupos)
+    inicio = np.concatenate(([0], np.cumsum(n)[:-1]))
+    resultado = np.full((n_grupos, len(percentiles)), np.nan)
+    con_datos = n > 0
+    for j, p in enumerate(percentiles):
+        posicion = inicio[con_datos] + (p / 100) * (n[con_datos] - 1)
+        abajo = np.floor(posicion).astype(np.int64)
+        arriba = np.ceil(posicion).astype(np.int64)
+        resultado[con_datos, j] = valores[abajo] + (posicion - abajo) * (valores[arriba] - valores[abajo])
+    return n, resultado
+
+
+def referencia_por_raza():
+    """
+    Curvas de referencia del hato completo: {raza: {"n", "percentiles"}},
+    con una fila por tramo de ANCHO_TRAMO días de edad. De cada raza entran
+    a lo sumo MAXIMO_REFERENCIA pesajes, los más recientes (el tope lo pone
+    la base con ROW_NUMBER), para no traer todo el hato a memoria.
+    """
+    filas = list(
+        Pesaje.objects.filter(animal__fecha_nacimiento__isnull=False)
+        .annotate(posicion=Window(RowNumber(), partition_by=Lower(Trim('animal__raza')), order_by=F('id').desc()))
+        .filter(posicion__lte=MAXIMO_REFERENCIA)
+        .values_list('animal__raza', 'animal__fecha_nacimiento', 'fecha', 'peso')
+    )
+    if not filas:
+        return {}
+    razas, nacimientos, fechas, pesos = zip(*filas)
+    edades = _dias(_fechas(nacimientos), _fechas(fechas))
+    pesos = np.array(pesos, dtype='float64')
+    nombres, raza = np.unique([_clave_raza(r) for r in razas], return_inverse=True)
+
+    validas = edades >= 0
+    tramo = (edades[validas] // ANCHO_TRAMO).astype(np.int64)
+    raza, pesos = raza[validas], pesos[validas]
+    if not len(tramo):
+        return {}
+    n_tramos = int(tramo.max()) + 1
+    n, bandas = percentiles_por_grupo(raza * n_tramos + tramo, pesos, len(nombres) * n_tramos)
+
+    referencia = {}
+    for r, nombre in enumerate(nombres):
+        filas_raza = slice(r * n_tramos, (r + 1) * n_tramos)
+        referencia[str(nombre)] = {
+            'n': n[filas_raza],
+            'percentiles': np.where((n[filas_raza] >= MINIMO_REFERENCIA)[:, None], bandas[filas_raza], np.nan),
+        }
+    return referencia
+
+
+def _referencia_en_cache(versiones):
+    clave = 'ganaderia:crecimiento:referencia:{}:{}'.format(*versiones)
+    referencia = cache.get(clave)
+    if referencia is None:
+        referencia = referencia_por_raza()
+        cache.set(clave, referencia, TTL_REPORTE)
+    return referencia
+
+
+def calcular_reporte(finca, referencia, hoy=None):
+    """Reporte de crecimiento de los animales que están hoy en `finca`."""
+    hoy = np.datetime64(hoy or timezone.localdate(), 'D')
+    animal_ids, fechas, pesos = cargar_series(Pesaje.objects.filter(animal__finca=finca))
+    ids, grupo = np.unique(animal_ids, return_inverse=True)
+    n_grupos = len(ids)
+
+    datos = {
+        fila[0]: fila for fila in
+        Animal.objects.filter(pk__in=ids.tolist()).values_list('id', 'numero_arete', 'nombre', 'raza', 'fecha_nacimiento')
+    }
+    nacimiento = _fechas([datos[i][4] for i in ids.tolist()])
+    razas = [_clave_raza(datos[i][3]) for i in ids.tolist()]
+
+    dias = (fechas - fechas.min()).astype('float64') if len(fechas) else np.empty(0)
+    edades = _dias(nacimiento[grupo], fechas)
+    gdp = ganancia_diaria(grupo, dias, pesos, n_grupos)
+    pesos_estandar = {edad: peso_a_edad(grupo, edades, pesos, n_grupos, edad) for edad in EDADES_ESTANDAR}
+
+    n = np.bincount(grupo, minlength=n_grupos)
+    ultimo = np.cumsum(n) - 1
+    ultimo_peso = pesos[ultimo]
+    ultima_edad = edades[ultimo]
+
+    # Posición del último pesaje frente a la banda P10-P90 de su raza (un paso por raza).
+    bajo, alto = PERCENTILES.index(10), PERCENTILES.index(90)
+    banda = np.full(n_grupos, None, dtype=object)
+    razas_arr = np.array(razas, dtype=object)
+    for nombre, ref in referencia.items():
+        de_raza = razas_arr == nombre
+        if not de_raza.any():
+            continue
+        edad = ultima_edad[de_raza]
+        tramo = np.where(np.isnan(edad) | (edad < 0), -1, np.nan_to_num(edad) // ANCHO_TRAMO).astype(np.int64)
+        tramo[tramo >= len(ref['n'])] = -1
+        limites = ref['percentiles'][np.clip(tramo, 0, None)]
+        limites[tramo < 0] = np.nan
+        peso = ultimo_peso[de_raza]
+        con_banda = ~np.isnan(limites[:, bajo])
+        banda[de_raza] = np.where(
+            ~con_banda, None,
+            np.where(peso < limites[:, bajo], 'bajo', np.where(peso > limites[:, alto], 'alto', 'normal')),
+        )
+
+    # Cohortes por edad actual.
+    edad_actual = _dias(nacimiento, np.full(n_grupos, hoy))
+    limites = np.array([desde for desde, _ in COHORTES[1:]])
+    cohorte = np.where(np.isnan(edad_actual), len(COHORTES), np.digitize(np.nan_to_num(edad_actual), limites))
+    con_gdp = ~np.isnan(gdp)
+    animales_cohorte = np.bincount(cohorte, minlength=len(COHORTES) + 1)
+    con_gdp_cohorte = np.bincount(cohorte[con_gdp], minlength=len(COHORTES) + 1)
+    suma_cohorte = np.bincount(cohorte[con_gdp], gdp[con_gdp], minlength=len(COHORTES) + 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        promedio_cohorte = suma_cohorte / con_gdp_cohorte
+    etiquetas = [nombre for _, nombre in COHORTES] + ['Sin fecha de nacimiento']
+
+    gdp_r = _redondear(gdp)
+    ultimo_r = _redondear(ultimo_peso, 1)
+    estandar_r = {edad: _redondear(valores, 1) for edad, valores in pesos_estandar.items()}
+
+    return {
+        'finca': {'id': finca.pk, 'nombre': finca.nombre},
+        'generado_en': timezone.now().isoformat(),
+        'resumen': {
+            'animales': n_grupos,
+            'pesajes': int(len(pesos)),
+            'con_gdp': int(con_gdp.sum()),
+            'gdp_promedio': _numero(gdp[con_gdp].mean()) if con_gdp.any() else None,
+            'gdp_mediana': _numero(np.median(gdp[con_gdp])) if con_gdp.any() else None,
+        },
+        'cohortes': [
+            {'cohorte': etiquetas[c], 'animales': int(animales_cohorte[c]),
+             'con_gdp': int(con_gdp_cohorte[c]), 'gdp_promedio': _numero(promedio_cohorte[c])}
+            for c in range(len(etiquetas)) if animales_cohorte[c]
+        ],
+        'animales': [
+            {
+                'id': int(animal_id),
+                'arete': datos[animal_id][1],
+                'nombre': datos[animal_id][2],
+                'raza': razas[k],
+                'pesajes': int(n[k]),
+                'ultimo_peso': ultimo_r[k],
+                'ultima_fecha': str(fechas[ultimo[k]]),
+                'gdp': gdp_r[k],
+                **{f'peso_{edad}': estandar_r[edad][k] for edad in EDADES_ESTANDAR},
+                'banda': banda[k],
+            }
+            for k, animal_id in enumerate(ids.tolist())
+        ],
+        'curvas': {
+            raza: [
+                {'edad_dias': tramo * ANCHO_TRAMO, 'n': int(ref['n'][tramo]),
+                 **{f'p{p}': v for p, v in zip(PERCENTILES, _redondear(ref['percentiles'][tramo], 1))}}
+                for tramo in range(len(ref['n'])) if not np.isnan(ref['percentiles'][tramo, 0])
+            ]
+            for raza, ref in referencia.items() if raza in set(razas)
+        },
+    }
+
+
+def _sello_finca(finca):
+    sello = Animal.objects.filter(finca=finca).aggregate(
+        animales=Count('id', distinct=True),
+        actualizado=Max('actualizado_en'),
+        n_pesajes=Count('pesajes'),
+        ultimo_pesaje=Max('pesajes__id'),
+    )
+    return '{animales}:{actualizado:%Y%m%d%H%M%S%f}:{n_pesajes}:{ultimo_pesaje}'.format(**sello) if sello['animales'] else '0'
+
+
+def reporte_finca(finca):
+    """
+    calcular_reporte con caché por finca, invalidada por las escrituras en
+    los animales y pesajes de esa finca. La referencia del hato que trae
+    puede quedar hasta TTL_REPORTE atrasada frente a las demás fincas.
+    """
+    clave = 'ganaderia:crecimiento:{}:{}'.format(finca.pk, _sello_finca(finca))
+    reporte = cache.get(clave)
+    if reporte is None:
+        versiones = tuple(VersionDatos.objects.versiones(Pesaje, Animal).values())
+        reporte = calcular_reporte(finca, _referencia_en_cache(versiones))
+        cache.set(clave, reporte, TTL_REPORTE)
+    return reporte
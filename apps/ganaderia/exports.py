@@ -0,0 +1,223 @@
+# apps/ganaderia/exports.py
+import csv
+import json
+import tempfile
+from datetime import date, datetime
+
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Filas que se traen por cada viaje a la base de datos. En PostgreSQL
+# .iterator() usa un cursor del lado del servidor, así que nunca se carga
+# la tabla completa en memoria.
+CHUNK_SIZE = 2000
+
+
+def escribir_xlsx(destino, titulo, encabezados, filas):
+    """
+    Escribe un libro de una sola hoja en modo write_only: openpyxl vuelca
+    cada fila a disco a medida que llega, por lo que la memoria no crece
+    con la cantidad de registros.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=titulo)
+    ws.append(encabezados)
+    for fila in filas:
+        ws.append(fila)
+    wb.save(destino)
+
+
+def xlsx_response(nombre_archivo, titulo, encabezados, filas):
+    """
+    Construye el libro en un archivo temporal y lo envía por bloques con
+    FileResponse (StreamingHttpResponse); el archivo se elimina al cerrarse
+    la respuesta.
+    """
+    archivo = tempfile.TemporaryFile()
+    try:
+        escribir_xlsx(archivo, titulo, encabezados, filas)
+    except Exception:
+        archivo.close()
+        raise
+    archivo.seek(0)
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=nombre_archivo,
+        content_type=XLSX_CONTENT_TYPE,
+    )
+
+
+ENCABEZADOS_PESAJES = ["Fecha", "Arete", "Nombre", "Peso (kg)", "Finca"]
+
+
+def filas_pesajes(queryset):
+    return queryset.values_list(
+        "fecha", "animal__numero_arete", "animal__nombre", "peso", "finca__nombre"
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+ENCABEZADOS_PARTOS = [
+    "Madre", "Fecha Nacimiento Cría", "Nombre Cría",
+    "Arete Cría", "Finca", "Raza", "Sexo", "Peso (kg)"
+]
+
+
+def filas_partos(queryset):
+    datos = queryset.values_list(
+        "madre__numero_arete", "fecha_nacimiento", "cria__nombre",
+        "cria__numero_arete", "finca__nombre", "raza", "sexo", "peso",
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+    for madre, fecha, nombre_cria, arete_cria, finca, raza, sexo, peso in datos:
+        yield [
+            madre,
+            fecha.strftime("%d/%m/%Y"),
+            nombre_cria,
+            arete_cria,
+            finca,
+            raza,
+            sexo,
+            peso,
+        ]
+
+
+ENCABEZADOS_PRODUCCION = ["Fecha", "Arete", "Nombre", "Finca", "AM", "PM", "Total Diario"]
+
+
+def filas_produccion(queryset):
+    datos = queryset.values_list(
+        "fecha", "animal__numero_arete", "animal__nombre",
+        "finca__nombre", "peso_am", "peso_pm",
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+    for fecha, arete, nombre, finca, peso_am, peso_pm in datos:
+        am = peso_am or 0
+        pm = peso_pm or 0
+        yield [fecha, arete, nombre, finca, am, pm, am + pm]
+
+
+# -------------------------------
+# CSV / NDJSON
+# -------------------------------
+# Cada lista de columnas es [(nombre_columna, lookup)]; el nombre es el
+# encabezado CSV y la llave JSON, el lookup va directo a values_list().
+
+COLUMNAS_PESAJES = [
+    ("id", "id"),
+    ("fecha", "fecha"),
+    ("animal_id", "animal_id"),
+    ("arete", "animal__numero_arete"),
+    ("nombre", "animal__nombre"),
+    ("peso", "peso"),
+    ("finca_id", "finca_id"),
+    ("finca", "finca__nombre"),
+]
+
+COLUMNAS_PRODUCCION = [
+    ("id", "id"),
+    ("fecha", "fecha"),
+    ("animal_id", "animal_id"),
+    ("arete", "animal__numero_arete"),
+    ("nombre", "animal__nombre"),
+    ("finca_id", "finca_id"),
+    ("finca", "finca__nombre"),
+    ("peso_am", "peso_am"),
+    ("peso_pm", "peso_pm"),
+]
+
+COLUMNAS_PARTOS = [
+    ("id", "id"),
+    ("fecha_nacimiento", "fecha_nacimiento"),
+    ("madre_id", "madre_id"),
+    ("madre_arete", "madre__numero_arete"),
+    ("cria_id", "cria_id"),
+    ("cria_arete", "cria__numero_arete"),
+    ("cria_nombre", "cria__nombre"),
+    ("finca_id", "finca_id"),
+    ("finca", "finca__nombre"),
+    ("raza", "raza"),
+    ("sexo", "sexo"),
+    ("peso", "peso"),
+]
+
+COLUMNAS_EVENTOS_SALIDA = [
+    ("id", "id"),
+    ("fecha", "fecha"),
+    ("tipo_evento", "tipo_evento"),
+    ("animal_id", "animal_id"),
+    ("arete", "animal__numero_arete"),
+    ("nombre", "animal__nombre"),
+    ("responsable_id", "responsable_id"),
+    ("observaciones", "observaciones"),
+]
+
+COLUMNAS_TRASLADOS = [
+    ("id", "id"),
+    ("fecha", "fecha"),
+    ("animal_id", "animal_id"),
+    ("arete", "animal__numero_arete"),
+    ("finca_origen_id", "finca_origen_id"),
+    ("finca_origen", "finca_origen__nombre"),
+    ("finca_destino_id", "finca_destino_id"),
+    ("finca_destino", "finca_destino__nombre"),
+    ("usuario_id", "usuario_id"),
+]
+
+FORMATOS_DATOS = ("csv", "ndjson")
+
+
+class _Eco:
+    """Buffer mínimo para csv.writer: devuelve la línea en vez de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def _valor_plano(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def _filas_datos(queryset, columnas):
+    lookups = [lookup for _, lookup in columnas]
+    return queryset.values_list(*lookups).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _generar_csv(queryset, columnas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow([nombre for nombre, _ in columnas])
+    for fila in _filas_datos(queryset, columnas):
+        yield escritor.writerow(["" if v is None else _valor_plano(v) for v in fila])
+
+
+def _generar_ndjson(queryset, columnas):
+    nombres = [nombre for nombre, _ in columnas]
+    for fila in _filas_datos(queryset, columnas):
+        registro = dict(zip(nombres, map(_valor_plano, fila)))
+        yield json.dumps(registro, ensure_ascii=False) + "\n"
+
+
+def datos_response(request, nombre_base, queryset, columnas):
+    """
+    Si la petición trae ?format=csv|ndjson devuelve el queryset (ya
+    filtrado por la vista) como una respuesta en streaming; si no, None
+    y la vista sigue con su render HTML.
+    """
+    formato = request.GET.get("format")
+    if formato not in FORMATOS_DATOS:
+        return None
+
+    if formato == "csv":
+        contenido = _generar_csv(queryset, columnas)
+        content_type = "text/csv; charset=utf-8"
+    else:
+        contenido = _generar_ndjson(queryset, columnas)
+        content_type = "application/x-ndjson; charset=utf-8"
+
+    response = StreamingHttpResponse(contenido, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{nombre_base}.{formato}"'
+    return response
@@ -40,9 +40,8 @@ class PesajeForm(forms.Form):
         if not numero:
             raise forms.ValidationError("Debe ingresar un número de arete.")
 
-        try:
-            animal = Animal.objects.get_by_arete(numero)
-        except Animal.DoesNotExist:
+        animal = Animal.objects.get_by_arete(numero)
+        if not animal:
             raise forms.ValidationError("El número de arete no corresponde a ningún animal registrado.")
 
         cleaned["animal"] = animal
@@ -134,9 +133,8 @@ class ProduccionForm(forms.ModelForm):
         if not numero:
             raise forms.ValidationError("Debe ingresar un número de arete")
 
-        try:
-            animal = Animal.objects.get(numero_arete=numero)
-        except Animal.DoesNotExist:
+        animal = Animal.objects.get_by_arete(numero)
+        if not animal:
             raise forms.ValidationError(
                 "El número de arete ingresado no corresponde a ningún animal registrado"
             )
@@ -191,3 +189,13 @@ class TrasladoForm(forms.Form):
         if not items:
             raise forms.ValidationError("Debe ingresar al menos un arete")
         return items
+
+
+class ImportarPlanillaForm(forms.Form):
+    archivo = forms.FileField(label="Planilla (CSV o XLSX)")
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data["archivo"]
+        if not archivo.name.lower().endswith((".csv", ".xlsx")):
+            raise forms.ValidationError("El archivo debe ser .csv o .xlsx")
+        return archivo
@@ -0,0 +1,106 @@
+# apps/ganaderia/genealogia.py
+"""
+Tabla de cierre de Animal.madre: una fila (ancestro, descendiente,
+profundidad) por cada par de la línea materna, así "todos los
+descendientes" o "la línea hasta la 6.ª generación" son una sola
+búsqueda indexada en vez de una consulta por generación.
+
+- mover() mantiene la tabla al crear un animal o cambiar su madre y
+  validar_madre() rechaza ciclos antes de guardar (señales de Animal).
+- desenlazar() corta los caminos que pasaban por un animal que se borra,
+  porque el SET_NULL de sus crías no dispara señales.
+- SQL_CIERRE / sql_linea() recorren madre_id con WITH RECURSIVE: la
+  primera reconstruye la tabla (reconstruir_genealogia) y la segunda es
+  la alternativa de AnimalQuerySet cuando no se quiere depender de ella.
+"""
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from .models import Genealogia, VersionDatos
+
+# Tope de generaciones para el recorrido recursivo (protege de ciclos en datos viejos).
+GENERACIONES_MAXIMAS = 50
+
+SQL_CIERRE = """
+    INSERT INTO ganaderia_genealogia (ancestro_id, descendiente_id, profundidad)
+    WITH RECURSIVE cierre (ancestro_id, descendiente_id, profundidad) AS (
+        SELECT madre_id, id, 1 FROM ganaderia_animal WHERE madre_id IS NOT NULL
+        UNION ALL
+        SELECT a.madre_id, c.descendiente_id, c.profundidad + 1
+        FROM cierre c JOIN ganaderia_animal a ON a.id = c.ancestro_id
+        WHERE a.madre_id IS NOT NULL AND c.profundidad < %s
+    )
+    SELECT ancestro_id, descendiente_id, MIN(profundidad)
+    FROM cierre GROUP BY ancestro_id, descendiente_id
+"""
+
+
+def sql_linea(hacia_ancestros, profundidad=None):
+    """
+    (sql, tope): el SQL toma los parámetros (animal_id, tope) y devuelve
+    los ids de la línea del animal, hacia arriba (madres) o abajo (crías).
+    """
+    if hacia_ancestros:
+        inicio = "SELECT madre_id, 1 FROM ganaderia_animal WHERE id = %s AND madre_id IS NOT NULL"
+        paso = ("SELECT a.madre_id, l.profundidad + 1 FROM linea l JOIN ganaderia_animal a ON a.id = l.id "
+                "WHERE a.madre_id IS NOT NULL AND l.profundidad < %s")
+    else:
+        inicio = "SELECT id, 1 FROM ganaderia_animal WHERE madre_id = %s"
+        paso = ("SELECT a.id, l.profundidad + 1 FROM linea l JOIN ganaderia_animal a ON a.madre_id = l.id "
+                "WHERE l.profundidad < %s")
+    sql = f"WITH RECURSIVE linea (id, profundidad) AS ({inicio} UNION ALL {paso}) SELECT id FROM linea"
+    return sql, min(profundidad or GENERACIONES_MAXIMAS, GENERACIONES_MAXIMAS)
+
+
+def validar_madre(animal_id, madre_id):
+    if madre_id is not None and (
+        madre_id == animal_id
+        or Genealogia.objects.filter(ancestro_id=animal_id, descendiente_id=madre_id).exists()
+    ):
+        raise ValidationError("La madre no puede ser el mismo animal ni una de sus descendientes.")
+
+
+@transaction.atomic
+def mover(animal_id, madre_id):
+    """
+    Deja al animal (con todo su subárbol) colgando de `madre_id`, o suelto
+    si es None. Sirve igual para un animal nuevo que para un cambio de madre.
+    """
+    subarbol = {animal_id: 0}
+    subarbol.update(
+        Genealogia.objects.filter(ancestro_id=animal_id).values_list('descendiente_id', 'profundidad')
+    )
+
+    Genealogia.objects.filter(descendiente_id__in=subarbol).exclude(ancestro_id__in=subarbol).delete()
+    if madre_id is None:
+        return
+
+    ancestros = {madre_id: 0}
+    ancestros.update(
+        Genealogia.objects.filter(descendiente_id=madre_id).values_list('ancestro_id', 'profundidad')
+    )
+    Genealogia.objects.bulk_create([
+        Genealogia(ancestro_id=ancestro, descendiente_id=descendiente, profundidad=arriba + abajo + 1)
+        for ancestro, arriba in ancestros.items()
+        for descendiente, abajo in subarbol.items()
+    ], batch_size=1000)
+
+
+def desenlazar(animal_id):
+    """Antes de borrar un animal: sus ancestros dejan de serlo de sus descendientes."""
+    # Listas y no subconsultas: MySQL no borra de una tabla que lee en la misma sentencia.
+    ancestros = list(Genealogia.objects.filter(descendiente_id=animal_id).values_list('ancestro_id', flat=True))
+    descendientes = list(Genealogia.objects.filter(ancestro_id=animal_id).values_list('descendiente_id', flat=True))
+    if not ancestros or not descendientes:
+        return
+    Genealogia.objects.filter(ancestro_id__in=ancestros, descendiente_id__in=descendientes).delete()
+
+
+@transaction.atomic
+def reconstruir():
+    """Rehace la tabla completa con un INSERT ... WITH RECURSIVE. Devuelve las filas."""
+    Genealogia.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(SQL_CIERRE, [GENERACIONES_MAXIMAS])
+    VersionDatos.objects.incrementar_al_confirmar(Genealogia)
+    return Genealogia.objects.count()
@@ -0,0 +1,370 @@
+# apps/ganaderia/generador.py
+"""
+Generador de datos sintéticos a escala (generar_datos, seed_animales, bench).
+
+Cada finca se simula por separado con su propio random.Random sembrado
+con (semilla, código de finca): la misma semilla da el mismo hato aunque
+las fincas se generen en otro orden o en varios procesos. La simulación
+sigue el ciclo del hato para que los datos sean coherentes entre sí:
+
+- Hembras que paren cada 12-14 meses desde los ~2 años; cada parto trae
+  su cría (con madre), su inseminación ~283 días antes y la confirmación.
+- Ordeño diario (AM y PM en la misma fila) durante la lactancia, con
+  curva de Wood, y pesajes mensuales con curva de crecimiento.
+- Eventos sanitarios, llegadas desde otra finca (Traslado) y salidas
+  (EventoSalida) que cortan el historial del animal.
+
+Todo se inserta con bulk_create por lotes, una transacción por finca. Como
+bulk_create no dispara señales, al final se reconstruyen resumen,
+rollups, genealogía, lactancias y últimos datos con sus comandos.
+"""
+import math
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time, timedelta
+from io import StringIO
+from multiprocessing import get_context
+
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from apps.finca.models import Finca
+from apps.salud.models import ConfirmacionGestacion, EventoSanitario, Inseminacion
+from apps.users.models import Rol, User
+
+from .cache import invalidar_todo
+from .models import (
+    Animal, EventoSalida, Genealogia, Lactancia, Parto, Pesaje, ProduccionLeche,
+    ProduccionMensualAnimal, Traslado, VersionDatos, clave_busqueda_para,
+)
+
+NOMBRES_HEMBRAS = ['Bella', 'Luna', 'Estrella', 'Paloma', 'Rosa', 'Margarita', 'Dalia', 'Camila',
+                   'Lucero', 'Princesa', 'Reina', 'Dulce', 'Canela', 'Morena', 'Pinta', 'Ñata']
+NOMBRES_MACHOS = ['Toro', 'Zeus', 'Thor', 'Rocky', 'Max', 'Bruno', 'Tornado', 'Ñandú']
+RAZAS = ['Holstein', 'Jersey', 'Brahman', 'Normando', 'Gyr', 'Simmental']
+DIAGNOSTICOS = [('Mastitis', 'Antibiótico intramamario'), ('Cojera', 'Arreglo de pezuñas'),
+                ('Fiebre de leche', 'Calcio intravenoso'), ('Parásitos', 'Desparasitación'),
+                ('Neumonía', 'Antibiótico sistémico')]
+SALIDAS = [('venta', 'vendido', 0.6), ('descarte', 'inactivo', 0.25), ('muerte', 'muerto', 0.15)]
+
+GESTACION = 283
+LACTANCIA = 305
+LOTE = 1000
+
+# Orden de borrado para limpiar(): primero lo que apunta a Animal.
+MODELOS_GENERADOS = (
+    ConfirmacionGestacion, Inseminacion, EventoSanitario, EventoSalida, Traslado, Parto, Pesaje,
+    ProduccionLeche, ProduccionMensualAnimal, Lactancia, Genealogia, Animal,
+)
+
+
+class Plan:
+    """Parámetros comunes a todas las fincas de una corrida."""
+
+    def __init__(self, animales_por_finca, dias, semilla, usuario_id, fincas_ids, lote=LOTE, hoy=None):
+        self.animales_por_finca = animales_por_finca
+        self.dias = dias
+        self.semilla = semilla
+        self.usuario_id = usuario_id
+        self.fincas_ids = fincas_ids
+        self.lote = lote
+        self.hoy = hoy or timezone.localdate()
+        self.inicio = self.hoy - timedelta(days=dias)
+
+
+class Simulado:
+    """Un animal antes de insertarse."""
+
+    def __init__(self, arete, nombre, sexo, raza, nacimiento, madre=None):
+        self.arete = arete
+        self.nombre = nombre
+        self.sexo = sexo
+        self.raza = raza
+        self.nacimiento = nacimiento
+        self.madre = madre
+        self.partos = []          # (fecha, cría Simulado o None)
+        self.salida = None        # (fecha, tipo_evento)
+        self.llegada = None       # (fecha, finca de origen)
+        self.estado = 'activo'
+        self.id = None
+
+    @property
+    def fin(self):
+        return self.salida[0] if self.salida else None
+
+
+def crear_fincas(cantidad, prefijo="GEN"):
+    """Fincas GEN001..GENnnn; reutiliza las que ya existan con ese código."""
+    codigos = [f"{prefijo}{i + 1:03d}" for i in range(cantidad)]
+    existentes = {f.codigo: f for f in Finca.objects.filter(codigo__in=codigos)}
+    nuevas = [
+        Finca(nombre=f"Finca {prefijo.title()} {i + 1}", codigo=codigo, ubicacion="Colombia")
+        for i, codigo in enumerate(codigos) if codigo not in existentes
+    ]
+    Finca.objects.bulk_create(nuevas)
+    return list(Finca.objects.filter(codigo__in=codigos).order_by('codigo'))
+
+
+def usuario_generador():
+    """Responsable de inseminaciones, partos y traslados generados."""
+    usuario = User.objects.filter(cedula="generador").first()
+    if usuario is None:
+        rol, _ = Rol.objects.get_or_create(nombre_rol="Gerente")
+        usuario = User.objects.create_user(cedula="generador", email="generador@agrotiquiza.local", rol=rol)
+    return usuario
+
+
+def _fecha_entre(azar, desde, hasta):
+    return desde + timedelta(days=azar.randint(0, max((hasta - desde).days, 0)))
+
+
+def simular_finca(finca, plan):
+    """Hato de `plan.animales_por_finca` animales con madre, partos, llegadas y salidas."""
+    azar = random.Random(f"{plan.semilla}:{finca.codigo}")
+    prefijo = finca.codigo or f"F{finca.pk}"
+    otras = [f for f in plan.fincas_ids if f != finca.pk]
+    objetivo = plan.animales_por_finca
+    animales = []
+
+    def nuevo(nacimiento, sexo=None, madre=None):
+        sexo = sexo or ('F' if azar.random() < 0.5 else 'M')
+        nombres = NOMBRES_HEMBRAS if sexo == 'F' else NOMBRES_MACHOS
+        animal = Simulado(
+            f"{prefijo}-{len(animales) + 1:06d}",
+            f"{azar.choice(nombres)} {len(animales) + 1}", sexo,
+            madre.raza if madre and azar.random() < 0.8 else azar.choice(RAZAS), nacimiento, madre,
+        )
+        animales.append(animal)
+        return animal
+
+    # Fundadoras (sobre todo vacas adultas); el resto del hato nace de ellas.
+    for _ in range(max(1, objetivo * 2 // 5)):
+        nuevo(plan.inicio - timedelta(days=azar.randint(300, 2500)), 'F' if azar.random() < 0.8 else 'M')
+
+    i = 0
+    while i < len(animales):
+        animal = animales[i]
+        i += 1
+        desde = max(animal.nacimiento, plan.inicio)
+        if azar.random() < 0.12 and desde + timedelta(days=60) < plan.hoy:
+            tipo, estado, _ = azar.choices(SALIDAS, weights=[p for _, _, p in SALIDAS])[0]
+            animal.salida = (_fecha_entre(azar, desde + timedelta(days=60), plan.hoy), tipo)
+            animal.estado = estado
+        fin = animal.fin or plan.hoy
+        if otras and azar.random() < 0.05 and desde < fin:
+            animal.llegada = (_fecha_entre(azar, desde, fin), azar.choice(otras))
+            if animal.salida is None:
+                animal.estado = 'trasladado'
+
+        if animal.sexo == 'F':
+            parto = animal.nacimiento + timedelta(days=azar.randint(700, 820))
+            while parto < fin:
+                if parto >= plan.inicio:
+                    cria = nuevo(parto, madre=animal) if len(animales) < objetivo else None
+                    animal.partos.append((parto, cria))
+                parto += timedelta(days=azar.randint(365, 430))
+
+        # Compras: si el hato no llega al objetivo se completa con animales jóvenes.
+        if i == len(animales) and len(animales) < objetivo:
+            nuevo(_fecha_entre(azar, plan.inicio - timedelta(days=400), plan.hoy - timedelta(days=30)))
+    return animales, azar
+
+
+def _peso(animal, fecha, base):
+    edad = (fecha - animal.nacimiento).days
+    return round(base * (1 - 0.93 * math.exp(-edad / 420)), 1)
+
+
+def _pesajes(animales, finca_id, azar, plan):
+    for animal in animales:
+        adulto = azar.uniform(480, 560) if animal.sexo == 'F' else azar.uniform(650, 800)
+        fecha = max(animal.nacimiento, plan.inicio) + timedelta(days=azar.randint(0, 29))
+        fin = animal.fin or plan.hoy
+        while fecha <= fin:
+            origen = animal.llegada[1] if animal.llegada and fecha < animal.llegada[0] else finca_id
+            yield Pesaje(animal_id=animal.id, finca_id=origen, fecha=fecha,
+                         peso=max(_peso(animal, fecha, adulto) + azar.uniform(-8, 8), 20))
+            fecha += timedelta(days=azar.randint(27, 33))
+
+
+def _producciones(animales, finca_id, azar, plan):
+    # Curva de Wood y = a·t^b·e^(-ct), ~25 kg/día en el pico (día 50).
+    for animal in animales:
+        a = azar.uniform(11, 17)
+        fin = animal.fin or plan.hoy
+        for n, (parto, _) in enumerate(animal.partos):
+            siguiente = animal.partos[n + 1][0] if n + 1 < len(animal.partos) else None
+            for t in range(1, LACTANCIA + 1):
+                fecha = parto + timedelta(days=t)
+                if fecha > fin or (siguiente and fecha > siguiente - timedelta(days=60)):
+                    break
+                total = a * t ** 0.2 * math.exp(-0.004 * t) * azar.uniform(0.9, 1.1)
+                origen = animal.llegada[1] if animal.llegada and fecha < animal.llegada[0] else finca_id
+                yield ProduccionLeche(animal_id=animal.id, finca_id=origen, fecha=fecha,
+                                      peso_am=round(total * 0.55, 1), peso_pm=round(total * 0.45, 1))
+
+
+def _eventos_sanitarios(animales, azar, plan):
+    for animal in animales:
+        desde, fin = max(animal.nacimiento, plan.inicio), animal.fin or plan.hoy
+        esperado = max((fin - desde).days, 0) / 365 * 0.5
+        for _ in range(int(esperado) + (azar.random() < esperado % 1)):
+            diagnostico, tratamiento = azar.choice(DIAGNOSTICOS)
+            yield EventoSanitario(animal_id=animal.id, fecha=_fecha_entre(azar, desde, fin),
+                                  diagnostico=diagnostico, tratamiento=tratamiento, responsable="Veterinario")
+
+
+def _insertar(modelo, filas, lote):
+    total, bloque = 0, []
+    for fila in filas:
+        bloque.append(fila)
+        if len(bloque) == lote:
+            modelo.objects.bulk_create(bloque)
+            total, bloque = total + len(bloque), []
+    if bloque:
+        modelo.objects.bulk_create(bloque)
+        total += len(bloque)
+    return total
+
+
+def _insertar_con_ids(modelo, objetos, lote):
+    """bulk_create que garantiza pk en cada objeto (sin RETURNING se releen los últimos ids)."""
+    for inicio in range(0, len(objetos), lote):
+        bloque = modelo.objects.bulk_create(objetos[inicio:inicio + lote])
+        if bloque and bloque[0].pk is None:
+            ids = sorted(modelo.objects.order_by('-pk').values_list('pk', flat=True)[:len(bloque)])
+            for objeto, pk in zip(bloque, ids):
+                objeto.pk = pk
+    return objetos
+
+
+@transaction.atomic
+def generar_finca(finca, plan):
+    """Simula e inserta una finca; devuelve las filas creadas por modelo."""
+    animales, azar = simular_finca(finca, plan)
+    filas = Counter()
+
+    registros = _insertar_con_ids(Animal, [
+        Animal(numero_arete=a.arete, nombre=a.nombre, clave_busqueda=clave_busqueda_para(a.arete, a.nombre),
+               sexo=a.sexo, raza=a.raza, fecha_nacimiento=a.nacimiento, estado=a.estado, finca_id=finca.pk)
+        for a in animales
+    ], plan.lote)
+    for animal, registro in zip(animales, registros):
+        animal.id = registro.pk
+    con_madre = []
+    for animal, registro in zip(animales, registros):
+        if animal.madre:
+            registro.madre_id = animal.madre.id
+            con_madre.append(registro)
+    Animal.objects.bulk_update(con_madre, ['madre'], batch_size=plan.lote)
+    filas['Animal'] = len(registros)
+
+    filas['Parto'] = _insertar(Parto, (
+        Parto(madre_id=a.id, cria_id=cria.id if cria else None, finca_id=finca.pk, fecha_nacimiento=fecha,
+              sexo=cria.sexo if cria else azar.choice('FM'), raza=cria.raza if cria else a.raza,
+              peso=round(azar.uniform(25, 45), 1), created_by_id=plan.usuario_id)
+        for a in animales for fecha, cria in a.partos
+    ), plan.lote)
+    filas['Pesaje'] = _insertar(Pesaje, _pesajes(animales, finca.pk, azar, plan), plan.lote)
+    filas['ProduccionLeche'] = _insertar(ProduccionLeche, _producciones(animales, finca.pk, azar, plan), plan.lote)
+    filas['EventoSanitario'] = _insertar(EventoSanitario, _eventos_sanitarios(animales, azar, plan), plan.lote)
+
+    # Cada parto viene de una inseminación confirmada; a veces hubo un servicio fallido antes.
+    servicios = []
+    for a in animales:
+        for fecha, _ in a.partos:
+            servida = fecha - timedelta(days=GESTACION + azar.randint(-5, 5))
+            if servida < plan.inicio:
+                continue
+            if azar.random() < 0.3 and servida - timedelta(days=21) >= plan.inicio:
+                servicios.append((a, servida - timedelta(days=21), 'negativa'))
+            servicios.append((a, servida, 'gestante'))
+    inseminaciones = _insertar_con_ids(Inseminacion, [
+        Inseminacion(animal_id=a.id, fecha=fecha, tipo_semen=azar.choice(['Convencional', 'Sexado']),
+                     inseminador="Inseminador", responsable_id=plan.usuario_id)
+        for a, fecha, _ in servicios
+    ], plan.lote)
+    filas['Inseminacion'] = len(inseminaciones)
+    filas['ConfirmacionGestacion'] = _insertar(ConfirmacionGestacion, (
+        ConfirmacionGestacion(inseminacion_id=inseminacion.pk, fecha_confirmacion=fecha + timedelta(days=35),
+                              metodo_diagnostico=azar.choice(['Palpación', 'Ecografía']),
+                              resultado=resultado, responsable="Veterinario")
+        for inseminacion, (_, fecha, resultado) in zip(inseminaciones, servicios)
+        if fecha + timedelta(days=35) <= plan.hoy
+    ), plan.lote)
+
+    filas['EventoSalida'] = _insertar(EventoSalida, (
+        EventoSalida(animal_id=a.id, fecha=a.salida[0], tipo_evento=a.salida[1], responsable_id=plan.usuario_id)
+        for a in animales if a.salida
+    ), plan.lote)
+
+    # Traslado.fecha es auto_now_add: se fija después con bulk_update.
+    llegadas = [a for a in animales if a.llegada]
+    traslados = _insertar_con_ids(Traslado, [
+        Traslado(animal_id=a.id, finca_origen_id=a.llegada[1], finca_destino_id=finca.pk,
+                 usuario_id=plan.usuario_id)
+        for a in llegadas
+    ], plan.lote)
+    zona = timezone.get_current_timezone()
+    for traslado, a in zip(traslados, llegadas):
+        traslado.fecha = timezone.make_aware(datetime.combine(a.llegada[0], time(8)), zona)
+    Traslado.objects.bulk_update(traslados, ['fecha'], batch_size=plan.lote)
+    filas['Traslado'] = len(traslados)
+    return filas
+
+
+def _generar_en_proceso(finca, plan):
+    import django
+    django.setup()
+    try:
+        return finca.codigo, generar_finca(finca, plan)
+    finally:
+        connections.close_all()
+
+
+def generar(fincas, animales_por_finca, dias, semilla=1, usuario=None, procesos=1, lote=LOTE, avance=None):
+    """
+    Genera las fincas que aún no tienen animales generados. Con procesos > 1
+    cada finca va a un proceso aparte (útil en PostgreSQL; SQLite serializa
+    las escrituras). `avance(codigo, filas)` se llama al terminar cada finca.
+    """
+    usuario = usuario or usuario_generador()
+    plan = Plan(animales_por_finca, dias, semilla, usuario.pk, [f.pk for f in fincas], lote)
+    pendientes = [
+        f for f in fincas
+        if not Animal.objects.filter(finca=f, numero_arete__startswith=f"{f.codigo or f'F{f.pk}'}-").exists()
+    ]
+    total = Counter()
+    if procesos > 1 and len(pendientes) > 1:
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=get_context('fork')) as pool:
+            resultados = pool.map(_generar_en_proceso, pendientes, [plan] * len(pendientes))
+            for codigo, filas in resultados:
+                total.update(filas)
+                if avance:
+                    avance(codigo, filas)
+    else:
+        for finca in pendientes:
+            filas = generar_finca(finca, plan)
+            total.update(filas)
+            if avance:
+                avance(finca.codigo, filas)
+    return total
+
+
+def reconstruir_derivados():
+    """Lo que las señales mantendrían si los datos hubieran entrado uno a uno."""
+    for comando in ('reconstruir_resumen', 'reconstruir_rollups_produccion', 'reconstruir_genealogia',
+                    'calcular_lactancias', 'reparar_ultimos_datos'):
+        call_command(comando, stdout=StringIO())
+    VersionDatos.objects.incrementar(*MODELOS_GENERADOS)
+    invalidar_todo()
+
+
+def limpiar():
+    """Borra animales e historial con DELETE directo (sin cargar filas ni señales)."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        for modelo in MODELOS_GENERADOS:
+            cursor.execute(f"DELETE FROM {connection.ops.quote_name(modelo._meta.db_table)}")
@@ -0,0 +1,84 @@
+# apps/ganaderia/importacion.py
+import codecs
+import csv
+from datetime import date, datetime
+
+from openpyxl import load_workbook
+
+from .models import normalizar_busqueda
+
+EXTENSIONES = (".csv", ".xlsx")
+
+
+class ErrorFila(Exception):
+    """Error de validación de una fila; no detiene el resto del lote."""
+
+
+def _encabezado(valor):
+    return normalizar_busqueda(str(valor or "")).replace(" ", "_")
+
+
+def leer_planilla(archivo):
+    """
+    Recorre un CSV o XLSX subido y produce (numero_fila, {encabezado: valor}),
+    con los encabezados sin tildes, en minúsculas y con "_" en vez de
+    espacios. Ninguno de los dos formatos se carga completo en memoria:
+    el CSV se decodifica por líneas y el XLSX se abre en modo read_only.
+    """
+    nombre = (getattr(archivo, "name", "") or "").lower()
+
+    if nombre.endswith(".xlsx"):
+        wb = load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            filas = wb.active.iter_rows(values_only=True)
+            encabezados = [_encabezado(v) for v in next(filas, ())]
+            for numero, fila in enumerate(filas, start=2):
+                if any(v not in (None, "") for v in fila):
+                    yield numero, dict(zip(encabezados, fila))
+        finally:
+            wb.close()
+
+    elif nombre.endswith(".csv"):
+        lector = csv.reader(codecs.iterdecode(archivo, "utf-8-sig"))
+        encabezados = [_encabezado(v) for v in next(lector, [])]
+        for numero, fila in enumerate(lector, start=2):
+            if any(v.strip() for v in fila):
+                yield numero, dict(zip(encabezados, fila))
+
+    else:
+        raise ErrorFila(f"Formato no soportado; use {' o '.join(EXTENSIONES)}")
+
+
+def valor(datos, *nombres):
+    """Primer encabezado presente entre `nombres` (admite alias de columnas)."""
+    for nombre in nombres:
+        contenido = datos.get(nombre)
+        if isinstance(contenido, str):
+            contenido = contenido.strip()
+        if contenido not in (None, ""):
+            return contenido
+    return None
+
+
+def convertir_fecha(contenido):
+    if isinstance(contenido, datetime):
+        return contenido.date()
+    if isinstance(contenido, date):
+        return contenido
+    texto = str(contenido or "").strip()
+    for formato in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    raise ErrorFila(f"Fecha inválida: {texto or 'vacía'}")
+
+
+def convertir_numero(contenido, campo):
+    try:
+        numero = float(str(contenido).replace(",", "."))
+    except (TypeError, ValueError):
+        raise ErrorFila(f"{campo} inválido: {contenido if contenido is not None else 'vacío'}")
+    if numero < 0:
+        raise ErrorFila(f"{campo} debe ser >= 0")
+    return numero
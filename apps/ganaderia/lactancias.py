@@ -0,0 +1,154 @@
+# apps/ganaderia/lactancias.py
+"""
+Motor de lactancias por finca.
+
+Dos consultas por finca (producción y partos de sus vacas) y el resto con
+NumPy sobre la finca completa:
+
+- Cada ordeño se asigna al último parto anterior de la vaca con
+  searchsorted sobre la clave (animal, día); lo anterior al primer parto
+  se descarta.
+- La curva de Wood se ajusta por lactancia como mínimos cuadrados sobre
+  ln y = ln a + b·ln t − c·t: las ecuaciones normales de todas las
+  lactancias se arman con bincount y se resuelven juntas (pinv apilado).
+- proyeccion_305 suma los litros registrados hasta el día 305 y completa
+  con la curva los días sin registro.
+- persistencia es el porcentaje del pico de la curva que se mantiene al
+  día 305.
+"""
+import numpy as np
+from django.db import transaction
+
+from .models import Lactancia, Parto, ProduccionLeche, VersionDatos
+
+DIAS_LACTANCIA = 305
+MINIMO_REGISTROS = 5        # ordeños con producción para ajustar la curva
+_ESCALA = 1 << 20           # días por animal en la clave (animal, día)
+
+
+def _dias(fechas):
+    return np.array(fechas, dtype='datetime64[D]').astype(np.int64)
+
+
+def ajustar_wood(grupo, t, y, n_grupos):
+    """
+    Parámetros (a, b, c) por grupo; NaN donde no hay MINIMO_REGISTROS
+    puntos con t >= 1 e y > 0.
+    """
+    validos = (t >= 1) & (y > 0)
+    grupo, t, ln_y = grupo[validos], t[validos].astype('float64'), np.log(y[validos])
+    columnas = (np.ones_like(t), np.log(t), t)
+
+    xtx = np.empty((n_grupos, 3, 3))
+    xty = np.empty((n_grupos, 3))
+    for i in range(3):
+        xty[:, i] = np.bincount(grupo, columnas[i] * ln_y, n_grupos)
+        for j in range(i, 3):
+            xtx[:, i, j] = xtx[:, j, i] = np.bincount(grupo, columnas[i] * columnas[j], n_grupos)
+
+    parametros = np.full((n_grupos, 3), np.nan)
+    suficientes = np.bincount(grupo, minlength=n_grupos) >= MINIMO_REGISTROS
+    if suficientes.any():
+        beta = np.linalg.pinv(xtx[suficientes]) @ xty[suficientes][:, :, None]
+        parametros[suficientes] = beta[:, :, 0]
+    a, b, c = np.exp(parametros[:, 0]), parametros[:, 1], -parametros[:, 2]
+    return a, b, c
+
+
+def wood(a, b, c, t):
+    return a * np.power(t, b) * np.exp(-c * t)
+
+
+def calcular_finca(finca_id):
+    """Lactancias (sin guardar) de las vacas que están hoy en la finca."""
+    produccion = list(
+        ProduccionLeche.objects.filter(animal__finca_id=finca_id)
+        .order_by('animal_id', 'fecha')
+        .values_list('animal_id', 'fecha', 'peso_am', 'peso_pm')
+    )
+    partos = list(
+        Parto.objects.filter(madre__finca_id=finca_id)
+        .order_by('madre_id', 'fecha_nacimiento')
+        .values_list('madre_id', 'fecha_nacimiento').distinct()
+    )
+    if not produccion or not partos:
+        return []
+
+    madre, fecha_parto = (np.array(columna) for columna in zip(*partos))
+    madre = madre.astype(np.int64)
+    dia_parto = _dias(fecha_parto)
+    numero = np.arange(len(madre)) - np.searchsorted(madre, madre) + 1
+
+    animal, fechas, am, pm = zip(*produccion)
+    animal = np.array(animal, dtype=np.int64)
+    dia = _dias(fechas)
+    y = np.nan_to_num(np.array(am, dtype='float64')) + np.nan_to_num(np.array(pm, dtype='float64'))
+
+    # Último parto en o antes de cada ordeño.
+    parto = np.searchsorted(madre * _ESCALA + dia_parto, animal * _ESCALA + dia, side='right') - 1
+    asignado = (parto >= 0) & (madre[np.clip(parto, 0, None)] == animal)
+    parto, dia, y = parto[asignado], dia[asignado], y[asignado]
+    if not len(parto):
+        return []
+
+    lactancias, grupo = np.unique(parto, return_inverse=True)
+    n_grupos = len(lactancias)
+    t = dia - dia_parto[parto]
+
+    registros = np.bincount(grupo, minlength=n_grupos)
+    total = np.bincount(grupo, y, n_grupos)
+    ultimo = np.cumsum(registros) - 1                      # filas ordenadas por animal y fecha
+    en_305 = (t >= 1) & (t <= DIAS_LACTANCIA)
+    registrado_305 = np.bincount(grupo, y * en_305, n_grupos)
+
+    # Pico observado: el último de cada grupo al ordenar por (grupo, litros, -día).
+    orden = np.lexsort((-t, y, grupo))
+    pico = orden[np.cumsum(registros) - 1]
+
+    a, b, c = ajustar_wood(grupo, t, y, n_grupos)
+    ajustada = ~np.isnan(a)
+    dias_curva = np.arange(1, DIAS_LACTANCIA + 1, dtype='float64')
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        curva = wood(a[ajustada, None], b[ajustada, None], c[ajustada, None], dias_curva)
+        en_curva = np.where(en_305, wood(a[grupo], b[grupo], c[grupo], np.maximum(t, 1)), 0)
+        ya_registrado = np.bincount(grupo, np.nan_to_num(en_curva), n_grupos)
+
+        proyeccion = np.full(n_grupos, np.nan)
+        proyeccion[ajustada] = registrado_305[ajustada] + curva.sum(axis=1) - ya_registrado[ajustada]
+
+        persistencia = np.full(n_grupos, np.nan)
+        persistencia[ajustada] = 100 * curva[:, -1] / curva.max(axis=1)
+
+    def numero_o_none(valor):
+        return float(valor) if np.isfinite(valor) else None
+
+    ultima_fecha = dia[ultimo].astype('datetime64[D]').tolist()
+    return [
+        Lactancia(
+            animal_id=int(madre[p]),
+            numero=int(numero[p]),
+            fecha_parto=fecha_parto[p],
+            fecha_ultimo_registro=ultima_fecha[k],
+            dias_en_leche=int(t[ultimo[k]]),
+            registros=int(registros[k]),
+            litros=float(total[k]),
+            pico_litros=float(y[pico[k]]),
+            dia_pico=int(t[pico[k]]),
+            proyeccion_305=numero_o_none(proyeccion[k]),
+            persistencia=numero_o_none(persistencia[k]),
+            wood_a=numero_o_none(a[k]),
+            wood_b=numero_o_none(b[k]),
+            wood_c=numero_o_none(c[k]),
+        )
+        for k, p in enumerate(lactancias.tolist())
+    ]
+
+
+@transaction.atomic
+def recalcular_finca(finca_id):
+    """Reemplaza las lactancias guardadas de las vacas de la finca. Devuelve cuántas quedaron."""
+    lactancias = calcular_finca(finca_id)
+    Lactancia.objects.filter(animal__finca_id=finca_id).delete()
+    Lactancia.objects.bulk_create(lactancias, batch_size=500)
+    VersionDatos.objects.incrementar_al_confirmar(Lactancia)
+    return len(lactancias)
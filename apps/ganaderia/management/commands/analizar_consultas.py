@@ -0,0 +1,75 @@
+# apps/ganaderia/management/commands/analizar_consultas.py
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.ganaderia.planes import analizar, consultas_representativas, indices_por_app, texto_migracion
+
+ETIQUETAS = {
+    "recorrido": "⚠️  Recorrido completo",
+    "orden": "↕️  Orden sin índice",
+    "funcion": "ƒ  Predicado con función",
+}
+
+
+class Command(BaseCommand):
+    help = 'Corre EXPLAIN sobre las consultas de listados, exportaciones y tablero y sugiere índices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minimo-filas', type=int, default=1000,
+                            help='Solo marca recorridos completos de tablas con al menos estas filas')
+        parser.add_argument('--solo', nargs='*', default=None, help='Nombres de consultas a revisar')
+        parser.add_argument('--plan', action='store_true', help='Muestra el plan completo de cada consulta')
+        parser.add_argument('--migracion', action='store_true',
+                            help='Escribe una migración por app con los índices sugeridos')
+
+    def handle(self, *args, **options):
+        consultas = consultas_representativas()
+        if options['solo']:
+            consultas = [c for c in consultas if c.nombre in options['solo']]
+            if not consultas:
+                raise CommandError('Ninguna consulta coincide con --solo')
+
+        try:
+            resultados = analizar(consultas, options['minimo_filas'])
+        except NotImplementedError as e:
+            raise CommandError(str(e))
+
+        total = 0
+        for consulta, lineas, hallazgos in resultados:
+            estado = self.style.WARNING(f'{len(hallazgos)} hallazgo(s)') if hallazgos else self.style.SUCCESS('ok')
+            self.stdout.write(f'{consulta.nombre} ({consulta.vista}): {estado}')
+            if options['plan']:
+                for linea in lineas:
+                    self.stdout.write(f'      {linea}')
+            for hallazgo in hallazgos:
+                total += 1
+                filas = f' — {hallazgo.filas} filas' if hallazgo.filas is not None else ''
+                self.stdout.write(f'   {ETIQUETAS[hallazgo.tipo]}: {hallazgo.detalle}{filas}')
+                if hallazgo.indice:
+                    modelo, indice = hallazgo.indice
+                    self.stdout.write(f'      → {modelo.__name__}: {self._indice(indice)}')
+
+        sugeridos = indices_por_app(resultados)
+        if options['migracion']:
+            for app_label, indices in sugeridos.items():
+                ruta, contenido = texto_migracion(app_label, list(indices.values()))
+                if os.path.exists(ruta):
+                    raise CommandError(f'Ya existe {ruta}')
+                with open(ruta, 'w', encoding='utf-8') as archivo:
+                    archivo.write(contenido)
+                self.stdout.write(self.style.SUCCESS(f'📝 {ruta}'))
+            if sugeridos:
+                self.stdout.write('   Copie también los índices a Meta.indexes de cada modelo antes de migrar.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {len(resultados)} consultas revisadas, {total} hallazgo(s), '
+            f'{sum(len(i) for i in sugeridos.values())} índice(s) sugerido(s)'
+        ))
+
+    @staticmethod
+    def _indice(indice):
+        if indice.expressions:
+            return f"models.Index({', '.join(map(str, indice.expressions))}, name='{indice.name}')"
+        return f"models.Index(fields={list(indice.fields)!r}, name='{indice.name}')"
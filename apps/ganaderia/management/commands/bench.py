@@ -0,0 +1,107 @@
+# apps/ganaderia/management/commands/bench.py
+
+import json
+import subprocess
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from apps.ganaderia.bench import escenarios, medir, sembrar
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia, consultas y memoria de las vistas y servicios más usados sobre una base de prueba'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--animales', type=int, default=2000, help='Tamaño del hato sembrado')
+        parser.add_argument('--fincas', type=int, default=5)
+        parser.add_argument('--dias', type=int, default=60, help='Días de historial de pesajes y ordeño')
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument('--repeticiones', type=int, default=30, help='Llamadas medidas por escenario')
+        parser.add_argument('--calentamiento', type=int, default=3, help='Llamadas previas sin medir')
+        parser.add_argument('--solo', nargs='*', default=None, help='Nombres de escenarios a correr')
+        parser.add_argument('--salida', default='bench.json', help='Archivo JSON con los resultados')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior para mostrar la diferencia')
+
+    def handle(self, *args, **options):
+        if options['animales'] < 10 or options['fincas'] < 2 or options['repeticiones'] < 1:
+            raise CommandError('Se necesitan al menos 10 animales, 2 fincas y 1 repetición')
+        anterior = self._leer(options['comparar']) if options['comparar'] else {}
+
+        # Base y caché propias: nunca se tocan los datos reales.
+        nombre_original = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        prefijo = f"bench-{datetime.now():%Y%m%d%H%M%S}"
+        caches = {
+            alias: {**config, 'KEY_PREFIX': f"{prefijo}:{config.get('KEY_PREFIX', '')}"}
+            for alias, config in settings.CACHES.items()
+        }
+        try:
+            with override_settings(CACHES=caches, EXPORTACIONES_ASINCRONAS=False, SQL_MUESTREO=0):
+                resultados = self._correr(options)
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            teardown_test_environment()
+
+        informe = {
+            'commit': self._commit(),
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'motor': connection.vendor,
+            'parametros': {campo: options[campo] for campo in
+                           ('animales', 'fincas', 'dias', 'semilla', 'repeticiones', 'calentamiento')},
+            'escenarios': resultados,
+        }
+        with open(options['salida'], 'w', encoding='utf-8') as archivo:
+            json.dump(informe, archivo, indent=2, ensure_ascii=False)
+
+        self.stdout.write(f"{'escenario':<32}{'p50':>9}{'p95':>9}{'p99':>9}{'consultas':>11}{'KiB':>10}")
+        for nombre, r in resultados.items():
+            linea = (f"{nombre:<32}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+                     f"{r['consultas']:>11.1f}{r['memoria_pico_kib']:>10.0f}")
+            previo = anterior.get('escenarios', {}).get(nombre)
+            if previo and previo['p50_ms']:
+                cambio = (r['p50_ms'] - previo['p50_ms']) / previo['p50_ms'] * 100
+                estilo = self.style.WARNING if cambio > 10 else self.style.SUCCESS
+                linea += estilo(f"  p50 {cambio:+.0f}%  consultas {r['consultas'] - previo['consultas']:+.1f}")
+            self.stdout.write(linea)
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(resultados)} escenarios, resultados en {options['salida']}"))
+
+    def _correr(self, options):
+        self.stdout.write(f"Sembrando {options['animales']} animales en {options['fincas']} fincas...")
+        datos = sembrar(options['animales'], options['fincas'], options['dias'], options['semilla'])
+        cliente = Client()
+        cliente.force_login(datos.usuario)
+
+        lista = escenarios(datos, cliente)
+        if options['solo']:
+            lista = [e for e in lista if e.nombre in options['solo']]
+            if not lista:
+                raise CommandError('Ningún escenario coincide con --solo')
+
+        resultados = {}
+        for escenario in lista:
+            resultados[escenario.nombre] = medir(escenario, options['repeticiones'], options['calentamiento'])
+        return resultados
+
+    @staticmethod
+    def _leer(ruta):
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                return json.load(archivo)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'No se pudo leer {ruta}: {e}')
+
+    @staticmethod
+    def _commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
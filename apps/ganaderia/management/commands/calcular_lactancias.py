@@ -0,0 +1,26 @@
+# apps/ganaderia/management/commands/calcular_lactancias.py
+
+from django.core.management.base import BaseCommand
+
+from apps.finca.models import Finca
+from apps.ganaderia.lactancias import recalcular_finca
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las lactancias (curva de Wood, proyección a 305 días) por finca'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--finca', type=int, help='ID de la finca; por defecto todas')
+
+    def handle(self, *args, **options):
+        fincas = Finca.objects.order_by('nombre')
+        if options['finca']:
+            fincas = fincas.filter(pk=options['finca'])
+
+        total = 0
+        for finca in fincas:
+            lactancias = recalcular_finca(finca.pk)
+            total += lactancias
+            self.stdout.write(f'   {finca.nombre}: {lactancias} lactancias')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Lactancias calculadas ({total})'))
@@ -0,0 +1,64 @@
+# apps/ganaderia/management/commands/carga_busquedas.py
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.ganaderia.carga import VISTAS, correr, crear_sesion, rutas
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Prueba de carga de las búsquedas por arete contra un servidor ya levantado (WSGI o ASGI)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Servidor a probar')
+        parser.add_argument('--usuario', required=True, help='Cédula del usuario con el que se inicia sesión')
+        parser.add_argument('--concurrencia', type=int, default=50, help='Clientes simultáneos')
+        parser.add_argument('--segundos', type=int, default=10)
+        parser.add_argument('--vistas', nargs='*', choices=list(VISTAS), default=list(VISTAS))
+        parser.add_argument('--fallos', type=float, default=0.1, help='Fracción de aretes que no existen')
+        parser.add_argument('--etiqueta', default='', help='Nombre de la corrida en el JSON (p. ej. wsgi, asgi)')
+        parser.add_argument('--salida', help='Agrega el resultado a este archivo JSON')
+
+    def handle(self, *args, **options):
+        if options['concurrencia'] < 1 or options['segundos'] < 1:
+            raise CommandError('Se necesitan al menos 1 cliente y 1 segundo')
+        usuario = User.objects.select_related('rol').filter(cedula=options['usuario']).first()
+        if usuario is None:
+            raise CommandError(f"No existe el usuario {options['usuario']}")
+        try:
+            lista = rutas(options['vistas'], fallos=options['fallos'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f"{options['concurrencia']} clientes durante {options['segundos']} s contra {options['url']}..."
+        )
+        try:
+            informe = correr(options['url'], lista, crear_sesion(usuario),
+                             options['concurrencia'], options['segundos'])
+        except OSError as e:
+            raise CommandError(f"No se pudo conectar a {options['url']}: {e}")
+
+        self.stdout.write(
+            f"{informe['por_segundo']:.0f} pet/s, p50 {informe.get('p50_ms', 0):.1f} ms, "
+            f"p95 {informe.get('p95_ms', 0):.1f} ms, p99 {informe.get('p99_ms', 0):.1f} ms, "
+            f"errores {informe['errores']}, estados {informe['estados']}"
+        )
+        if set(informe['estados']) - {'200', '404'}:
+            self.stdout.write(self.style.WARNING('Hubo respuestas distintas de 200/404: revise la sesión y la URL'))
+
+        if options['salida']:
+            try:
+                with open(options['salida'], encoding='utf-8') as archivo:
+                    corridas = json.load(archivo)
+            except (OSError, ValueError):
+                corridas = {}
+            corridas[options['etiqueta'] or options['url']] = {
+                'concurrencia': options['concurrencia'], 'segundos': options['segundos'],
+                'vistas': options['vistas'], **informe,
+            }
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(corridas, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS('✅ Prueba de carga terminada'))
@@ -0,0 +1,59 @@
+# apps/ganaderia/management/commands/generar_datos.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.ganaderia.generador import LOTE, crear_fincas, generar, limpiar, reconstruir_derivados
+
+
+class Command(BaseCommand):
+    help = 'Genera fincas con hato e historial sintético (producción, pesajes, partos, sanidad, traslados)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fincas', type=int, default=10, help='Fincas a generar (GEN001, GEN002, ...)')
+        parser.add_argument('--animales', type=int, default=1000, help='Animales por finca')
+        parser.add_argument('--anios', type=float, default=3, help='Años de historial')
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument('--procesos', type=int, default=1,
+                            help='Fincas en paralelo (PostgreSQL; en SQLite se usa 1)')
+        parser.add_argument('--lote', type=int, default=LOTE, help='Filas por bulk_create')
+        parser.add_argument('--limpiar', action='store_true',
+                            help='Borra antes todos los animales y su historial')
+        parser.add_argument('--sin-derivados', action='store_true',
+                            help='No reconstruye resumen, rollups, genealogía, lactancias ni últimos datos')
+
+    def handle(self, *args, **options):
+        if options['fincas'] < 1 or options['animales'] < 1 or options['anios'] <= 0:
+            raise CommandError('--fincas, --animales y --anios deben ser positivos')
+        procesos = options['procesos']
+        if procesos > 1 and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING('SQLite serializa las escrituras: se genera con un proceso'))
+            procesos = 1
+
+        if options['limpiar']:
+            limpiar()
+            self.stdout.write(self.style.WARNING('🗑️  Animales e historial eliminados'))
+
+        fincas = crear_fincas(options['fincas'])
+
+        inicio = time.monotonic()
+
+        def avance(codigo, filas):
+            self.stdout.write(f'   {codigo}: {sum(filas.values()):,} filas ({time.monotonic() - inicio:.0f} s)')
+
+        total = generar(
+            fincas, options['animales'], round(options['anios'] * 365), options['semilla'],
+            procesos=procesos, lote=options['lote'], avance=avance,
+        )
+        for modelo, cantidad in sorted(total.items()):
+            self.stdout.write(f'   • {modelo}: {cantidad:,}')
+
+        if not options['sin_derivados']:
+            self.stdout.write('📊 Reconstruyendo datos derivados...')
+            reconstruir_derivados()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {sum(total.values()):,} filas en {time.monotonic() - inicio:.0f} s'
+        ))
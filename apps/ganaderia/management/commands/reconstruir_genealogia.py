@@ -0,0 +1,13 @@
+# apps/ganaderia/management/commands/reconstruir_genealogia.py
+
+from django.core.management.base import BaseCommand
+
+from apps.ganaderia.genealogia import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la tabla de genealogía (línea materna) desde Animal.madre'
+
+    def handle(self, *args, **options):
+        filas = reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'✅ Genealogía reconstruida ({filas} filas)'))
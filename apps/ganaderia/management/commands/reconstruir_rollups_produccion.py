@@ -0,0 +1,42 @@
+# apps/ganaderia/management/commands/reconstruir_rollups_produccion.py
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from apps.ganaderia.models import ProduccionLeche
+from apps.ganaderia.rollups import inicio_mes, mes_siguiente, reconstruir_mes
+
+
+def _mes(texto):
+    try:
+        return datetime.strptime(texto, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f'Mes inválido "{texto}" (use AAAA-MM)')
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los rollups de producción de leche, un mes por transacción'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Primer mes (AAAA-MM); por defecto el más antiguo')
+        parser.add_argument('--hasta', help='Último mes (AAAA-MM); por defecto el más reciente')
+
+    def handle(self, *args, **options):
+        rango = ProduccionLeche.objects.aggregate(desde=Min('fecha'), hasta=Max('fecha'))
+        if rango['desde'] is None:
+            self.stdout.write('ℹ️  No hay producción registrada')
+            return
+
+        mes = _mes(options['desde']) if options['desde'] else inicio_mes(rango['desde'])
+        hasta = _mes(options['hasta']) if options['hasta'] else inicio_mes(rango['hasta'])
+
+        total = 0
+        while mes <= hasta:
+            filas = reconstruir_mes(mes)
+            total += filas
+            self.stdout.write(f'   {mes:%Y-%m}: {filas} filas')
+            mes = mes_siguiente(mes)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Rollups de producción reconstruidos ({total} filas)'))
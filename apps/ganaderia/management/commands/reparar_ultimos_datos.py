@@ -0,0 +1,34 @@
+# apps/ganaderia/management/commands/reparar_ultimos_datos.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.ganaderia.models import Animal, VersionDatos
+from apps.ganaderia.ultimos import recalcular_todo
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el último peso, producción y evento sanitario de cada animal, por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Animales por transacción')
+
+    def handle(self, *args, **options):
+        lote = max(options['lote'], 1)
+        ultimo_id = 0
+        total = 0
+        while True:
+            ids = list(
+                Animal.objects.filter(pk__gt=ultimo_id).order_by('pk').values_list('pk', flat=True)[:lote]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                recalcular_todo(ids)
+                # update() no pasa por las señales de Animal.
+                VersionDatos.objects.incrementar_al_confirmar(Animal)
+            total += len(ids)
+            ultimo_id = ids[-1]
+            self.stdout.write(f'   {total} animales')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Últimos datos reparados ({total} animales)'))
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:08
+
+import unicodedata
+
+from django.db import migrations, models
+
+from apps.ganaderia.busqueda import crear_indice_busqueda, eliminar_indice_busqueda
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.casefold().split())
+
+
+def llenar_clave_busqueda(apps, schema_editor):
+    Animal = apps.get_model('ganaderia', 'Animal')
+    lote = []
+    for animal in Animal.objects.only('id', 'numero_arete', 'nombre').iterator(chunk_size=2000):
+        animal.clave_busqueda = _normalizar(f"{animal.numero_arete} {animal.nombre}")[:160]
+        lote.append(animal)
+        if len(lote) >= 2000:
+            Animal.objects.bulk_update(lote, ['clave_busqueda'])
+            lote = []
+    if lote:
+        Animal.objects.bulk_update(lote, ['clave_busqueda'])
+
+
+def crear_indice(apps, schema_editor):
+    crear_indice_busqueda(schema_editor)
+
+
+def eliminar_indice(apps, schema_editor):
+    eliminar_indice_busqueda(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ganaderia', '0002_versiondatos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='animal',
+            name='clave_busqueda',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=160),
+        ),
+        migrations.RunPython(llenar_clave_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:13
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fusionar_duplicados(apps, schema_editor):
+    """
+    Antes de la restricción puede haber varias filas para el mismo
+    (animal, fecha). Se conserva la más antigua con el último valor no nulo
+    de cada turno y se borran las demás.
+    """
+    ProduccionLeche = apps.get_model('ganaderia', 'ProduccionLeche')
+    duplicados = (
+        ProduccionLeche.objects.values('animal_id', 'fecha')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+    )
+    for grupo in duplicados.iterator():
+        filas = list(
+            ProduccionLeche.objects
+            .filter(animal_id=grupo['animal_id'], fecha=grupo['fecha'])
+            .order_by('id')
+        )
+        conservada = filas[0]
+        for fila in filas[1:]:
+            if fila.peso_am is not None:
+                conservada.peso_am = fila.peso_am
+            if fila.peso_pm is not None:
+                conservada.peso_pm = fila.peso_pm
+        conservada.save(update_fields=['peso_am', 'peso_pm'])
+        ProduccionLeche.objects.filter(id__in=[f.id for f in filas[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finca', '0001_initial'),
+        ('ganaderia', '0003_animal_clave_busqueda'),
+    ]
+
+    operations = [
+        migrations.RunPython(fusionar_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='produccionleche',
+            constraint=models.UniqueConstraint(fields=('animal', 'fecha'), name='produccion_unica_animal_fecha'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finca', '0001_initial'),
+        ('ganaderia', '0004_produccion_unica_animal_fecha'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProduccionDiariaFinca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('litros', models.FloatField(default=0)),
+                ('litros_am', models.FloatField(default=0)),
+                ('litros_pm', models.FloatField(default=0)),
+                ('vacas', models.IntegerField(default=0)),
+                ('registros_am', models.IntegerField(default=0)),
+                ('registros_pm', models.IntegerField(default=0)),
+                ('finca', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='produccion_diaria', to='finca.finca')),
+            ],
+            options={
+                'verbose_name': 'Producción diaria por finca',
+                'verbose_name_plural': 'Producción diaria por finca',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['fecha'], name='ganaderia_p_fecha_369d7b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('finca', 'fecha'), name='produccion_diaria_finca_fecha')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProduccionMensualAnimal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('litros', models.FloatField(default=0)),
+                ('litros_am', models.FloatField(default=0)),
+                ('litros_pm', models.FloatField(default=0)),
+                ('dias', models.IntegerField(default=0)),
+                ('registros_am', models.IntegerField(default=0)),
+                ('registros_pm', models.IntegerField(default=0)),
+                ('animal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='produccion_mensual', to='ganaderia.animal')),
+            ],
+            options={
+                'verbose_name': 'Producción mensual por animal',
+                'verbose_name_plural': 'Producción mensual por animal',
+                'ordering': ['-mes'],
+                'constraints': [models.UniqueConstraint(fields=('animal', 'mes'), name='produccion_mensual_animal_mes')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ganaderia', '0005_produccion_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lactancia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.PositiveSmallIntegerField()),
+                ('fecha_parto', models.DateField()),
+                ('fecha_ultimo_registro', models.DateField()),
+                ('dias_en_leche', models.PositiveIntegerField()),
+                ('registros', models.PositiveIntegerField()),
+                ('litros', models.FloatField()),
+                ('pico_litros', models.FloatField()),
+                ('dia_pico', models.PositiveIntegerField()),
+                ('proyeccion_305', models.FloatField(blank=True, null=True)),
+                ('persistencia', models.FloatField(blank=True, null=True)),
+                ('wood_a', models.FloatField(blank=True, null=True)),
+                ('wood_b', models.FloatField(blank=True, null=True)),
+                ('wood_c', models.FloatField(blank=True, null=True)),
+                ('calculado_en', models.DateTimeField(auto_now=True)),
+                ('animal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lactancias', to='ganaderia.animal')),
+            ],
+            options={
+                'verbose_name': 'Lactancia',
+                'verbose_name_plural': 'Lactancias',
+                'ordering': ['-fecha_parto'],
+                'constraints': [models.UniqueConstraint(fields=('animal', 'fecha_parto'), name='lactancia_unica_animal_parto')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from apps.ganaderia.genealogia import GENERACIONES_MAXIMAS, SQL_CIERRE
+
+
+def llenar_genealogia(apps, schema_editor):
+    schema_editor.execute(SQL_CIERRE, [GENERACIONES_MAXIMAS])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ganaderia', '0006_lactancia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Genealogia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profundidad', models.PositiveSmallIntegerField()),
+                ('ancestro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='genealogia_descendientes', to='ganaderia.animal')),
+                ('descendiente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='genealogia_ancestros', to='ganaderia.animal')),
+            ],
+            options={
+                'verbose_name': 'Genealogía',
+                'verbose_name_plural': 'Genealogía',
+                'indexes': [models.Index(fields=['descendiente', 'profundidad'], name='genealogia_desc_prof')],
+                'constraints': [models.UniqueConstraint(fields=('ancestro', 'descendiente'), name='genealogia_unica')],
+            },
+        ),
+        migrations.RunPython(llenar_genealogia, migrations.RunPython.noop),
+    ]
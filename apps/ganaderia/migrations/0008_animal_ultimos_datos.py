@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ganaderia', '0007_genealogia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='animal',
+            name='fecha_ultima_produccion',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='animal',
+            name='fecha_ultimo_pesaje',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='animal',
+            name='ultima_produccion_total',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='animal',
+            name='ultimo_evento_sanitario',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='animal',
+            name='ultimo_peso',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finca', '0001_initial'),
+        ('ganaderia', '0008_animal_ultimos_datos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pesaje',
+            index=models.Index(fields=['fecha', 'id'], name='pesaje_fecha_id'),
+        ),
+        migrations.AddIndex(
+            model_name='pesaje',
+            index=models.Index(fields=['animal', 'fecha'], name='pesaje_animal_fecha'),
+        ),
+        migrations.AddIndex(
+            model_name='pesaje',
+            index=models.Index(fields=['finca', 'fecha'], name='pesaje_finca_fecha'),
+        ),
+        migrations.AddIndex(
+            model_name='produccionleche',
+            index=models.Index(fields=['fecha', 'id'], name='produccion_fecha_id'),
+        ),
+        migrations.AddIndex(
+            model_name='produccionleche',
+            index=models.Index(fields=['finca', 'fecha'], name='produccion_finca_fecha'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:14
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finca', '0001_initial'),
+        ('ganaderia', '0009_indices_por_fecha'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(django.db.models.functions.text.Upper('numero_arete'), name='animal_arete_upper'),
+        ),
+    ]
@@ -1,4 +1,9 @@
-from django.db import models
+import unicodedata
+
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Upper
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.urls import reverse
@@ -6,6 +11,22 @@ from django.urls import reverse
 from apps.finca.models import Finca
 from apps.users.models import User
 
+def normalizar_busqueda(texto):
+    """Pliega tildes, mayúsculas y espacios: "  Ñandú  Blanca" -> "nandu blanca"."""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.casefold().split())
+
+
+def clave_busqueda_para(numero_arete, nombre):
+    return normalizar_busqueda(f"{numero_arete} {nombre}")[:160]
+
+
+def clave_arete(numero_arete):
+    """Arete sin espacios ni mayúsculas, para cruzar varios aretes como by_arete (iexact)."""
+    return (numero_arete or "").strip().upper()
+
+
 class AnimalQuerySet(models.QuerySet):
     def activos(self):
         return self.filter(estado='activo')
@@ -13,12 +34,59 @@ class AnimalQuerySet(models.QuerySet):
     def by_arete(self, numero_arete):
         return self.filter(numero_arete__iexact=numero_arete)
 
-class AnimalManager(models.Manager):
-    def get_queryset(self):
-        return AnimalQuerySet(self.model, using=self._db)
-
+    def by_aretes(self, aretes):
+        """Varios aretes en una consulta, sin distinguir mayúsculas; anota `arete_clave` (clave_arete)."""
+        return self.annotate(arete_clave=Upper('numero_arete')).filter(
+            arete_clave__in={clave_arete(arete) for arete in aretes}
+        )
+
+    def descendientes_de(self, animal, profundidad=None, recursivo=False):
+        """
+        Crías, nietas, etc. de `animal`, anotadas con `profundidad` (1 = cría).
+        Con recursivo=True se recorre madre_id con WITH RECURSIVE en vez de
+        leer la tabla Genealogia (sin anotación).
+        """
+        return self._linea(animal, profundidad, recursivo, hacia_ancestros=False)
+
+    def ancestros_de(self, animal, profundidad=None, recursivo=False):
+        """Madre, abuela, etc. de `animal` (1 = madre); mismos parámetros que descendientes_de."""
+        return self._linea(animal, profundidad, recursivo, hacia_ancestros=True)
+
+    def _linea(self, animal, profundidad, recursivo, hacia_ancestros):
+        animal_id = getattr(animal, 'pk', animal)
+        if recursivo:
+            from .genealogia import sql_linea
+            sql, tope = sql_linea(hacia_ancestros, profundidad)
+            return self.filter(id__in=RawSQL(sql, [animal_id, tope]))
+
+        relacion, extremo = (
+            ('genealogia_descendientes', 'descendiente') if hacia_ancestros
+            else ('genealogia_ancestros', 'ancestro')
+        )
+        filtro = {f'{relacion}__{extremo}_id': animal_id}
+        if profundidad:
+            filtro[f'{relacion}__profundidad__lte'] = profundidad
+        return self.filter(**filtro).annotate(profundidad=F(f'{relacion}__profundidad'))
+
+class AnimalManager(models.Manager.from_queryset(AnimalQuerySet)):
     def get_by_arete(self, numero_arete):
-        return self.get_queryset().by_arete(numero_arete).first()
+        """Animal (con su finca) o None; se sirve desde cache_aretes."""
+        from .cache import cache_aretes
+        return cache_aretes.obtener(numero_arete)
+
+    async def aget_by_arete(self, numero_arete):
+        from .cache import cache_aretes
+        return await cache_aretes.aobtener(numero_arete)
+
+
+# Madre no cargada (.only/.defer): se recalcula la genealogía por si acaso.
+MADRE_DESCONOCIDA = object()
+
+CAMPOS_ULTIMOS = (
+    'ultimo_peso', 'fecha_ultimo_pesaje', 'ultima_produccion_total',
+    'fecha_ultima_produccion', 'ultimo_evento_sanitario',
+)
+
 
 class Animal(models.Model):
     ESTADO_CHOICES = [
@@ -38,6 +106,13 @@ class Animal(models.Model):
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='activo')
     finca = models.ForeignKey(Finca, on_delete=models.PROTECT, related_name='animales')
     madre = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='crias')
+    clave_busqueda = models.CharField(max_length=160, blank=True, editable=False, db_index=True)
+    # Último dato de cada historial (ver ultimos.py), para listar y ordenar sin joins.
+    ultimo_peso = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    fecha_ultimo_pesaje = models.DateField(null=True, blank=True, editable=False, db_index=True)
+    ultima_produccion_total = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    fecha_ultima_produccion = models.DateField(null=True, blank=True, editable=False, db_index=True)
+    ultimo_evento_sanitario = models.DateField(null=True, blank=True, editable=False, db_index=True)
     creado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
 
@@ -47,10 +122,55 @@ class Animal(models.Model):
         ordering = ['numero_arete']
         verbose_name = 'Animal'
         verbose_name_plural = 'Animales'
+        # by_aretes (traslados e importaciones) y numero_arete__iexact en PostgreSQL.
+        indexes = [
+            models.Index(Upper('numero_arete'), name='animal_arete_upper'),
+        ]
 
     def __str__(self):
         return f"{self.numero_arete} - {self.nombre or 'Sin nombre'}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        animal = super().from_db(db, field_names, values)
+        # Para invalidar también el arete anterior si se cambia.
+        animal._arete_original = animal.__dict__.get('numero_arete')
+        # Para mantener Genealogia solo cuando cambia la madre.
+        animal._madre_original = animal.__dict__.get('madre_id', MADRE_DESCONOCIDA)
+        # Para no pisar CAMPOS_ULTIMOS si quien guarda no los cambió.
+        animal._ultimos_originales = animal._valores_ultimos()
+        return animal
+
+    def _valores_ultimos(self):
+        return {campo: self.__dict__[campo] for campo in CAMPOS_ULTIMOS if campo in self.__dict__}
+
+    def _ultimos_modificados(self):
+        originales = getattr(self, '_ultimos_originales', None)
+        return originales is None or originales != self._valores_ultimos()
+
+    def save(self, *args, **kwargs):
+        self.clave_busqueda = clave_busqueda_para(self.numero_arete, self.nombre)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding and not self._ultimos_modificados():
+            # ultimos.py escribe CAMPOS_ULTIMOS con update(): si esta instancia
+            # no los cambió, sus valores pueden ser viejos y no se guardan.
+            self._guardar_sin_ultimos(*args, **kwargs)
+        else:
+            if update_fields is not None and {'numero_arete', 'nombre'} & set(update_fields):
+                kwargs['update_fields'] = {*update_fields, 'clave_busqueda'}
+            super().save(*args, **kwargs)
+        self._ultimos_originales = self._valores_ultimos()
+
+    def _guardar_sin_ultimos(self, *args, **kwargs):
+        diferidos = self.get_deferred_fields()
+        campos = [
+            f.name for f in self._meta.concrete_fields
+            if not f.primary_key and f.name not in CAMPOS_ULTIMOS and f.attname not in diferidos
+        ]
+        # Con update_fields es siempre un UPDATE: si otra petición borró la
+        # fila, Django lanza DatabaseError en vez de volver a insertarla.
+        super().save(*args, update_fields=campos, **kwargs)
+
     def clean(self):
         if self.madre and self.madre.id == self.id:
             raise ValidationError("Un animal no puede ser su propia madre.")
@@ -85,6 +205,12 @@ class Pesaje(models.Model):
         ordering = ['-fecha']
         verbose_name = 'Pesaje'
         verbose_name_plural = 'Pesajes'
+        # Rangos de fecha (periodos.py) y listados por llave, del hato, de un animal o de una finca.
+        indexes = [
+            models.Index(fields=['fecha', 'id'], name='pesaje_fecha_id'),
+            models.Index(fields=['animal', 'fecha'], name='pesaje_animal_fecha'),
+            models.Index(fields=['finca', 'fecha'], name='pesaje_finca_fecha'),
+        ]
 
     def __str__(self):
         return f"{self.animal.numero_arete} - {self.peso}kg - {self.fecha}"
@@ -134,6 +260,15 @@ class ProduccionLeche(models.Model):
         ordering = ['-fecha']
         verbose_name = 'Producción de Leche'
         verbose_name_plural = 'Producción de Leche'
+        constraints = [
+            # AM y PM del mismo día van en la misma fila (ver ProduccionService).
+            models.UniqueConstraint(fields=['animal', 'fecha'], name='produccion_unica_animal_fecha'),
+        ]
+        # (animal, fecha) ya lo cubre la restricción única.
+        indexes = [
+            models.Index(fields=['fecha', 'id'], name='produccion_fecha_id'),
+            models.Index(fields=['finca', 'fecha'], name='produccion_finca_fecha'),
+        ]
 
     @property
     def total_diario(self):
@@ -153,6 +288,113 @@ class ProduccionLeche(models.Model):
 
         return super().clean()
 
+class ProduccionDiariaFinca(models.Model):
+    """
+    Producción agregada por (finca, día), mantenida por rollups.py. Los
+    litros tratan un turno vacío como 0; registros_am/pm cuentan cuántas
+    vacas tienen ese turno registrado.
+    """
+    finca = models.ForeignKey(Finca, on_delete=models.CASCADE, related_name='produccion_diaria')
+    fecha = models.DateField()
+    litros = models.FloatField(default=0)
+    litros_am = models.FloatField(default=0)
+    litros_pm = models.FloatField(default=0)
+    vacas = models.IntegerField(default=0)
+    registros_am = models.IntegerField(default=0)
+    registros_pm = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-fecha']
+        verbose_name = 'Producción diaria por finca'
+        verbose_name_plural = 'Producción diaria por finca'
+        constraints = [
+            models.UniqueConstraint(fields=['finca', 'fecha'], name='produccion_diaria_finca_fecha'),
+        ]
+        indexes = [models.Index(fields=['fecha'])]
+
+    @property
+    def promedio_por_vaca(self):
+        return self.litros / self.vacas if self.vacas else 0
+
+
+class ProduccionMensualAnimal(models.Model):
+    """Producción agregada por (animal, mes); `mes` es el primer día del mes."""
+    animal = models.ForeignKey(Animal, on_delete=models.CASCADE, related_name='produccion_mensual')
+    mes = models.DateField()
+    litros = models.FloatField(default=0)
+    litros_am = models.FloatField(default=0)
+    litros_pm = models.FloatField(default=0)
+    dias = models.IntegerField(default=0)
+    registros_am = models.IntegerField(default=0)
+    registros_pm = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-mes']
+        verbose_name = 'Producción mensual por animal'
+        verbose_name_plural = 'Producción mensual por animal'
+        constraints = [
+            models.UniqueConstraint(fields=['animal', 'mes'], name='produccion_mensual_animal_mes'),
+        ]
+
+    @property
+    def promedio_diario(self):
+        return self.litros / self.dias if self.dias else 0
+
+
+class Lactancia(models.Model):
+    """
+    Resumen de una lactancia (del parto al último ordeño antes del
+    siguiente parto), calculado por lactancias.py / calcular_lactancias.
+    La curva ajustada es la de Wood: y(t) = a · t^b · e^(-c·t).
+    """
+    animal = models.ForeignKey(Animal, on_delete=models.CASCADE, related_name='lactancias')
+    numero = models.PositiveSmallIntegerField()
+    fecha_parto = models.DateField()
+    fecha_ultimo_registro = models.DateField()
+    dias_en_leche = models.PositiveIntegerField()
+    registros = models.PositiveIntegerField()
+    litros = models.FloatField()
+    pico_litros = models.FloatField()
+    dia_pico = models.PositiveIntegerField()
+    proyeccion_305 = models.FloatField(null=True, blank=True)
+    persistencia = models.FloatField(null=True, blank=True)
+    wood_a = models.FloatField(null=True, blank=True)
+    wood_b = models.FloatField(null=True, blank=True)
+    wood_c = models.FloatField(null=True, blank=True)
+    calculado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-fecha_parto']
+        verbose_name = 'Lactancia'
+        verbose_name_plural = 'Lactancias'
+        constraints = [
+            models.UniqueConstraint(fields=['animal', 'fecha_parto'], name='lactancia_unica_animal_parto'),
+        ]
+
+    def __str__(self):
+        return f"{self.animal.numero_arete} - lactancia {self.numero}"
+
+
+class Genealogia(models.Model):
+    """
+    Tabla de cierre de Animal.madre (ver genealogia.py): una fila por cada
+    ancestro de cada animal, sin la fila del animal consigo mismo.
+    """
+    ancestro = models.ForeignKey(Animal, on_delete=models.CASCADE, related_name='genealogia_descendientes')
+    descendiente = models.ForeignKey(Animal, on_delete=models.CASCADE, related_name='genealogia_ancestros')
+    profundidad = models.PositiveSmallIntegerField()
+
+    class Meta:
+        verbose_name = 'Genealogía'
+        verbose_name_plural = 'Genealogía'
+        constraints = [
+            models.UniqueConstraint(fields=['ancestro', 'descendiente'], name='genealogia_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['descendiente', 'profundidad'], name='genealogia_desc_prof'),
+        ]
+
+
 class EventoSalida(models.Model):
     TIPO_CHOICES = [('venta', 'Venta'), ('muerte', 'Muerte'), ('descarte','Descarte')]
     id = models.BigAutoField(primary_key=True)
@@ -195,3 +437,62 @@ class Traslado(models.Model):
             raise ValidationError("La finca destino debe ser diferente a la origen.")
         super().clean()
 
+
+
+class VersionDatosManager(models.Manager):
+    def incrementar(self, *modelos):
+        ahora = timezone.now()
+        for modelo in modelos:
+            etiqueta = modelo._meta.label_lower
+            actualizados = self.filter(modelo=etiqueta).update(
+                version=F('version') + 1, actualizado_en=ahora
+            )
+            if not actualizados:
+                self.get_or_create(modelo=etiqueta, defaults={'version': 1})
+
+    def incrementar_al_confirmar(self, *modelos):
+        # Fuera de la transacción del escritor, para no retener el bloqueo
+        # de la fila de versión mientras dura la transacción.
+        transaction.on_commit(lambda: self.incrementar(*modelos))
+
+    def versiones(self, *modelos):
+        etiquetas = [modelo._meta.label_lower for modelo in modelos]
+        encontradas = dict(
+            self.filter(modelo__in=etiquetas).values_list('modelo', 'version')
+        )
+        return {etiqueta: encontradas.get(etiqueta, 0) for etiqueta in etiquetas}
+
+    def sello(self, *modelos):
+        """
+        Versión y fecha de la última escritura de cada modelo en una cadena,
+        para llaves de caché: cambia con cualquier escritura en `modelos`.
+        """
+        etiquetas = [modelo._meta.label_lower for modelo in modelos]
+        filas = {
+            modelo: (version, actualizado_en)
+            for modelo, version, actualizado_en in
+            self.filter(modelo__in=etiquetas).values_list('modelo', 'version', 'actualizado_en')
+        }
+        return ".".join(
+            f"{filas[etiqueta][0]}-{filas[etiqueta][1].timestamp():.6f}" if etiqueta in filas else "0"
+            for etiqueta in etiquetas
+        )
+
+
+class VersionDatos(models.Model):
+    """
+    Sello de versión por modelo: se incrementa con cada escritura y permite
+    saber si un artefacto derivado (archivo exportado, caché) sigue vigente.
+    """
+    modelo = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    actualizado_en = models.DateTimeField(default=timezone.now)
+
+    objects = VersionDatosManager()
+
+    class Meta:
+        verbose_name = 'Versión de datos'
+        verbose_name_plural = 'Versiones de datos'
+
+    def __str__(self):
+        return f"{self.modelo} v{self.version}"
@@ -0,0 +1,145 @@
+# apps/ganaderia/paginacion.py
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+SIGUIENTE = "n"
+ANTERIOR = "p"
+
+
+class KeysetPage:
+    def __init__(self, object_list, has_next, has_previous, next_cursor,
+                 previous_cursor, parametros, nombre_parametro):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self._parametros = parametros
+        self._nombre_parametro = nombre_parametro
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def _querystring(self, cursor):
+        parametros = self._parametros.copy()
+        parametros[self._nombre_parametro] = cursor
+        return parametros.urlencode()
+
+    @property
+    def querystring_siguiente(self):
+        return self._querystring(self.next_cursor) if self.has_next else ""
+
+    @property
+    def querystring_anterior(self):
+        return self._querystring(self.previous_cursor) if self.has_previous else ""
+
+
+class KeysetPaginator:
+    """
+    Paginación por llave (keyset): en vez de OFFSET + COUNT, cada página
+    filtra "después de la última fila vista" sobre el orden natural del
+    modelo, de modo que la página N cuesta lo mismo que la primera si hay
+    un índice que cubra `ordering`.
+
+    `ordering` debe terminar en un campo único (normalmente el id) para
+    que el orden sea total, por ejemplo ('-fecha', '-id').
+    """
+
+    def __init__(self, queryset, ordering, per_page=25, nombre_parametro="cursor"):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.nombre_parametro = nombre_parametro
+
+        opts = queryset.model._meta
+        self._campos = []
+        for orden in self.ordering:
+            nombre = orden.lstrip("-")
+            campo = opts.pk if nombre == "pk" else opts.get_field(nombre)
+            self._campos.append((campo, orden.startswith("-")))
+
+    def get_page(self, parametros):
+        direccion, valores = self._decodificar(parametros.get(self.nombre_parametro))
+
+        if direccion == ANTERIOR:
+            filas = list(
+                self.queryset
+                .filter(self._condicion(valores, hacia_adelante=False))
+                .order_by(*self._invertir(self.ordering))[:self.per_page + 1]
+            )
+            has_previous = len(filas) > self.per_page
+            filas = list(reversed(filas[:self.per_page]))
+            has_next = True
+        else:
+            queryset = self.queryset.order_by(*self.ordering)
+            if direccion == SIGUIENTE:
+                queryset = queryset.filter(self._condicion(valores, hacia_adelante=True))
+            filas = list(queryset[:self.per_page + 1])
+            has_next = len(filas) > self.per_page
+            filas = filas[:self.per_page]
+            has_previous = direccion == SIGUIENTE
+
+        return KeysetPage(
+            filas,
+            has_next=has_next and bool(filas),
+            has_previous=has_previous and bool(filas),
+            next_cursor=self._codificar(SIGUIENTE, filas[-1]) if filas else None,
+            previous_cursor=self._codificar(ANTERIOR, filas[0]) if filas else None,
+            parametros=parametros,
+            nombre_parametro=self.nombre_parametro,
+        )
+
+    def _condicion(self, valores, hacia_adelante):
+        """
+        (a, b, c) > (x, y, z) expandido como
+        a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z),
+        con > o < según la dirección de cada campo.
+        """
+        condicion = Q()
+        iguales = {}
+        for (campo, descendente), valor in zip(self._campos, valores):
+            hacia_menores = descendente == hacia_adelante
+            lookup = "lt" if hacia_menores else "gt"
+            condicion |= Q(**iguales, **{f"{campo.attname}__{lookup}": valor})
+            iguales[campo.attname] = valor
+        return condicion
+
+    @staticmethod
+    def _invertir(ordering):
+        return [orden[1:] if orden.startswith("-") else f"-{orden}" for orden in ordering]
+
+    def _codificar(self, direccion, obj):
+        valores = [getattr(obj, campo.attname) for campo, _ in self._campos]
+        contenido = json.dumps([direccion, valores], cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(contenido.encode()).decode().rstrip("=")
+
+    def _decodificar(self, cursor):
+        """Un cursor ilegible o manipulado simplemente lleva a la primera página."""
+        if not cursor:
+            return None, None
+        try:
+            relleno = "=" * (-len(cursor) % 4)
+            direccion, valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+            if direccion not in (SIGUIENTE, ANTERIOR) or len(valores) != len(self._campos):
+                return None, None
+            valores = [
+                campo.to_python(valor) for (campo, _), valor in zip(self._campos, valores)
+            ]
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            return None, None
+        return direccion, valores
+
+
+def paginar(request, queryset, ordering, per_page=25):
+    return KeysetPaginator(queryset, ordering, per_page).get_page(request.GET)
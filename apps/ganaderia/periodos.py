@@ -0,0 +1,132 @@
+# apps/ganaderia/periodos.py
+"""
+Filtro de período común a los listados y exportaciones por fecha.
+
+Los parámetros (?mes=&anio=, ?semana=AAAA-Www o ?desde=&hasta=) se
+traducen siempre a un rango `fecha >= desde AND fecha < hasta`, que usa
+los índices compuestos (fecha, id) / (animal, fecha) / (finca, fecha).
+Antes se filtraba con fecha__month, que no usa índice y junta el mismo
+mes de todos los años.
+"""
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+from .rollups import mes_siguiente
+
+PARAMETROS_PERIODO = ("mes", "anio", "semana", "desde", "hasta")
+
+NOMBRES_MESES = [
+    "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio",
+    "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre",
+]
+
+
+class Periodo:
+    """Rango semiabierto [desde, hasta); cualquiera de los dos puede faltar."""
+
+    def __init__(self, desde=None, hasta=None, etiqueta=""):
+        self.desde = desde
+        self.hasta = hasta
+        self.etiqueta = etiqueta
+        # Parámetros originales, para repetir el filtro en enlaces (exportar).
+        self.querystring = ""
+
+    def condicion(self, campo="fecha"):
+        condicion = {}
+        if self.desde:
+            condicion[f"{campo}__gte"] = self.desde
+        if self.hasta:
+            condicion[f"{campo}__lt"] = self.hasta
+        return condicion
+
+    def __str__(self):
+        return self.etiqueta
+
+
+def _fecha(texto):
+    try:
+        return date.fromisoformat(texto)
+    except ValueError:
+        return None
+
+
+def _entero(texto):
+    try:
+        return int(texto)
+    except ValueError:
+        return None
+
+
+def _por_mes(mes, anio, hoy):
+    # "2024-03" (input type=month) o mes suelto 1-12 con ?anio= opcional.
+    if "-" in mes:
+        anio, _, mes = mes.partition("-")
+        anio = _entero(anio)
+    mes = _entero(mes)
+    if mes is None or not 1 <= mes <= 12:
+        return None
+    if anio is None:
+        # Sin año, el último mes con ese número que no esté en el futuro.
+        anio = hoy.year if mes <= hoy.month else hoy.year - 1
+    try:
+        desde = date(anio, mes, 1)
+    except ValueError:
+        return None
+    # Diciembre de 9999 no tiene mes siguiente: rango abierto, como ?anio=9999.
+    hasta = mes_siguiente(desde) if desde < date(date.max.year, 12, 1) else None
+    return Periodo(desde, hasta, f"{NOMBRES_MESES[mes - 1]} {anio}")
+
+
+def _por_semana(semana):
+    # "2024-W05" (input type=week).
+    anio, _, numero = semana.upper().partition("-W")
+    anio, numero = _entero(anio), _entero(numero)
+    if anio is None or numero is None:
+        return None
+    try:
+        lunes = date.fromisocalendar(anio, numero, 1)
+    except ValueError:
+        return None
+    hasta = lunes + timedelta(days=7) if lunes <= date.max - timedelta(days=7) else None
+    return Periodo(lunes, hasta, f"Semana {numero} de {anio}")
+
+
+def periodo_desde(datos, hoy=None):
+    """
+    Lee el período de `datos` (request.GET o un dict de filtros). Devuelve
+    None si no hay ninguno o no se entiende; los valores inválidos se
+    ignoran igual que antes se ignoraba un mes inválido.
+    """
+    texto = {campo: str(datos.get(campo) or "").strip() for campo in PARAMETROS_PERIODO}
+    periodo = _interpretar(texto, hoy or date.today())
+    if periodo is not None:
+        periodo.querystring = urlencode({campo: valor for campo, valor in texto.items() if valor})
+    return periodo
+
+
+def _interpretar(texto, hoy):
+    if texto["desde"] or texto["hasta"]:
+        desde, hasta = _fecha(texto["desde"]), _fecha(texto["hasta"])
+        if desde or hasta:
+            etiqueta = f"{desde or '…'} a {hasta or '…'}"
+            # `hasta` se elige inclusivo en el formulario.
+            return Periodo(desde, hasta + timedelta(days=1) if hasta and hasta < date.max else None, etiqueta)
+    if texto["semana"]:
+        periodo = _por_semana(texto["semana"])
+        if periodo:
+            return periodo
+    if texto["mes"]:
+        return _por_mes(texto["mes"], _entero(texto["anio"]) if texto["anio"] else None, hoy)
+    if texto["anio"]:
+        anio = _entero(texto["anio"])
+        if anio and 1 <= anio <= 9999:
+            return Periodo(date(anio, 1, 1), date(anio + 1, 1, 1) if anio < 9999 else None, str(anio))
+    return None
+
+
+def filtrar_periodo(queryset, datos, campo="fecha", hoy=None):
+    """(queryset filtrado, período o None)."""
+    periodo = periodo_desde(datos, hoy)
+    if periodo is None:
+        return queryset, None
+    return queryset.filter(**periodo.condicion(campo)), periodo
@@ -0,0 +1,393 @@
+# apps/ganaderia/planes.py
+"""
+Revisión de planes de consulta (comando analizar_consultas).
+
+consultas_representativas() arma, con filtros tomados de los datos
+reales, los querysets que ejecutan los listados, exportaciones y el
+tablero. analizar() corre EXPLAIN QUERY PLAN (SQLite) o EXPLAIN (FORMAT
+JSON) (PostgreSQL) sobre cada uno y marca:
+
+- recorridos completos de tablas grandes (SCAN / Seq Scan), o de un
+  índice entero cuando la condición no lo puede usar (iexact en SQLite),
+- ordenamientos sin índice (USE TEMP B-TREE / Sort),
+- predicados sobre funciones de la columna (UPPER(), EXTRACT(), ...),
+  que ningún índice normal puede resolver.
+
+Para cada recorrido completo propone un índice con las columnas de la
+condición (primero igualdades, luego rangos y al final el orden), y
+texto_migracion() lo deja listo como migración para revisar.
+"""
+import json
+import re
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection, migrations, models
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+from django.db.models.functions import Upper
+from django.db.models.lookups import Lookup
+from django.utils import timezone
+
+BUSQUEDA, RECORRIDO_INDICE, RECORRIDO = "busqueda", "recorrido_indice", "recorrido"
+
+LOOKUPS_IGUALDAD = {"exact", "iexact", "in", "isnull"}
+LOOKUPS_RANGO = {"gt", "gte", "lt", "lte", "range", "startswith"}
+
+PATRONES_FUNCIONALES = [
+    (re.compile(r"\b(UPPER|LOWER)\s*\(", re.I), "UPPER()/LOWER() sobre la columna"),
+    (re.compile(r"\bEXTRACT\s*\(|django_date_extract|strftime\s*\(", re.I),
+     "EXTRACT() sobre la fecha: use un rango (periodos.filtrar_periodo)"),
+    (re.compile(r"\bDATE_TRUNC\s*\(|django_date_trunc", re.I), "DATE_TRUNC() sobre la fecha"),
+]
+
+
+class Consulta:
+    def __init__(self, nombre, vista, queryset):
+        self.nombre = nombre
+        self.vista = vista
+        self.queryset = queryset
+
+
+class Hallazgo:
+    def __init__(self, consulta, tipo, detalle, tabla=None, filas=None, indice=None):
+        self.consulta = consulta
+        self.tipo = tipo
+        self.detalle = detalle
+        self.tabla = tabla
+        self.filas = filas
+        # (modelo, models.Index) sugerido, si corresponde.
+        self.indice = indice
+
+
+def _muestras():
+    """Valores reales para que los filtros se parezcan a los de producción."""
+    from .models import Animal, Pesaje
+
+    arete = Animal.objects.order_by("-id").values_list("numero_arete", flat=True).first() or "A0001"
+    ultima = Pesaje.objects.order_by("-fecha").values_list("fecha", flat=True).first() or timezone.localdate()
+    return {
+        "arete": arete,
+        "texto": arete[:4],
+        "periodo": {"mes": str(ultima.month), "anio": str(ultima.year)},
+    }
+
+
+def consultas_representativas():
+    from apps.exportaciones.registro import TIPOS
+    from apps.inventario.models import ResumenHato
+    from apps.inventario.views import DIAS_PRODUCCION
+    from apps.salud.models import ConfirmacionGestacion, EventoSanitario, Inseminacion
+    from .busqueda import filtrar_animales
+    from .models import Animal, EventoSalida, Parto, Pesaje, ProduccionDiariaFinca, ProduccionLeche, Traslado
+    from .periodos import filtrar_periodo
+
+    m = _muestras()
+    pagina = 26  # per_page + 1 de la paginación por llave
+    periodo = m["periodo"]
+
+    def exportacion(nombre):
+        tipo = TIPOS[nombre]
+        return tipo.queryset(tipo.limpiar_filtros(periodo))
+
+    return [
+        Consulta("animales_busqueda", "ganaderia:animales_list",
+                 filtrar_animales(Animal.objects.select_related("finca"), m["texto"])
+                 .order_by("numero_arete")[:pagina]),
+        Consulta("animales_por_peso", "ganaderia:animales_list",
+                 Animal.objects.select_related("finca").filter(ultimo_peso__isnull=False, ultimo_peso__gte=300)
+                 .order_by("-ultimo_peso", "numero_arete")[:pagina]),
+        Consulta("arete", "ganaderia:buscar_animal_por_arete",
+                 Animal.objects.select_related("finca").filter(numero_arete__iexact=m["arete"])[:1]),
+        Consulta("pesajes", "ganaderia:pesajes_list",
+                 filtrar_periodo(Pesaje.objects.select_related("animal"), periodo)[0]
+                 .order_by("-fecha", "-id")[:pagina]),
+        Consulta("pesajes_excel", "ganaderia:exportar_pesajes_excel",
+                 exportacion("pesajes").select_related("animal", "finca")),
+        Consulta("produccion", "ganaderia:produccion_detalle",
+                 filtrar_periodo(ProduccionLeche.objects.select_related("animal", "finca"), periodo)[0]
+                 .order_by("-fecha", "-id")[:pagina]),
+        Consulta("produccion_excel", "ganaderia:produccion_exportar",
+                 exportacion("produccion").select_related("animal", "finca")),
+        Consulta("partos", "ganaderia:partos_list",
+                 Parto.objects.select_related("madre", "cria", "finca")
+                 .filter(madre__in=filtrar_animales(Animal.objects.all(), m["texto"]))
+                 .order_by("-fecha_nacimiento", "-id")[:11]),
+        Consulta("salidas", "ganaderia:eventos_salida_list",
+                 EventoSalida.objects.select_related("animal").filter(tipo_evento="venta")
+                 .order_by("-fecha", "-id")[:pagina]),
+        Consulta("traslados", "ganaderia:traslados",
+                 Traslado.objects.filter(animal__in=filtrar_animales(Animal.objects.all(), m["texto"]))),
+        Consulta("eventos_sanitarios", "salud:evento_sanitario_list",
+                 filtrar_periodo(EventoSanitario.objects.select_related("animal"), periodo)[0]
+                 .order_by("-fecha", "-id")[:pagina]),
+        Consulta("eventos_sanitarios_excel", "salud:export_eventos_excel",
+                 exportacion("eventos_sanitarios").select_related("animal")),
+        Consulta("inseminaciones", "salud:inseminacion_list",
+                 Inseminacion.objects.select_related("animal", "responsable").order_by("-fecha", "-id")[:pagina]),
+        Consulta("gestacion_pendientes", "salud:gestacion_pendientes",
+                 Inseminacion.objects.filter(confirmaciongestacion__isnull=True)),
+        Consulta("confirmaciones", "salud:gestacion_historial",
+                 filtrar_periodo(ConfirmacionGestacion.objects.select_related("inseminacion__animal"),
+                                 periodo, campo="fecha_confirmacion")[0]
+                 .filter(resultado="gestante").order_by("-fecha_confirmacion", "-id")[:pagina]),
+        Consulta("tablero_resumen", "inventario:dashboard",
+                 ResumenHato.objects.select_related("finca").order_by("finca__nombre")),
+        Consulta("tablero_produccion", "inventario:dashboard",
+                 ProduccionDiariaFinca.objects.filter(
+                     fecha__gte=timezone.localdate() - timedelta(days=DIAS_PRODUCCION - 1))
+                 .values_list("finca_id", "fecha", "litros", "vacas")),
+    ]
+
+
+# --- Planes ---------------------------------------------------------------
+
+def _plan_sqlite(sql, params):
+    """
+    (líneas del plan, [(tabla, alias, acceso, línea)], [ordenamientos]);
+    acceso es BUSQUEDA, RECORRIDO_INDICE o RECORRIDO.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        filas = [fila[-1] for fila in cursor.fetchall()]
+    recorridos, ordenamientos = [], []
+    for detalle in filas:
+        coincidencia = re.match(r"(SCAN|SEARCH) (?:TABLE )?(\w+)(?: AS (\w+))?(.*)", detalle)
+        if coincidencia:
+            accion, tabla, alias, resto = coincidencia.groups()
+            if "VIRTUAL TABLE" in resto:
+                continue
+            if accion == "SEARCH":
+                acceso = BUSQUEDA
+            else:
+                acceso = RECORRIDO_INDICE if "USING" in resto else RECORRIDO
+            recorridos.append((tabla, alias, acceso, detalle))
+        elif "TEMP B-TREE" in detalle:
+            ordenamientos.append(detalle)
+    return filas, recorridos, ordenamientos
+
+
+def _plan_postgresql(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    filas, recorridos, ordenamientos = [], [], []
+
+    def recorrer(nodo, nivel=0):
+        tipo = nodo["Node Type"]
+        filas.append(f"{'  ' * nivel}{tipo} {nodo.get('Relation Name', '')} (filas≈{nodo.get('Plan Rows')})")
+        if "Relation Name" in nodo:
+            if tipo == "Seq Scan":
+                acceso = RECORRIDO
+            elif tipo in ("Index Scan", "Index Only Scan") and "Index Cond" not in nodo:
+                acceso = RECORRIDO_INDICE
+            else:
+                acceso = BUSQUEDA
+            recorridos.append((nodo["Relation Name"], nodo.get("Alias"), acceso, filas[-1].strip()))
+        if tipo == "Sort":
+            ordenamientos.append(f"Sort {', '.join(nodo.get('Sort Key', []))}")
+        for hijo in nodo.get("Plans", []):
+            recorrer(hijo, nivel + 1)
+
+    recorrer(plan[0]["Plan"])
+    return filas, recorridos, ordenamientos
+
+
+def plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    if connection.vendor == "postgresql":
+        return _plan_postgresql(sql, params)
+    if connection.vendor == "sqlite":
+        return _plan_sqlite(sql, params)
+    raise NotImplementedError(f"EXPLAIN no soportado para {connection.vendor}")
+
+
+_conteos = {}
+
+
+def filas_estimadas(tabla):
+    if tabla not in _conteos:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [tabla])
+                fila = cursor.fetchone()
+                _conteos[tabla] = max(fila[0], 0) if fila else 0
+            else:
+                cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(tabla)}")
+                _conteos[tabla] = cursor.fetchone()[0]
+    return _conteos[tabla]
+
+
+def predicados_funcionales(sql):
+    donde = re.split(r"\bWHERE\b", sql, maxsplit=1, flags=re.I)
+    if len(donde) < 2:
+        return []
+    return [descripcion for patron, descripcion in PATRONES_FUNCIONALES if patron.search(donde[1])]
+
+
+# --- Sugerencias ----------------------------------------------------------
+
+def _modelo_de_tabla(tabla):
+    for modelo in apps.get_models():
+        if modelo._meta.db_table == tabla:
+            return modelo
+    return None
+
+
+def _lookups(nodo):
+    for hijo in nodo.children:
+        if isinstance(hijo, Lookup):
+            yield hijo
+        elif hasattr(hijo, "children"):
+            yield from _lookups(hijo)
+
+
+def columnas_sugeridas(queryset, tabla, alias=None, solo_condicion=False):
+    """
+    Columnas de `tabla` usadas por el queryset, en el orden en que
+    convendría indexarlas: igualdades, rangos y luego el ORDER BY.
+    Devuelve (campos, campos comparados con UPPER()).
+    """
+    query = queryset.query
+    alias = alias or tabla
+    igualdades, rangos, funcionales = [], [], []
+    for lookup in _lookups(query.where):
+        lhs = lookup.lhs
+        columna = getattr(lhs, "target", None)
+        if columna is None or getattr(lhs, "alias", None) not in (alias, tabla):
+            continue
+        if lookup.lookup_name == "iexact" and connection.vendor == "postgresql":
+            # Django lo traduce a UPPER(col) = UPPER(%s).
+            funcionales.append(columna.name)
+        elif lookup.lookup_name in LOOKUPS_IGUALDAD:
+            igualdades.append(columna.name)
+        elif lookup.lookup_name in LOOKUPS_RANGO:
+            rangos.append(columna.name)
+
+    orden = []
+    if not solo_condicion and query.model._meta.db_table == tabla:
+        opts = query.model._meta
+        for campo in query.order_by or opts.ordering:
+            if not isinstance(campo, str) or "__" in campo:
+                continue
+            nombre = campo.lstrip("-")
+            try:
+                orden.append(opts.pk.name if nombre == "pk" else opts.get_field(nombre).name)
+            except FieldDoesNotExist:
+                continue
+
+    campos = []
+    for nombre in igualdades + rangos + orden:
+        if nombre not in campos:
+            campos.append(nombre)
+    return campos, funcionales
+
+
+def _indices_existentes(modelo):
+    """Listas de columnas (por nombre de campo) que ya tienen índice."""
+    opts = modelo._meta
+    existentes = [[opts.pk.name]]
+    for campo in opts.concrete_fields:
+        if campo.db_index or campo.unique or isinstance(campo, models.ForeignKey):
+            existentes.append([campo.name])
+    for indice in opts.indexes:
+        existentes.append(list(indice.fields))
+    for restriccion in opts.constraints:
+        if isinstance(restriccion, models.UniqueConstraint) and restriccion.fields:
+            existentes.append(list(restriccion.fields))
+    existentes.extend(list(campos) for campos in opts.unique_together)
+    return existentes
+
+
+def indice_sugerido(modelo, campos, funcionales=()):
+    """
+    models.Index para `campos` (o sobre UPPER() de `funcionales`), o None
+    si ya hay uno que lo cubre.
+    """
+    if funcionales:
+        expresiones = [Upper(campo) for campo in funcionales]
+        if any(list(indice.expressions) == expresiones for indice in modelo._meta.indexes):
+            return None
+        nombre = f"{modelo._meta.model_name[:12]}_{'_'.join(funcionales)}"[:24]
+        return models.Index(*expresiones, name=f"{nombre}_upper")
+    if not campos:
+        return None
+    for existente in _indices_existentes(modelo):
+        if existente[:len(campos)] == campos:
+            return None
+    indice = models.Index(fields=campos)
+    indice.set_name_with_model(modelo)
+    return indice
+
+
+# --- Análisis -------------------------------------------------------------
+
+def analizar(consultas, minimo_filas=1000):
+    """Lista de (consulta, líneas del plan, [Hallazgo])."""
+    _conteos.clear()
+    resultados = []
+    for consulta in consultas:
+        sql, _ = consulta.queryset.query.sql_with_params()
+        lineas, recorridos, ordenamientos = plan(consulta.queryset)
+        hallazgos = []
+
+        for descripcion in predicados_funcionales(sql):
+            hallazgos.append(Hallazgo(consulta, "funcion", descripcion))
+
+        for tabla, alias, acceso, detalle in recorridos:
+            if acceso == BUSQUEDA:
+                continue
+            campos, funcionales = columnas_sugeridas(consulta.queryset, tabla, alias, solo_condicion=True)
+            # Recorrer un índice en orden (ORDER BY ... LIMIT) es lo esperado;
+            # solo preocupa si además hay que filtrar fila por fila.
+            if acceso == RECORRIDO_INDICE and not (campos or funcionales):
+                continue
+            filas = filas_estimadas(tabla)
+            if filas < minimo_filas:
+                continue
+            modelo = _modelo_de_tabla(tabla)
+            indice = None
+            if modelo is not None:
+                indice = indice_sugerido(modelo, *columnas_sugeridas(consulta.queryset, tabla, alias))
+            hallazgos.append(Hallazgo(
+                consulta, "recorrido", detalle, tabla=tabla, filas=filas,
+                indice=(modelo, indice) if indice is not None else None,
+            ))
+
+        tabla_principal = consulta.queryset.model._meta.db_table
+        if ordenamientos and filas_estimadas(tabla_principal) >= minimo_filas:
+            for detalle in ordenamientos:
+                hallazgos.append(Hallazgo(consulta, "orden", detalle, tabla=tabla_principal))
+        resultados.append((consulta, lineas, hallazgos))
+    return resultados
+
+
+def indices_por_app(resultados):
+    """{app_label: {(model_name, nombre_indice): (modelo, índice)}} sin repetidos."""
+    agrupados = {}
+    for _, _, hallazgos in resultados:
+        for hallazgo in hallazgos:
+            if hallazgo.indice is None:
+                continue
+            modelo, indice = hallazgo.indice
+            agrupados.setdefault(modelo._meta.app_label, {})[(modelo._meta.model_name, indice.name)] = (modelo, indice)
+    return agrupados
+
+
+def texto_migracion(app_label, indices, nombre="indices_sugeridos"):
+    """(ruta, contenido) de una migración con un AddIndex por índice sugerido."""
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    hojas = loader.graph.leaf_nodes(app_label)
+    numero = max((int(n.split("_")[0]) for _, n in hojas if n.split("_")[0].isdigit()), default=0) + 1
+
+    migracion = migrations.Migration(f"{numero:04d}_{nombre}", app_label)
+    migracion.dependencies = hojas
+    migracion.operations = [
+        migrations.AddIndex(model_name=modelo._meta.model_name, index=indice)
+        for modelo, indice in indices
+    ]
+    escritor = MigrationWriter(migracion)
+    return escritor.path, escritor.as_string()
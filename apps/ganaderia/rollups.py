@@ -0,0 +1,168 @@
+# apps/ganaderia/rollups.py
+"""
+Rollups de ProduccionLeche: ProduccionDiariaFinca (finca, fecha) y
+ProduccionMensualAnimal (animal, mes).
+
+- Altas, cambios y bajas de una fila (señales, registrar_turno) se
+  aplican como incrementos: UPDATE ... SET litros = litros + delta.
+- Las cargas masivas recalculan los días/meses que tocaron con un
+  agregado agrupado y un upsert (recalcular_dias / recalcular_meses).
+- reconstruir_mes() rehace un mes completo; lo usa el comando
+  reconstruir_rollups_produccion para el backfill por lotes.
+"""
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+
+from .models import ProduccionDiariaFinca, ProduccionLeche, ProduccionMensualAnimal, VersionDatos
+
+CAMPOS_LITROS = ('litros', 'litros_am', 'litros_pm')
+
+
+def inicio_mes(fecha):
+    return fecha.replace(day=1)
+
+
+def mes_siguiente(mes):
+    return date(mes.year + (mes.month == 12), mes.month % 12 + 1, 1)
+
+
+def aporte(valores, signo=1):
+    """
+    Lo que una fila de ProduccionLeche (dict con animal_id, finca_id,
+    fecha, peso_am, peso_pm) suma a cada rollup.
+    """
+    am = valores['peso_am']
+    pm = valores['peso_pm']
+    comunes = {
+        'litros': signo * ((am or 0) + (pm or 0)),
+        'litros_am': signo * (am or 0),
+        'litros_pm': signo * (pm or 0),
+        'registros_am': signo * (am is not None),
+        'registros_pm': signo * (pm is not None),
+    }
+    return {
+        (ProduccionDiariaFinca, valores['finca_id'], valores['fecha']): {**comunes, 'vacas': signo},
+        (ProduccionMensualAnimal, valores['animal_id'], inicio_mes(valores['fecha'])): {**comunes, 'dias': signo},
+    }
+
+
+def diferencia(anteriores, actuales):
+    """Deltas por rollup al pasar de `anteriores` a `actuales` (cualquiera puede ser None)."""
+    deltas = {}
+    for valores, signo in ((anteriores, -1), (actuales, 1)):
+        if not valores:
+            continue
+        for clave, campos in aporte(valores, signo).items():
+            acumulado = deltas.setdefault(clave, {})
+            for campo, valor in campos.items():
+                acumulado[campo] = acumulado.get(campo, 0) + valor
+    return deltas
+
+
+def _conteo(modelo):
+    return 'vacas' if modelo is ProduccionDiariaFinca else 'dias'
+
+
+def _filtro(modelo, llave, periodo):
+    if modelo is ProduccionDiariaFinca:
+        return {'finca_id': llave, 'fecha': periodo}
+    return {'animal_id': llave, 'mes': periodo}
+
+
+def aplicar(deltas):
+    for (modelo, llave, periodo), campos in deltas.items():
+        campos = {c: v for c, v in campos.items() if v}
+        if not campos:
+            continue
+        filtro = _filtro(modelo, llave, periodo)
+        filas = modelo.objects.filter(**filtro)
+        cambios = {campo: F(campo) + valor for campo, valor in campos.items()}
+        conteo = campos.get(_conteo(modelo), 0)
+        if not filas.update(**cambios) and conteo > 0:
+            # Primera fila del periodo. Si no es un alta (p. ej. el rollup ya
+            # se borró en cascada con el animal) no hay nada que descontar.
+            try:
+                with transaction.atomic():
+                    modelo.objects.create(**filtro)
+            except IntegrityError:
+                pass
+            filas.update(**cambios)
+
+        if conteo < 0:
+            filas.filter(**{f'{_conteo(modelo)}__lte': 0}).delete()
+
+
+def _agregados(queryset):
+    return queryset.annotate(
+        litros_am=Sum(Coalesce('peso_am', Value(0.0))),
+        litros_pm=Sum(Coalesce('peso_pm', Value(0.0))),
+        n=Count('id'),
+        registros_am=Count('peso_am'),
+        registros_pm=Count('peso_pm'),
+    ).order_by()
+
+
+def _filas_diarias(produccion):
+    return [
+        ProduccionDiariaFinca(
+            finca_id=fila['finca_id'], fecha=fila['fecha'],
+            litros=fila['litros_am'] + fila['litros_pm'],
+            litros_am=fila['litros_am'], litros_pm=fila['litros_pm'], vacas=fila['n'],
+            registros_am=fila['registros_am'], registros_pm=fila['registros_pm'],
+        )
+        for fila in _agregados(produccion.values('finca_id', 'fecha'))
+    ]
+
+
+def _filas_mensuales(produccion):
+    return [
+        ProduccionMensualAnimal(
+            animal_id=fila['animal_id'], mes=fila['mes_'],
+            litros=fila['litros_am'] + fila['litros_pm'],
+            litros_am=fila['litros_am'], litros_pm=fila['litros_pm'], dias=fila['n'],
+            registros_am=fila['registros_am'], registros_pm=fila['registros_pm'],
+        )
+        for fila in _agregados(produccion.annotate(mes_=TruncMonth('fecha')).values('animal_id', 'mes_'))
+    ]
+
+
+def _upsert(modelo, filas, unicos):
+    campos = list(CAMPOS_LITROS) + ['registros_am', 'registros_pm', _conteo(modelo)]
+    modelo.objects.bulk_create(
+        filas, batch_size=500, update_conflicts=True, unique_fields=unicos, update_fields=campos,
+    )
+
+
+def recalcular_dias(fechas):
+    """Rehace todas las fincas en `fechas` (tras una carga que no pasa por señales)."""
+    if fechas:
+        _upsert(ProduccionDiariaFinca, _filas_diarias(
+            ProduccionLeche.objects.filter(fecha__in=fechas)), ['finca', 'fecha'])
+
+
+def recalcular_meses(animal_ids, meses):
+    if not animal_ids or not meses:
+        return
+    desde, hasta = min(meses), mes_siguiente(max(meses))
+    produccion = ProduccionLeche.objects.filter(
+        animal_id__in=animal_ids, fecha__gte=desde, fecha__lt=hasta
+    )
+    _upsert(ProduccionMensualAnimal, _filas_mensuales(produccion), ['animal', 'mes'])
+
+
+@transaction.atomic
+def reconstruir_mes(mes):
+    """Borra y recalcula los dos rollups de un mes completo. Devuelve las filas creadas."""
+    mes = inicio_mes(mes)
+    siguiente = mes_siguiente(mes)
+    produccion = ProduccionLeche.objects.filter(fecha__gte=mes, fecha__lt=siguiente)
+
+    ProduccionDiariaFinca.objects.filter(fecha__gte=mes, fecha__lt=siguiente).delete()
+    ProduccionMensualAnimal.objects.filter(mes=mes).delete()
+    diarias = ProduccionDiariaFinca.objects.bulk_create(_filas_diarias(produccion), batch_size=500)
+    mensuales = ProduccionMensualAnimal.objects.bulk_create(_filas_mensuales(produccion), batch_size=500)
+    VersionDatos.objects.incrementar_al_confirmar(ProduccionDiariaFinca, ProduccionMensualAnimal)
+    return len(diarias) + len(mensuales)
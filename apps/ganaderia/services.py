@@ -1,17 +1,30 @@
 # apps/ganaderia/services.py
 from django.db import transaction
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
-from .models import Animal, Pesaje, Parto, ProduccionLeche, EventoSalida, Traslado
+from django.utils import timezone
+from .models import Animal, Pesaje, Parto, ProduccionLeche, EventoSalida, Traslado, VersionDatos, clave_arete
+from .cache import TTL_PERFIL, cache as cache_compartida, invalidar_aretes, invalidar_perfiles, llave_perfil
+from .importacion import ErrorFila, convertir_fecha, convertir_numero, valor
+from . import rollups, ultimos
+from apps.inventario.services import ResumenService
+from apps.salud.models import EventoSanitario, Inseminacion
 from django import forms
 
 class AnimalService:
     @staticmethod
     def get_by_arete(numero_arete):
         return Animal.objects.get_by_arete(numero_arete)
+
+    @staticmethod
+    async def aget_by_arete(numero_arete):
+        return await Animal.objects.aget_by_arete(numero_arete)
     
     @staticmethod
-    def registrar_pesaje(numero_arete, fecha, peso, finca, usuario):
-        animal = Animal.objects.get_by_arete(numero_arete)
+    def registrar_pesaje(numero_arete, fecha, peso, finca, usuario, animal=None):
+        if animal is None:
+            animal = Animal.objects.get_by_arete(numero_arete)
         
         pesaje = Pesaje(
             fecha=fecha,
@@ -27,7 +40,9 @@ class AnimalService:
     def registrar_parto(fecha_nac, numero_arete_madre, numero_arete_cria,
                         nombre_cria, finca, raza, sexo, peso, usuario):
 
-        madre = Animal.objects.get(numero_arete=numero_arete_madre)
+        madre = Animal.objects.filter(numero_arete=numero_arete_madre).first()
+        if madre is None:
+            raise ValidationError("La madre no existe.")
 
         if madre.sexo != "F":
             raise Exception("El animal seleccionado no puede ser madre porque no es hembra.")
@@ -79,23 +94,399 @@ class AnimalService:
     @staticmethod
     @transaction.atomic
     def trasladar_animales(lista_aretes, finca_destino, usuario=None):
-        traslados = []
-        for arete in lista_aretes:
-            animal = Animal.objects.filter(numero_arete=arete).first()
-            if not animal:
-                raise ValidationError(f"No existe el animal con arete {arete}")
-            if animal.finca_id == finca_destino.id:
-                raise ValidationError(f"El animal {arete} ya está en la finca seleccionada")
-            traslado = Traslado(finca_origen=animal.finca, finca_destino=finca_destino, animal=animal, usuario=usuario)
-            traslado.full_clean()
-            traslado.save()
-            animal.finca = finca_destino
-            animal.estado = 'trasladado'
-            animal.save(update_fields=['finca', 'estado'])
-            traslados.append(traslado)
+        """
+        Traslada un grupo completo con un número fijo de consultas: una
+        lectura (con bloqueo) de todos los aretes, la validación en memoria,
+        un bulk_create de Traslado y un único UPDATE de Animal.
+
+        Si algún arete no es válido no se mueve ninguno y se lanza un
+        ValidationError con un mensaje por arete. Los aretes se comparan sin
+        distinguir mayúsculas, igual que en get_by_arete.
+        """
+        aretes = list(dict.fromkeys(a.strip() for a in lista_aretes if a and a.strip()))
+        if not aretes:
+            raise ValidationError("Debe seleccionar al menos un animal para realizar el traslado")
+
+        por_clave = {
+            fila['arete_clave']: fila
+            for fila in Animal.objects.select_for_update()
+            .by_aretes(aretes)
+            .values('id', 'numero_arete', 'finca_id', 'estado', 'sexo', 'arete_clave')
+        }
+
+        errores = []
+        animales = {}
+        for arete in aretes:
+            animal = por_clave.get(clave_arete(arete))
+            if animal is None:
+                errores.append(f"No existe el animal con arete {arete}")
+            elif animal['finca_id'] == finca_destino.id:
+                errores.append(f"El animal {arete} ya está en la finca seleccionada")
+            else:
+                animales[animal['numero_arete']] = animal
+        if errores:
+            raise ValidationError(errores)
+        # "t001" y "T001" son el mismo animal: se traslada una vez.
+        aretes = list(animales)
+
+        traslados = Traslado.objects.bulk_create([
+            Traslado(
+                animal_id=animales[arete]['id'],
+                finca_origen_id=animales[arete]['finca_id'],
+                finca_destino=finca_destino,
+                usuario=usuario,
+            )
+            for arete in aretes
+        ])
+
+        ResumenService.registrar_traslado([animales[a] for a in aretes], finca_destino.id)
+        Animal.objects.filter(id__in=[animales[a]['id'] for a in aretes]).update(
+            finca=finca_destino, estado='trasladado', actualizado_en=timezone.now()
+        )
+
+        # bulk_create y update() no disparan señales: caché y resumen se
+        # ajustan aquí.
+        invalidar_aretes(*aretes)
+        invalidar_perfiles(*(animales[a]['id'] for a in aretes))
+        VersionDatos.objects.incrementar_al_confirmar(Animal, Traslado)
         return traslados
 
 
+TURNOS = {"AM": "peso_am", "PM": "peso_pm"}
+
+
+class ProduccionService:
+
+    @staticmethod
+    @transaction.atomic
+    def registrar_turno(animal, fecha, turno, kg):
+        """Un solo INSERT ... ON CONFLICT: crea el día o completa el turno que falta."""
+        campo = TURNOS[turno]
+        existente = (
+            ProduccionLeche.objects.select_for_update()
+            .filter(animal=animal, fecha=fecha)
+            .values("animal_id", "finca_id", "fecha", "peso_am", "peso_pm").first()
+        )
+        # bulk_create no dispara señales: los rollups se ajustan aquí.
+        actual = dict(existente or {
+            "animal_id": animal.pk, "finca_id": animal.finca_id, "fecha": fecha,
+            "peso_am": None, "peso_pm": None,
+        })
+        actual[campo] = kg
+
+        ProduccionLeche.objects.bulk_create(
+            [ProduccionLeche(animal=animal, finca_id=animal.finca_id, fecha=fecha, **{campo: kg})],
+            update_conflicts=True,
+            unique_fields=["animal", "fecha"],
+            update_fields=[campo],
+        )
+        rollups.aplicar(rollups.diferencia(existente, actual))
+        ultimos.recalcular('produccion', [animal.pk])
+        invalidar_perfiles(animal.pk)
+        VersionDatos.objects.incrementar_al_confirmar(ProduccionLeche)
+
+    @staticmethod
+    def importar_lote(filas):
+        """
+        Ingresa un ordeño completo. `filas` es un iterable de
+        (numero_fila, {"arete", "fecha", "turno", "kg"}), venga de una
+        planilla (leer_planilla) o de un arreglo JSON.
+
+        Los aretes se resuelven con una sola consulta y cada (animal, fecha)
+        se guarda con INSERT ... ON CONFLICT DO UPDATE, de modo que el AM y
+        el PM de una vaca terminan en la misma fila. Las filas inválidas se
+        informan en "errores" sin detener el resto del lote.
+        """
+        errores = []
+        validas = []
+        for numero, datos in filas:
+            arete = valor(datos, "arete", "numero_arete")
+            try:
+                if not arete:
+                    raise ErrorFila("Falta el número de arete")
+                turno = str(valor(datos, "turno") or "").upper()
+                if turno not in TURNOS:
+                    raise ErrorFila("El turno debe ser AM o PM")
+                fecha = convertir_fecha(valor(datos, "fecha"))
+                kg = convertir_numero(valor(datos, "kg", "peso", "litros"), "kg")
+            except ErrorFila as e:
+                errores.append({"fila": numero, "arete": arete, "error": str(e)})
+                continue
+            validas.append((numero, str(arete), fecha, turno, kg))
+
+        # Sin distinguir mayúsculas, igual que ProduccionForm (get_by_arete).
+        animales = {
+            fila["arete_clave"]: fila
+            for fila in Animal.objects.by_aretes(
+                {arete for _, arete, _, _, _ in validas}
+            ).values("id", "numero_arete", "finca_id", "sexo", "arete_clave")
+        }
+
+        # (animal, fecha) -> valores por turno; dentro del lote gana la última fila.
+        dias = {}
+        aceptadas = 0
+        for numero, arete, fecha, turno, kg in validas:
+            animal = animales.get(clave_arete(arete))
+            if animal is None:
+                errores.append({"fila": numero, "arete": arete, "error": "El animal no existe"})
+                continue
+            if animal["sexo"] != "F":
+                errores.append({"fila": numero, "arete": arete,
+                                "error": "Solo hembras pueden registrar producción de leche."})
+                continue
+            dia = dias.setdefault((animal["id"], fecha), {"finca_id": animal["finca_id"]})
+            dia[TURNOS[turno]] = kg
+            aceptadas += 1
+
+        # ON CONFLICT solo debe pisar los turnos presentes en el lote, así que
+        # se agrupa por combinación de turnos.
+        grupos = {}
+        for (animal_id, fecha), dia in dias.items():
+            campos = tuple(c for c in ("peso_am", "peso_pm") if c in dia)
+            grupos.setdefault(campos, []).append(
+                ProduccionLeche(animal_id=animal_id, fecha=fecha, **dia)
+            )
+
+        with transaction.atomic():
+            for campos, registros in grupos.items():
+                ProduccionLeche.objects.bulk_create(
+                    registros,
+                    batch_size=500,
+                    update_conflicts=True,
+                    unique_fields=["animal", "fecha"],
+                    update_fields=list(campos),
+                )
+            if dias:
+                # Sin señales en bulk_create: se recalculan los días y meses tocados.
+                rollups.recalcular_dias({fecha for _, fecha in dias})
+                rollups.recalcular_meses(
+                    {animal_id for animal_id, _ in dias},
+                    {rollups.inicio_mes(fecha) for _, fecha in dias},
+                )
+                ultimos.recalcular('produccion', [animal_id for animal_id, _ in dias])
+                invalidar_perfiles(*(animal_id for animal_id, _ in dias))
+                VersionDatos.objects.incrementar_al_confirmar(ProduccionLeche)
+
+        errores.sort(key=lambda e: e["fila"])
+        return {
+            "filas_aceptadas": aceptadas,
+            "registros": len(dias),
+            "errores": errores,
+        }
+
+
+# Mismos estados que rechaza Pesaje.clean.
+ESTADOS_SIN_PESAJE = ('muerto', 'vendido', 'inactivo')
+MAXIMO_VISTA_PREVIA = 100
+
+
+class PesajeService:
+
+    @staticmethod
+    def importar(filas, confirmar=False, tamano_lote=500):
+        """
+        Valida una jornada de pesaje y, si `confirmar`, la guarda con
+        bulk_create en lotes. Sin confirmar es una vista previa: se aplica
+        la misma validación pero no se escribe nada.
+
+        Las reglas son las de Pesaje.clean (peso > 0, animal no en estado
+        final), evaluadas contra un mapa arete -> (id, finca, estado)
+        cargado en una sola consulta por lote de filas.
+        """
+        resumen = {
+            "filas": 0,
+            "validas": 0,
+            "guardados": 0,
+            "errores": [],
+            "vista_previa": [],
+            "peso_min": None,
+            "peso_max": None,
+            "peso_promedio": None,
+            "fecha_desde": None,
+            "fecha_hasta": None,
+            "confirmado": confirmar,
+        }
+        suma = 0
+        vistos = set()
+        pendientes = []
+
+        def procesar(bloque):
+            # Sin distinguir mayúsculas, igual que PesajeForm (get_by_arete).
+            aretes = {arete for _, arete, _, _ in bloque if arete}
+            animales = {
+                fila["arete_clave"]: fila
+                for fila in Animal.objects.by_aretes(aretes)
+                .values("id", "numero_arete", "finca_id", "finca__nombre", "estado", "arete_clave")
+            }
+            nuevos = []
+            for numero, arete, fecha, peso in bloque:
+                animal = animales.get(clave_arete(arete))
+                if animal is None:
+                    resumen["errores"].append({"fila": numero, "arete": arete, "error": "El animal no existe"})
+                    continue
+                if animal["estado"] in ESTADOS_SIN_PESAJE:
+                    resumen["errores"].append({
+                        "fila": numero, "arete": arete,
+                        "error": "No se puede registrar pesaje para un animal en estado final.",
+                    })
+                    continue
+                if (animal["id"], fecha) in vistos:
+                    resumen["errores"].append({"fila": numero, "arete": arete, "error": "Pesaje repetido en la planilla"})
+                    continue
+                vistos.add((animal["id"], fecha))
+                nuevos.append(Pesaje(animal_id=animal["id"], finca_id=animal["finca_id"], fecha=fecha, peso=peso))
+                if len(resumen["vista_previa"]) < MAXIMO_VISTA_PREVIA:
+                    resumen["vista_previa"].append({
+                        "fila": numero, "arete": arete, "fecha": fecha,
+                        "peso": peso, "finca": animal["finca__nombre"],
+                    })
+            if confirmar and nuevos:
+                Pesaje.objects.bulk_create(nuevos, batch_size=tamano_lote)
+                ultimos.recalcular('pesaje', [pesaje.animal_id for pesaje in nuevos])
+                invalidar_perfiles(*(pesaje.animal_id for pesaje in nuevos))
+                resumen["guardados"] += len(nuevos)
+            return nuevos
+
+        with transaction.atomic():
+            for numero, datos in filas:
+                resumen["filas"] += 1
+                arete = valor(datos, "arete", "numero_arete")
+                try:
+                    if not arete:
+                        raise ErrorFila("Falta el número de arete")
+                    fecha = convertir_fecha(valor(datos, "fecha"))
+                    peso = convertir_numero(valor(datos, "peso", "kg", "peso_kg"), "Peso")
+                    if peso <= 0:
+                        raise ErrorFila("El peso debe ser mayor a 0.")
+                except ErrorFila as e:
+                    resumen["errores"].append({"fila": numero, "arete": arete, "error": str(e)})
+                    continue
+
+                pendientes.append((numero, str(arete), fecha, peso))
+                if len(pendientes) >= tamano_lote:
+                    for pesaje in procesar(pendientes):
+                        suma += PesajeService._acumular(resumen, pesaje)
+                    pendientes = []
+
+            if pendientes:
+                for pesaje in procesar(pendientes):
+                    suma += PesajeService._acumular(resumen, pesaje)
+
+            if resumen["guardados"]:
+                VersionDatos.objects.incrementar_al_confirmar(Pesaje)
+
+        if resumen["validas"]:
+            resumen["peso_promedio"] = round(suma / resumen["validas"], 2)
+        resumen["errores"].sort(key=lambda e: e["fila"])
+        return resumen
+
+    @staticmethod
+    def _acumular(resumen, pesaje):
+        resumen["validas"] += 1
+        for clave, valor_nuevo, elegir in (
+            ("peso_min", pesaje.peso, min), ("peso_max", pesaje.peso, max),
+            ("fecha_desde", pesaje.fecha, min), ("fecha_hasta", pesaje.fecha, max),
+        ):
+            actual = resumen[clave]
+            resumen[clave] = valor_nuevo if actual is None else elegir(actual, valor_nuevo)
+        return pesaje.peso
+
+
+# Filas recientes que muestra la ficha del animal por cada historial.
+RECIENTES_PERFIL = 10
+
+
+def _contar(modelo, campo='animal'):
+    return Coalesce(Subquery(
+        modelo.objects.filter(**{campo: OuterRef('pk')}).order_by()
+        .values(campo).annotate(n=Count('pk')).values('n')
+    ), 0)
+
+
+class AnimalProfileService:
+    """
+    Ficha completa de un animal (animal_detail) en un número fijo de
+    consultas: el animal con sus conteos y un prefetch por historial, los
+    largos recortados con Prefetch sobre un queryset rebanado.
+
+    El resultado se guarda por animal en la caché "compartida", que ven
+    todos los workers; las señales de cada tabla involucrada (y los
+    servicios masivos) lo invalidan con invalidar_perfiles.
+    """
+
+    @staticmethod
+    def obtener(pk):
+        llave = llave_perfil(pk)
+        perfil = cache_compartida.get(llave)
+        if perfil is None:
+            perfil = AnimalProfileService.construir(pk)
+            if perfil is None:
+                return None
+            cache_compartida.set(llave, perfil, TTL_PERFIL)
+        return perfil
+
+    @staticmethod
+    def construir(pk):
+        animal = (
+            Animal.objects.select_related('finca', 'madre')
+            .annotate(
+                total_pesajes=_contar(Pesaje),
+                total_producciones=_contar(ProduccionLeche),
+                total_eventos_sanitarios=_contar(EventoSanitario),
+            )
+            .prefetch_related(
+                Prefetch(
+                    'pesajes',
+                    Pesaje.objects.select_related('finca').order_by('-fecha', '-id')[:RECIENTES_PERFIL],
+                    to_attr='pesajes_recientes',
+                ),
+                Prefetch('partos', Parto.objects.select_related('cria').order_by('-fecha_nacimiento', '-id')),
+                Prefetch(
+                    'producciones',
+                    ProduccionLeche.objects.order_by('-fecha', '-id')[:RECIENTES_PERFIL],
+                    to_attr='producciones_recientes',
+                ),
+                Prefetch('eventos_salida', EventoSalida.objects.order_by('-fecha', '-id')),
+                Prefetch(
+                    'eventosanitario_set',
+                    EventoSanitario.objects.order_by('-fecha', '-id')[:RECIENTES_PERFIL],
+                    to_attr='eventos_sanitarios_recientes',
+                ),
+                Prefetch(
+                    'inseminacion_set',
+                    Inseminacion.objects.select_related('confirmaciongestacion').order_by('-fecha', '-id'),
+                ),
+                Prefetch(
+                    'traslados',
+                    Traslado.objects.select_related('finca_origen', 'finca_destino', 'usuario').order_by('-fecha', '-id'),
+                ),
+            )
+            .filter(pk=pk)
+            .first()
+        )
+        if animal is None:
+            return None
+
+        producciones = animal.producciones_recientes
+        litros = sum(p.total_diario for p in producciones)
+        return {
+            'animal': animal,
+            'ultimo_pesaje': animal.pesajes_recientes[0] if animal.pesajes_recientes else None,
+            'pesajes': animal.pesajes_recientes,
+            'total_pesajes': animal.total_pesajes,
+            'partos': list(animal.partos.all()),
+            'producciones': producciones,
+            'total_producciones': animal.total_producciones,
+            'litros_recientes': litros,
+            'promedio_reciente': litros / len(producciones) if producciones else None,
+            'eventos_salida': list(animal.eventos_salida.all()),
+            'eventos_sanitarios': animal.eventos_sanitarios_recientes,
+            'total_eventos_sanitarios': animal.total_eventos_sanitarios,
+            'inseminaciones': list(animal.inseminacion_set.all()),
+            'traslados': list(animal.traslados.all()),
+        }
+
+
 class EventoSalidaForm(forms.ModelForm):
 
     numero_arete = forms.CharField(label="Número de Arete", max_length=50)
@@ -1,6 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import EventoSalida, Parto
+from apps.finca.models import Finca
+from .models import (
+    MADRE_DESCONOCIDA, Animal, Pesaje, Parto, ProduccionLeche, EventoSalida, Traslado, VersionDatos
+)
+from .cache import invalidar_aretes, invalidar_perfiles, invalidar_todo
+from . import genealogia, rollups, ultimos
 
 @receiver(post_save, sender=EventoSalida)
 def actualizar_estado_animal_en_evento(sender, instance, created, **kwargs):
@@ -18,3 +23,143 @@ def actualizar_estado_animal_en_evento(sender, instance, created, **kwargs):
 def post_parto_crear(sender, instance, created, **kwargs):
     if created:
         pass
+
+
+@receiver(post_save, sender=Finca)
+@receiver(post_delete, sender=Finca)
+@receiver(post_save, sender=Animal)
+@receiver(post_delete, sender=Animal)
+@receiver(post_save, sender=Pesaje)
+@receiver(post_delete, sender=Pesaje)
+@receiver(post_save, sender=Parto)
+@receiver(post_delete, sender=Parto)
+@receiver(post_save, sender=ProduccionLeche)
+@receiver(post_delete, sender=ProduccionLeche)
+@receiver(post_save, sender=EventoSalida)
+@receiver(post_delete, sender=EventoSalida)
+@receiver(post_save, sender=Traslado)
+@receiver(post_delete, sender=Traslado)
+def incrementar_version_datos(sender, **kwargs):
+    VersionDatos.objects.incrementar_al_confirmar(sender)
+
+
+@receiver(post_save, sender=Animal)
+@receiver(post_delete, sender=Animal)
+def invalidar_cache_animal(sender, instance, **kwargs):
+    invalidar_aretes(instance.numero_arete, getattr(instance, '_arete_original', None))
+    instance._arete_original = instance.numero_arete
+
+
+@receiver(post_save, sender=Animal)
+@receiver(post_delete, sender=Animal)
+def invalidar_perfil_animal(sender, instance, **kwargs):
+    # La madre (nueva y anterior) muestra a la cría en sus partos.
+    madre_original = getattr(instance, '_madre_original', None)
+    invalidar_perfiles(
+        instance.pk, instance.madre_id,
+        madre_original if madre_original is not MADRE_DESCONOCIDA else None,
+    )
+
+
+@receiver(post_save, sender=Pesaje)
+@receiver(post_delete, sender=Pesaje)
+@receiver(post_save, sender=ProduccionLeche)
+@receiver(post_delete, sender=ProduccionLeche)
+@receiver(post_save, sender=EventoSalida)
+@receiver(post_delete, sender=EventoSalida)
+@receiver(post_save, sender=Traslado)
+@receiver(post_delete, sender=Traslado)
+def invalidar_perfil_historial(sender, instance, **kwargs):
+    invalidar_perfiles(instance.animal_id)
+
+
+@receiver(post_save, sender=Parto)
+@receiver(post_delete, sender=Parto)
+def invalidar_perfil_parto(sender, instance, **kwargs):
+    invalidar_perfiles(instance.madre_id, instance.cria_id)
+
+
+@receiver(post_save, sender=Finca)
+@receiver(post_delete, sender=Finca)
+def invalidar_cache_finca(sender, **kwargs):
+    invalidar_todo()
+
+
+def _madre_cambia(instance, update_fields):
+    if update_fields is not None and 'madre' not in update_fields and 'madre_id' not in update_fields:
+        return False
+    return getattr(instance, '_madre_original', None) != instance.madre_id
+
+
+@receiver(pre_save, sender=Animal)
+def validar_genealogia(sender, instance, update_fields=None, **kwargs):
+    if instance.pk and _madre_cambia(instance, update_fields):
+        genealogia.validar_madre(instance.pk, instance.madre_id)
+
+
+@receiver(post_save, sender=Animal)
+def actualizar_genealogia(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        if instance.madre_id:
+            genealogia.mover(instance.pk, instance.madre_id)
+    elif _madre_cambia(instance, update_fields):
+        genealogia.mover(instance.pk, instance.madre_id)
+    instance._madre_original = instance.madre_id
+
+
+@receiver(pre_delete, sender=Animal)
+def desenlazar_genealogia(sender, instance, **kwargs):
+    genealogia.desenlazar(instance.pk)
+
+
+CAMPOS_ROLLUP = ('animal_id', 'finca_id', 'fecha', 'peso_am', 'peso_pm')
+
+
+def _valores_rollup(instance):
+    if any(campo not in instance.__dict__ for campo in CAMPOS_ROLLUP):
+        return None
+    return {campo: instance.__dict__[campo] for campo in CAMPOS_ROLLUP}
+
+
+@receiver(post_init, sender=ProduccionLeche)
+def recordar_produccion(sender, instance, **kwargs):
+    instance._rollup_original = _valores_rollup(instance)
+
+
+@receiver(pre_save, sender=ProduccionLeche)
+def completar_produccion(sender, instance, **kwargs):
+    # Cargada con .only()/.defer(): se leen los valores de la base.
+    if instance.pk and not instance._state.adding and instance._rollup_original is None:
+        instance._rollup_original = sender.objects.filter(pk=instance.pk).values(*CAMPOS_ROLLUP).first()
+
+
+@receiver(post_save, sender=ProduccionLeche)
+def actualizar_rollups_produccion(sender, instance, created, **kwargs):
+    actuales = _valores_rollup(instance) or sender.objects.filter(
+        pk=instance.pk).values(*CAMPOS_ROLLUP).first()
+    rollups.aplicar(rollups.diferencia(None if created else instance._rollup_original, actuales))
+    instance._rollup_original = actuales
+
+
+@receiver(post_delete, sender=ProduccionLeche)
+def descontar_rollups_produccion(sender, instance, **kwargs):
+    anteriores = getattr(instance, '_rollup_original', None) or _valores_rollup(instance)
+    if anteriores:
+        rollups.aplicar(rollups.diferencia(anteriores, None))
+
+
+@receiver(post_save, sender=Pesaje)
+@receiver(post_save, sender=ProduccionLeche)
+def actualizar_ultimos_datos(sender, instance, created, **kwargs):
+    fuente = 'pesaje' if sender is Pesaje else 'produccion'
+    if created:
+        ultimos.avanzar(fuente, instance)
+    else:
+        # Editar la última fila puede cambiar su fecha o su valor hacia atrás.
+        ultimos.recalcular(fuente, [instance.animal_id])
+
+
+@receiver(post_delete, sender=Pesaje)
+@receiver(post_delete, sender=ProduccionLeche)
+def retroceder_ultimos_datos(sender, instance, **kwargs):
+    ultimos.recalcular('pesaje' if sender is Pesaje else 'produccion', [instance.animal_id])
@@ -1,15 +1,46 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+import numpy as np
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import DatabaseError, connection, transaction
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
 from django.utils import timezone
+from openpyxl import load_workbook
 from apps.finca.models import Finca
-from apps.users.models import User
-from .models import Animal
-from .services import AnimalService
+from apps.users.models import User, Rol
+from .models import (
+    Animal, EventoSalida, Genealogia, Lactancia, Parto, Pesaje, ProduccionDiariaFinca, ProduccionLeche,
+    ProduccionMensualAnimal, Traslado,
+)
+from apps.salud.models import EventoSanitario
+from . import rollups
+from .busqueda import buscar_animales, filtrar_animales
+from .cache import cache_aretes, llave_perfil
+from .crecimiento import calcular_reporte, referencia_por_raza, reporte_finca
+from .genealogia import reconstruir as reconstruir_genealogia
+from .lactancias import recalcular_finca
+from .paginacion import KeysetPaginator
+from .periodos import filtrar_periodo, periodo_desde
+from .planes import Consulta, analizar, indices_por_app, texto_migracion
+from .services import AnimalProfileService, AnimalService, ProduccionService
 from django.core.exceptions import ValidationError
 
 class AnimalTestCase(TestCase):
     def setUp(self):
-        self.finca = Finca.objects.create(nombre="Finca Test", direccion="Calle 1")
-        self.user = User.objects.create_user(username='test', password='pass', cedula='123')
+        self.finca = Finca.objects.create(nombre="Finca Test", codigo="TEST01")
+        self.user = User.objects.create_user(cedula='123', email='test@test.com', password='pass')
         self.animal = Animal.objects.create(numero_arete='A001', nombre='Luna', sexo='F', finca=self.finca)
 
     def test_registrar_pesaje_ok(self):
@@ -18,6 +49,800 @@ class AnimalTestCase(TestCase):
 
     def test_registrar_parto_madre_no_existe(self):
         with self.assertRaises(ValidationError):
-            AnimalService.registrar_parto(fecha_nac=timezone.now().date(), numero_arete_madre='NO', numero_arete_cria='C001', nombre_cria='Cria', finca=self.finca, raza='Holstein', sexo='F')
+            AnimalService.registrar_parto(fecha_nac=timezone.now().date(), numero_arete_madre='NO', numero_arete_cria='C001', nombre_cria='Cria', finca=self.finca, raza='Holstein', sexo='F', peso=30, usuario=self.user)
+
+
+@override_settings(EXPORTACIONES_ASINCRONAS=False)
+class ExportacionExcelTestCase(TestCase):
+    def setUp(self):
+        self.finca = Finca.objects.create(nombre="Finca Export", codigo="EXP01")
+        rol = Rol.objects.create(nombre_rol="Gerente")
+        self.user = User.objects.create_user(cedula='900', email='export@test.com', password='pass', rol=rol)
+        self.client.force_login(self.user)
+        for i in range(3):
+            animal = Animal.objects.create(numero_arete=f'E00{i}', nombre=f'Vaca {i}', sexo='F', finca=self.finca)
+            ProduccionLeche.objects.create(animal=animal, finca=self.finca, fecha=date(2025, 3, i + 1), peso_am=10, peso_pm=None)
+
+    def test_produccion_export_streaming(self):
+        # usuario con su rol (la sesión sale de la caché) y una sola lectura de filas
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('ganaderia:produccion_exportar'))
+            contenido = b''.join(response.streaming_content)
+
+        self.assertTrue(response.streaming)
+        ws = load_workbook(BytesIO(contenido)).active
+        filas = list(ws.iter_rows(values_only=True))
+        self.assertEqual(len(filas), 4)
+        self.assertEqual(filas[1][1:], ('E002', 'Vaca 2', 'Finca Export', 10, 0, 10))
+
+
+class DatosStreamingTestCase(TestCase):
+    def setUp(self):
+        self.finca = Finca.objects.create(nombre="Finca Datos", codigo="DAT01")
+        rol = Rol.objects.create(nombre_rol="Gerente")
+        self.client.force_login(User.objects.create_user(cedula='901', email='datos@test.com', password='pass', rol=rol))
+        self.animal = Animal.objects.create(numero_arete='D001', nombre='Canela', sexo='F', finca=self.finca)
+        Pesaje.objects.create(animal=self.animal, finca=self.finca, fecha=date(2025, 4, 10), peso=310.5)
+        Pesaje.objects.create(animal=self.animal, finca=self.finca, fecha=date(2025, 6, 10), peso=325.0)
+
+    def test_pesajes_csv_respeta_filtros(self):
+        response = self.client.get(reverse('ganaderia:pesajes_list'), {'format': 'csv', 'mes': '4', 'anio': '2025'})
+        lineas = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(lineas[0], 'id,fecha,animal_id,arete,nombre,peso,finca_id,finca')
+        self.assertEqual(len(lineas), 2)
+        self.assertIn('2025-04-10,', lineas[1])
+
+    def test_pesajes_ndjson(self):
+        response = self.client.get(reverse('ganaderia:pesajes_list'), {'format': 'ndjson'})
+        registros = [json.loads(l) for l in b''.join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual([r['peso'] for r in registros], [325.0, 310.5])
+        self.assertEqual(registros[0]['arete'], 'D001')
+        self.assertEqual(registros[0]['finca'], 'Finca Datos')
+
+    def test_csv_bajo_asgi_sale_por_bloques(self):
+        import asyncio
+        import warnings
+        from asgiref.sync import async_to_sync
+        from django.core.handlers.asgi import ASGIHandler
+
+        Pesaje.objects.bulk_create(
+            Pesaje(animal=self.animal, finca=self.finca, fecha=date(2024, 1, 1), peso=300) for _ in range(3000)
+        )
+        cookie = f"{settings.SESSION_COOKIE_NAME}={self.client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': reverse('ganaderia:pesajes_list'), 'query_string': b'format=csv',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 1), 'server': ('testserver', 80),
+        }
+        cuerpos = []
+
+        async def receive():
+            if not cuerpos:
+                cuerpos.append(None)
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await asyncio.Event().wait()
+
+        async def send(mensaje):
+            if mensaje['type'] == 'http.response.body':
+                cuerpos.append(mensaje)
+
+        aplicacion = ASGIHandler()
+        with warnings.catch_warnings():
+            # Django avisa cuando tiene que leer un iterador síncrono completo.
+            warnings.filterwarnings('error', message='StreamingHttpResponse must consume')
+            async_to_sync(aplicacion)(scope, receive, send)
+
+        bloques = [m['body'] for m in cuerpos[1:] if m.get('body')]
+        self.assertGreater(len(bloques), 1)
+        self.assertTrue(all(m.get('more_body') for m in cuerpos[1:-1]))
+        self.assertEqual(len(b''.join(bloques).decode().splitlines()), 3003)
+
+
+class KeysetPaginatorTestCase(TestCase):
+    def setUp(self):
+        finca = Finca.objects.create(nombre="Finca Páginas", codigo="PAG01")
+        animal = Animal.objects.create(numero_arete='P001', sexo='F', finca=finca)
+        # Fechas repetidas para forzar el desempate por id.
+        for i in range(8):
+            Pesaje.objects.create(animal=animal, finca=finca, fecha=date(2025, 1, 1 + i // 3), peso=100 + i)
+        self.esperado = list(Pesaje.objects.order_by('-fecha', '-id').values_list('id', flat=True))
+
+    def _pagina(self, cursor=None):
+        parametros = QueryDict(mutable=True)
+        if cursor:
+            parametros['cursor'] = cursor
+        return KeysetPaginator(Pesaje.objects.all(), ('-fecha', '-id'), per_page=3).get_page(parametros)
+
+    def test_recorrido_hacia_adelante_y_atras(self):
+        paginas = [self._pagina()]
+        while paginas[-1].has_next:
+            paginas.append(self._pagina(paginas[-1].next_cursor))
+
+        self.assertEqual([len(p) for p in paginas], [3, 3, 2])
+        self.assertEqual([p.id for pagina in paginas for p in pagina], self.esperado)
+        self.assertFalse(paginas[0].has_previous)
+
+        anterior = self._pagina(paginas[2].previous_cursor)
+        self.assertEqual([p.id for p in anterior], [p.id for p in paginas[1]])
+        self.assertTrue(anterior.has_previous)
+
+    def test_cursor_invalido_vuelve_a_la_primera_pagina(self):
+        pagina = self._pagina('no-es-un-cursor')
+        self.assertEqual([p.id for p in pagina], self.esperado[:3])
+
+    def test_cada_pagina_es_una_sola_consulta(self):
+        segunda = self._pagina(self._pagina().next_cursor)
+        with self.assertNumQueries(1):
+            self._pagina(segunda.next_cursor)
+
+
+class BusquedaAnimalesTestCase(TestCase):
+    def setUp(self):
+        self.finca = Finca.objects.create(nombre="Finca Búsqueda", codigo="BUS01")
+        for arete, nombre in [('B100', 'Estrella'), ('B1001', 'Lucero'),
+                              ('X200', 'Ñapa Blanca'), ('Z300', 'María B100')]:
+            Animal.objects.create(numero_arete=arete, nombre=nombre, sexo='F', finca=self.finca)
+
+    def test_clave_ignora_tildes_y_mayusculas(self):
+        animales = filtrar_animales(Animal.objects.all(), '  NAPA ')
+        self.assertEqual([a.numero_arete for a in animales], ['X200'])
+
+        animal = Animal.objects.get(numero_arete='Z300')
+        animal.nombre = 'Rosa'
+        animal.save(update_fields=['nombre'])
+        self.assertFalse(filtrar_animales(Animal.objects.all(), 'maria').exists())
+
+    def test_ranking(self):
+        aretes = [a.numero_arete for a in buscar_animales('b100')]
+        self.assertEqual(aretes, ['B100', 'B1001', 'Z300'])
+
+    def test_coincidencia_aproximada(self):
+        aretes = [a.numero_arete for a in buscar_animales('lusero')]
+        self.assertIn('B1001', aretes)
+
+    def test_endpoint_autocompletado(self):
+        rol = Rol.objects.create(nombre_rol="Gerente")
+        self.client.force_login(User.objects.create_user(cedula='903', email='bus@test.com', password='pass', rol=rol))
+        response = self.client.get(reverse('ganaderia:api_buscar_animales'), {'q': 'estrella', 'limite': 1})
+        self.assertEqual(response.json()['resultados'][0]['numero_arete'], 'B100')
+
+
+class CacheAretesTestCase(TestCase):
+    def setUp(self):
+        cache_aretes.invalidar_todo()
+        self.finca = Finca.objects.create(nombre="Finca Cache", codigo="CAC01")
+        self.animal = Animal.objects.create(numero_arete='C001', nombre='Perla', sexo='F', finca=self.finca)
+
+    def test_segunda_consulta_sin_base_de_datos(self):
+        with self.assertNumQueries(1):
+            Animal.objects.get_by_arete('c001 ')
+        with self.assertNumQueries(0):
+            animal = Animal.objects.get_by_arete('C001')
+            self.assertEqual(animal.finca.nombre, 'Finca Cache')
+
+    def test_llaves_en_cache_compartida(self):
+        Animal.objects.get_by_arete('C001')
+        llave = cache_aretes._llave('c001')
+        self.assertEqual(caches['compartida'].get(llave).pk, self.animal.pk)
+        self.assertIsNone(caches['default'].get(llave))
+
+    def test_invalidacion(self):
+        self.assertIsNone(Animal.objects.get_by_arete('C002'))
+        Animal.objects.create(numero_arete='C002', nombre='Nueva', sexo='F', finca=self.finca)
+        self.assertEqual(Animal.objects.get_by_arete('C002').nombre, 'Nueva')
+
+        animal = Animal.objects.get(pk=self.animal.pk)
+        animal.numero_arete = 'C003'
+        animal.save()
+        self.assertIsNone(Animal.objects.get_by_arete('C001'))
+
+        self.finca.nombre = 'Renombrada'
+        self.finca.save()
+        self.assertEqual(Animal.objects.get_by_arete('C003').finca.nombre, 'Renombrada')
+
+    async def test_busqueda_async(self):
+        usuario = await User.objects.acreate(cedula='55', email='async@test.com')
+        await self.async_client.aforce_login(usuario)
+        url = reverse('ganaderia:buscar_animal')
+
+        response = await self.async_client.get(url, {'arete': 'c001'})
+        self.assertEqual(response.json()['nombre'], 'Perla')
+        self.assertEqual((await Animal.objects.aget_by_arete('C001')).pk, self.animal.pk)
+
+        response = await self.async_client.get(url, {'arete': 'NADA'})
+        self.assertEqual(response.json(), {'existe': False})
+
+
+class TrasladoMasivoTestCase(TestCase):
+    def setUp(self):
+        self.origen = Finca.objects.create(nombre="Origen", codigo="ORI01")
+        self.destino = Finca.objects.create(nombre="Destino", codigo="DES01")
+        Animal.objects.bulk_create([
+            Animal(numero_arete=f'T{i:03}', sexo='F', finca=self.origen) for i in range(60)
+        ])
+
+    def _consultas_para(self, aretes):
+        with CaptureQueriesContext(connection) as consultas:
+            AnimalService.trasladar_animales(aretes, self.destino)
+        return len(consultas)
+
+    def test_consultas_constantes(self):
+        pocas = self._consultas_para([f'T{i:03}' for i in range(5)])
+        muchas = self._consultas_para([f'T{i:03}' for i in range(5, 55)])
+
+        self.assertEqual(pocas, muchas)
+        self.assertEqual(Traslado.objects.count(), 55)
+        self.assertEqual(Animal.objects.filter(finca=self.destino, estado='trasladado').count(), 55)
+
+    def test_errores_por_arete_sin_cambios(self):
+        Animal.objects.filter(numero_arete='T001').update(finca=self.destino)
+        with self.assertRaises(ValidationError) as error:
+            AnimalService.trasladar_animales(['T000', 'T001', 'NOPE'], self.destino)
+
+        self.assertEqual(len(error.exception.messages), 2)
+        self.assertFalse(Traslado.objects.exists())
+        self.assertEqual(Animal.objects.filter(finca=self.destino).count(), 1)
+
+    def test_aretes_sin_distinguir_mayusculas(self):
+        AnimalService.trasladar_animales([' t002', 'T002'], self.destino)
+        self.assertEqual(Traslado.objects.get().animal.numero_arete, 'T002')
+
+
+class ProduccionLoteTestCase(TestCase):
+    def setUp(self):
+        self.finca = Finca.objects.create(nombre="Finca Leche", codigo="LEC01")
+        rol = Rol.objects.create(nombre_rol="Gerente")
+        self.client.force_login(User.objects.create_user(cedula='904', email='leche@test.com', password='pass', rol=rol))
+        self.vaca = Animal.objects.create(numero_arete='L001', nombre='Mora', sexo='F', finca=self.finca)
+        Animal.objects.create(numero_arete='L002', nombre='Toro', sexo='M', finca=self.finca)
+        ProduccionLeche.objects.create(animal=self.vaca, finca=self.finca, fecha=date(2025, 5, 1), peso_am=11)
+
+    def test_planilla_fusiona_turnos_y_reporta_errores(self):
+        planilla = SimpleUploadedFile('ordeño.csv', (
+            'Arete,Fecha,Turno,Kg\n'
+            'L001,2025-05-01,pm,9.5\n'
+            'l001 ,02/05/2025,AM,12\n'
+            'L002,2025-05-01,AM,3\n'
+            'XXXX,2025-05-01,AM,3\n'
+            'L001,2025-05-03,noche,3\n'
+        ).encode())
+        response = self.client.post(reverse('ganaderia:produccion_importar'), {'archivo': planilla})
+        resultado = response.context['resultado']
+
+        self.assertEqual(resultado['filas_aceptadas'], 2)
+        self.assertEqual([e['fila'] for e in resultado['errores']], [4, 5, 6])
+        dia = ProduccionLeche.objects.get(animal=self.vaca, fecha=date(2025, 5, 1))
+        self.assertEqual((dia.peso_am, dia.peso_pm), (11, 9.5))
+        self.assertEqual(ProduccionLeche.objects.filter(animal=self.vaca).count(), 2)
+
+    def test_lote_json(self):
+        lote = [{'arete': 'L001', 'fecha': '2025-05-01', 'turno': 'AM', 'kg': 13}]
+        response = self.client.post(
+            reverse('ganaderia:api_produccion_lote'), json.dumps(lote), content_type='application/json'
+        )
+
+        self.assertEqual(response.json()['registros'], 1)
+        self.assertEqual(ProduccionLeche.objects.get(animal=self.vaca).peso_am, 13)
+
+
+    def test_rollups_coinciden_con_recalculo(self):
+        otra = Animal.objects.create(numero_arete='L003', sexo='F', finca=self.finca)
+        ProduccionService.importar_lote([
+            (1, {'arete': 'L001', 'fecha': '2025-05-01', 'turno': 'PM', 'kg': 9}),
+            (2, {'arete': 'L003', 'fecha': '2025-05-01', 'turno': 'AM', 'kg': 7}),
+            (3, {'arete': 'L003', 'fecha': '2025-06-02', 'turno': 'AM', 'kg': 6}),
+        ])
+        ProduccionService.registrar_turno(otra, date(2025, 5, 2), 'PM', 5)
+        dia = ProduccionLeche.objects.get(animal=otra, fecha=date(2025, 5, 1))
+        dia.peso_am = 8
+        dia.save()
+        ProduccionLeche.objects.get(animal=otra, fecha=date(2025, 6, 2)).delete()
+
+        def rollups_actuales():
+            return (
+                sorted(ProduccionDiariaFinca.objects.values_list(
+                    'finca_id', 'fecha', 'litros', 'litros_am', 'litros_pm', 'vacas', 'registros_am', 'registros_pm')),
+                sorted(ProduccionMensualAnimal.objects.values_list(
+                    'animal_id', 'mes', 'litros', 'litros_am', 'litros_pm', 'dias', 'registros_am', 'registros_pm')),
+            )
+
+        incremental = rollups_actuales()
+        rollups.reconstruir_mes(date(2025, 5, 1))
+        rollups.reconstruir_mes(date(2025, 6, 1))
+        self.assertEqual(incremental, rollups_actuales())
+
+        primero = ProduccionDiariaFinca.objects.get(fecha=date(2025, 5, 1))
+        self.assertEqual((primero.litros, primero.vacas, primero.registros_pm), (28, 2, 1))
+        self.assertFalse(ProduccionMensualAnimal.objects.filter(mes=date(2025, 6, 1)).exists())
+
+class PesajeImportacionTestCase(TestCase):
+    def setUp(self):
+        self.finca = Finca.objects.create(nombre="Finca Báscula", codigo="BAS01")
+        rol = Rol.objects.create(nombre_rol="Gerente")
+        self.client.force_login(User.objects.create_user(cedula='905', email='bascula@test.com', password='pass', rol=rol))
+        Animal.objects.create(numero_arete='P001', sexo='F', finca=self.finca)
+        Animal.objects.create(numero_arete='P002', sexo='M', finca=self.finca, estado='vendido')
+
+    def _planilla(self):
+        return SimpleUploadedFile('bascula.csv', (
+            'arete,fecha,peso\n'
+            'P001,2025-07-01,410\n'
+            'p001,2025-07-01,411\n'
+            'P002,2025-07-01,500\n'
+            'P001,2025-07-02,0\n'
+        ).encode())
+
+    def test_vista_previa_no_guarda_y_confirmar_importa(self):
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            url = reverse('ganaderia:pesajes_importar')
+            resumen = self.client.post(url, {'archivo': self._planilla()}).context['resumen']
+
+            self.assertEqual((resumen['filas'], resumen['validas']), (4, 1))
+            self.assertEqual([e['fila'] for e in resumen['errores']], [3, 4, 5])
+            # "p001" es el mismo animal que "P001", como en PesajeForm.
+            self.assertEqual(resumen['errores'][0]['error'], "Pesaje repetido en la planilla")
+            self.assertFalse(Pesaje.objects.exists())
+
+            resumen = self.client.post(url, {'accion': 'confirmar'}).context['resumen']
+            self.assertEqual(resumen['guardados'], 1)
+            self.assertEqual(Pesaje.objects.get().peso, 410)
+            self.assertEqual(os.listdir(os.path.join(media, 'importaciones', 'pesajes')), [])
+
+
+class CrecimientoTestCase(TestCase):
+    def setUp(self):
+        self.finca = Finca.objects.create(nombre="Finca Ceba", codigo="CEB01")
+        nacimiento = date(2024, 1, 1)
+        self.ternero = Animal.objects.create(numero_arete='C001', sexo='M', raza='Brahman',
+                                             fecha_nacimiento=nacimiento, finca=self.finca)
+        for dias, peso in ((100, 110), (200, 190), (300, 250)):
+            Pesaje.objects.create(animal=self.ternero, finca=self.finca,
+                                  fecha=nacimiento + timedelta(days=dias), peso=peso)
+        for i in range(6):
+            otro = Animal.objects.create(numero_arete=f'C1{i}', sexo='M', raza='brahman ',
+                                         fecha_nacimiento=nacimiento, finca=self.finca)
+            Pesaje.objects.create(animal=otro, finca=self.finca,
+                                  fecha=nacimiento + timedelta(days=305), peso=260 + i * 10)
+
+    def test_gdp_interpolacion_y_banda(self):
+        reporte = calcular_reporte(self.finca, referencia_por_raza(), hoy=date(2025, 3, 1))
+        ternero = next(a for a in reporte['animales'] if a['arete'] == 'C001')
+
+        self.assertAlmostEqual(ternero['gdp'], 0.7, places=3)
+        self.assertEqual(ternero['peso_205'], 193.0)
+        self.assertIsNone(ternero['peso_365'])
+        self.assertEqual(ternero['banda'], 'bajo')
+        self.assertEqual(reporte['resumen']['animales'], 7)
+        self.assertEqual(reporte['cohortes'], [
+            {'cohorte': '1-2 años', 'animales': 7, 'con_gdp': 1, 'gdp_promedio': 0.7},
+        ])
+        self.assertEqual([p['edad_dias'] for p in reporte['curvas']['brahman']], [300])
+
+    def test_cache_se_invalida_con_un_pesaje_nuevo(self):
+        self.assertEqual(reporte_finca(self.finca)['resumen']['pesajes'], 9)
+        with self.captureOnCommitCallbacks(execute=True):
+            Pesaje.objects.create(animal=self.ternero, finca=self.finca, fecha=date(2025, 1, 1), peso=300)
+        self.assertEqual(reporte_finca(self.finca)['resumen']['pesajes'], 10)
+
+    def test_cache_no_depende_de_otras_fincas(self):
+        reporte_finca(self.finca)
+        otra = Finca.objects.create(nombre="Otra", codigo="CEB02")
+        animal = Animal.objects.create(numero_arete='O001', sexo='M', finca=otra)
+        with self.captureOnCommitCallbacks(execute=True):
+            Pesaje.objects.create(animal=animal, finca=otra, fecha=date(2025, 1, 1), peso=300)
+        with self.assertNumQueries(1):
+            self.assertEqual(reporte_finca(self.finca)['resumen']['pesajes'], 9)
+
+    def test_referencia_con_tope_por_raza(self):
+        with patch('apps.ganaderia.crecimiento.MAXIMO_REFERENCIA', 5):
+            referencia = referencia_por_raza()
+        self.assertEqual(int(referencia['brahman']['n'].sum()), 5)
+
+
+class LactanciaTestCase(TestCase):
+    def setUp(self):
+        self.finca = Finca.objects.create(nombre="Finca Lechera", codigo="LAC01")
+        self.vaca = Animal.objects.create(numero_arete='V001', sexo='F', finca=self.finca)
+        self.parto = date(2025, 1, 1)
+        Parto.objects.create(madre=self.vaca, finca=self.finca, fecha_nacimiento=date(2024, 1, 1), sexo='M')
+        Parto.objects.create(madre=self.vaca, finca=self.finca, fecha_nacimiento=self.parto, sexo='F')
+        # Curva de Wood exacta con registros cada 10 días hasta el día 150.
+        self.a, self.b, self.c = 15.0, 0.2, 0.004
+        ProduccionLeche.objects.bulk_create([
+            ProduccionLeche(animal=self.vaca, finca=self.finca, fecha=self.parto + timedelta(days=t),
+                            peso_am=self._wood(t) / 2, peso_pm=self._wood(t) / 2)
+            for t in range(10, 151, 10)
+        ] + [
+            # Antes del parto actual: pertenece a la lactancia anterior.
+            ProduccionLeche(animal=self.vaca, finca=self.finca, fecha=date(2024, 12, 1), peso_am=4),
+        ])
+
+    def _wood(self, t):
+        return self.a * t ** self.b * np.exp(-self.c * t)
+
+    def test_segmenta_y_ajusta_la_curva(self):
+        self.assertEqual(recalcular_finca(self.finca.pk), 2)
+
+        actual, anterior = Lactancia.objects.filter(animal=self.vaca)
+        self.assertEqual((actual.numero, anterior.numero), (2, 1))
+        self.assertEqual((anterior.registros, anterior.proyeccion_305), (1, None))
+        self.assertEqual((actual.registros, actual.dias_en_leche), (15, 150))
+        self.assertEqual(actual.dia_pico, 50)
+        self.assertAlmostEqual(actual.wood_b, self.b, places=6)
+        self.assertAlmostEqual(actual.wood_c, self.c, places=6)
+
+        registrados = sum(self._wood(t) for t in range(10, 151, 10))
+        esperado = registrados + sum(self._wood(t) for t in range(1, 306) if t > 150 or t % 10)
+        self.assertAlmostEqual(actual.proyeccion_305, esperado, places=3)
+
+        rol = Rol.objects.create(nombre_rol="Gerente")
+        self.client.force_login(User.objects.create_user(cedula='906', email='lac@test.com', password='pass', rol=rol))
+        cache.clear()
+        caches['compartida'].clear()
+        response = self.client.get(reverse('ganaderia:animal_detail', args=[self.vaca.pk]))
+        self.assertContains(response, 'Proyección 305 d')
+
+
+class GenealogiaTestCase(TestCase):
+    def setUp(self):
+        self.finca = Finca.objects.create(nombre="Finca Cría", codigo="CRI01")
+        # G0 <- G1 <- ... <- G7, más una segunda cría de G1.
+        self.linea = [Animal.objects.create(numero_arete='G0', sexo='F', finca=self.finca)]
+        for i in range(1, 8):
+            self.linea.append(Animal.objects.create(
+                numero_arete=f'G{i}', sexo='F', finca=self.finca, madre=self.linea[-1]))
+        self.hermana = Animal.objects.create(numero_arete='H2', sexo='F', finca=self.finca, madre=self.linea[1])
+
+    def _cierre(self):
+        return sorted(Genealogia.objects.values_list('ancestro_id', 'descendiente_id', 'profundidad'))
+
+    def test_consultas_de_linea(self):
+        with self.assertNumQueries(1):
+            linea = list(Animal.objects.ancestros_de(self.linea[7], 6).order_by('profundidad'))
+        self.assertEqual([a.numero_arete for a in linea], ['G6', 'G5', 'G4', 'G3', 'G2', 'G1'])
+        self.assertEqual([a.profundidad for a in linea], [1, 2, 3, 4, 5, 6])
+
+        descendientes = Animal.objects.descendientes_de(self.linea[1])
+        self.assertEqual(descendientes.count(), 7)
+        self.assertEqual(
+            set(descendientes.values_list('id', flat=True)),
+            set(Animal.objects.descendientes_de(self.linea[1], recursivo=True).values_list('id', flat=True)),
+        )
+        self.assertEqual(
+            set(Animal.objects.ancestros_de(self.linea[7], 3, recursivo=True).values_list('numero_arete', flat=True)),
+            {'G6', 'G5', 'G4'},
+        )
+
+    def test_se_mantiene_con_cambios_de_madre_y_borrados(self):
+        usuario = User.objects.create_user(cedula='907', email='cria@test.com', password='pass',
+                                           rol=Rol.objects.create(nombre_rol="Gerente"))
+        AnimalService.registrar_parto(date(2025, 1, 1), 'G7', 'G8', 'Nieta', self.finca, '', 'F', 30, usuario)
+
+        movida = Animal.objects.get(numero_arete='G4')
+        movida.madre = self.hermana
+        movida.save()
+        Animal.objects.get(numero_arete='G2').delete()
+        suelta = Animal.objects.get(numero_arete='H2')
+        suelta.madre = None
+        suelta.save(update_fields=['madre'])
+
+        incremental = self._cierre()
+        reconstruir_genealogia()
+        self.assertEqual(incremental, self._cierre())
+        self.assertEqual(
+            list(Animal.objects.ancestros_de(Animal.objects.get(numero_arete='G8')).order_by('profundidad')
+                 .values_list('numero_arete', flat=True)),
+            ['G7', 'G6', 'G5', 'G4', 'H2'],
+        )
+
+        movida.madre = Animal.objects.get(numero_arete='G8')
+        with self.assertRaises(ValidationError):
+            movida.save()
+
+
+class AnimalProfileTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['compartida'].clear()
+        self.finca = Finca.objects.create(nombre="Finca Perfil", codigo="PER01")
+        self.otra = Finca.objects.create(nombre="Finca Destino", codigo="PER02")
+        self.vaca = Animal.objects.create(numero_arete='P001', sexo='F', finca=self.finca)
+        hoy = date.today()
+        for i in range(15):
+            Pesaje.objects.create(animal=self.vaca, finca=self.finca, peso=400 + i, fecha=hoy - timedelta(days=i))
+            ProduccionLeche.objects.create(animal=self.vaca, finca=self.finca, fecha=hoy - timedelta(days=i),
+                                           peso_am=10, peso_pm=5)
+        for i in range(3):
+            cria = Animal.objects.create(numero_arete=f'P1{i}', sexo='M', finca=self.finca, madre=self.vaca)
+            Parto.objects.create(madre=self.vaca, cria=cria, finca=self.finca, sexo='M',
+                                 fecha_nacimiento=hoy - timedelta(days=400 * (i + 1)))
+        EventoSanitario.objects.create(animal=self.vaca, fecha=hoy, diagnostico="Mastitis",
+                                       tratamiento="Antibiótico", responsable="Vet")
+        Traslado.objects.create(animal=self.vaca, finca_origen=self.otra, finca_destino=self.finca)
+
+    def test_perfil_en_consultas_fijas_y_cacheado(self):
+        cache.clear()
+        caches['compartida'].clear()
+        # Animal + un prefetch por historial, sin importar cuántas filas haya.
+        with self.assertNumQueries(8):
+            perfil = AnimalProfileService.obtener(self.vaca.pk)
+        self.assertEqual(perfil['ultimo_pesaje'].peso, 400)
+        self.assertEqual(len(perfil['pesajes']), 10)
+        self.assertEqual(perfil['total_pesajes'], 15)
+        self.assertEqual(len(perfil['producciones']), 10)
+        self.assertEqual(perfil['litros_recientes'], 150)
+        self.assertEqual([p.cria.numero_arete for p in perfil['partos']], ['P10', 'P11', 'P12'])
+        self.assertEqual(len(perfil['eventos_sanitarios']), 1)
+        self.assertEqual(perfil['traslados'][0].finca_origen, self.otra)
+
+        with self.assertNumQueries(0):
+            AnimalProfileService.obtener(self.vaca.pk)
+        # En la caché que ven todos los workers, no en la memoria del proceso.
+        self.assertIsNotNone(caches['compartida'].get(llave_perfil(self.vaca.pk)))
+        self.assertIsNone(cache.get(llave_perfil(self.vaca.pk)))
+
+        Pesaje.objects.create(animal=self.vaca, finca=self.finca, peso=500, fecha=date.today() + timedelta(days=1))
+        self.assertEqual(AnimalProfileService.obtener(self.vaca.pk)['ultimo_pesaje'].peso, 500)
+
+    def test_vista_detalle(self):
+        user = User.objects.create_user(
+            cedula="7007", email="perfil@test.com", password="123",
+            rol=Rol.objects.create(nombre_rol="Gerente"),
+        )
+        self.client.force_login(user)
+        respuesta = self.client.get(reverse('ganaderia:animal_detail', args=[self.vaca.pk]))
+        self.assertContains(respuesta, "Mastitis")
+        self.assertContains(respuesta, "Mostrando los últimos 10 de 15 pesajes")
+        self.assertEqual(self.client.get(reverse('ganaderia:animal_detail', args=[999999])).status_code, 404)
+
+
+class UltimosDatosTestCase(TestCase):
+    def setUp(self):
+        self.finca = Finca.objects.create(nombre="Finca Últimos", codigo="ULT01")
+        self.vaca = Animal.objects.create(numero_arete='U001', sexo='F', finca=self.finca)
+        self.hoy = date.today()
+
+    def _ultimos(self):
+        return Animal.objects.values(
+            'ultimo_peso', 'fecha_ultimo_pesaje', 'ultima_produccion_total',
+            'fecha_ultima_produccion', 'ultimo_evento_sanitario',
+        ).get(pk=self.vaca.pk)
+
+    def test_pesajes_avanzan_y_retroceden(self):
+        viejo = Pesaje.objects.create(animal=self.vaca, finca=self.finca, peso=300, fecha=self.hoy - timedelta(days=30))
+        ultimo = Pesaje.objects.create(animal=self.vaca, finca=self.finca, peso=350, fecha=self.hoy)
+        Pesaje.objects.create(animal=self.vaca, finca=self.finca, peso=320, fecha=self.hoy - timedelta(days=10))
+        self.assertEqual(self._ultimos()['ultimo_peso'], 350)
+
+        # Una instancia cargada antes no pisa las columnas al guardarse...
+        self.vaca.nombre = 'Lucera'
+        self.vaca.save()
+        self.assertEqual(self._ultimos()['ultimo_peso'], 350)
+        # ...pero sí guarda lo que se le asigne a propósito.
+        self.vaca.ultimo_peso = 351
+        self.vaca.save()
+        self.assertEqual(self._ultimos()['ultimo_peso'], 351)
+
+        ultimo.fecha = self.hoy - timedelta(days=60)
+        ultimo.save()
+        self.assertEqual(self._ultimos()['ultimo_peso'], 320)
+
+        Pesaje.objects.filter(peso=320).delete()
+        viejo.delete()
+        self.assertEqual(self._ultimos()['fecha_ultimo_pesaje'], self.hoy - timedelta(days=60))
+
+    def test_guardar_fila_borrada_falla(self):
+        vaca = Animal.objects.get(pk=self.vaca.pk)
+        Animal.objects.filter(pk=vaca.pk).delete()
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            vaca.save()
+        self.assertFalse(Animal.objects.filter(pk=vaca.pk).exists())
+
+    def test_produccion_sanidad_y_reparacion(self):
+        ProduccionService.registrar_turno(self.vaca, self.hoy, 'AM', 12)
+        ProduccionService.registrar_turno(self.vaca, self.hoy, 'PM', 8)
+        ProduccionService.registrar_turno(self.vaca, self.hoy - timedelta(days=1), 'AM', 30)
+        EventoSanitario.objects.create(animal=self.vaca, fecha=self.hoy, diagnostico="Cojera",
+                                       tratamiento="Reposo", responsable="Vet")
+        esperado = self._ultimos()
+        self.assertEqual(esperado['ultima_produccion_total'], 20)
+        self.assertEqual(esperado['ultimo_evento_sanitario'], self.hoy)
+
+        Animal.objects.update(ultima_produccion_total=None, fecha_ultima_produccion=None,
+                              ultimo_evento_sanitario=None)
+        call_command('reparar_ultimos_datos', lote=1, stdout=StringIO())
+        self.assertEqual(self._ultimos(), esperado)
+
+    def test_listado_ordena_por_peso(self):
+        user = User.objects.create_user(
+            cedula="8008", email="ultimos@test.com", password="123",
+            rol=Rol.objects.create(nombre_rol="Gerente"),
+        )
+        self.client.force_login(user)
+        for i, peso in enumerate([250, 450, 350]):
+            animal = Animal.objects.create(numero_arete=f'U1{i}', sexo='F', finca=self.finca)
+            Pesaje.objects.create(animal=animal, finca=self.finca, peso=peso, fecha=self.hoy)
+        respuesta = self.client.get(reverse('ganaderia:animales_list'), {'orden': 'peso', 'peso_min': 300})
+        self.assertEqual([a.numero_arete for a in respuesta.context['animales']], ['U11', 'U12'])
+
+
+class PeriodoTestCase(TestCase):
+    def test_parametros_a_rango(self):
+        hoy = date(2026, 3, 15)
+        casos = [
+            ({'mes': '2'}, date(2026, 2, 1), date(2026, 3, 1)),
+            ({'mes': '11'}, date(2025, 11, 1), date(2025, 12, 1)),
+            ({'mes': '12', 'anio': '2024'}, date(2024, 12, 1), date(2025, 1, 1)),
+            ({'mes': '2024-05'}, date(2024, 5, 1), date(2024, 6, 1)),
+            ({'semana': '2026-W01'}, date(2025, 12, 29), date(2026, 1, 5)),
+            ({'desde': '2026-01-10', 'hasta': '2026-01-20'}, date(2026, 1, 10), date(2026, 1, 21)),
+            ({'anio': '2025'}, date(2025, 1, 1), date(2026, 1, 1)),
+        ]
+        for datos, desde, hasta in casos:
+            periodo = periodo_desde(datos, hoy)
+            self.assertEqual((periodo.desde, periodo.hasta), (desde, hasta), datos)
+        self.assertIsNone(periodo_desde({'mes': '13'}, hoy))
+        self.assertIsNone(periodo_desde({'semana': 'x'}, hoy))
+
+    def test_limites_del_calendario(self):
+        # El formulario acepta anio=9999: el último período queda abierto, sin error.
+        for datos, desde in [
+            ({'mes': '12', 'anio': '9999'}, date(9999, 12, 1)),
+            ({'mes': '9999-12'}, date(9999, 12, 1)),
+            ({'semana': '9999-W52'}, date.fromisocalendar(9999, 52, 1)),
+        ]:
+            periodo = periodo_desde(datos)
+            self.assertEqual((periodo.desde, periodo.hasta), (desde, None), datos)
+        self.assertEqual(periodo_desde({'mes': '11', 'anio': '9999'}).hasta, date(9999, 12, 1))
+        self.assertIsNone(periodo_desde({'semana': '9999-W53'}))
+
+    def test_filtro_es_un_rango(self):
+        finca = Finca.objects.create(nombre="Finca Período", codigo="PRD01")
+        animal = Animal.objects.create(numero_arete='R001', sexo='F', finca=finca)
+        for fecha in (date(2024, 4, 30), date(2025, 4, 1), date(2025, 4, 30), date(2025, 5, 1)):
+            Pesaje.objects.create(animal=animal, finca=finca, peso=300, fecha=fecha)
+
+        pesajes, periodo = filtrar_periodo(Pesaje.objects.all(), {'mes': '4', 'anio': '2025'})
+        self.assertEqual(sorted(pesajes.values_list('fecha', flat=True)), [date(2025, 4, 1), date(2025, 4, 30)])
+        self.assertEqual(periodo.querystring, 'mes=4&anio=2025')
+        sql = str(pesajes.query).lower()
+        self.assertNotIn('extract', sql)
+        self.assertNotIn('strftime', sql)
+
+
+class AnalizarConsultasTestCase(TestCase):
+    def setUp(self):
+        finca = Finca.objects.create(nombre="Finca Planes", codigo="PLA01")
+        animal = Animal.objects.create(numero_arete='Q001', sexo='F', finca=finca)
+        for i in range(5):
+            Pesaje.objects.create(animal=animal, finca=finca, peso=300 + i, fecha=date(2025, 1, 1) + timedelta(days=i))
+            EventoSalida.objects.create(animal=animal, fecha=date(2025, 1, 1) + timedelta(days=i), tipo_evento='venta')
+
+    def test_marca_funciones_y_sugiere_indices(self):
+        consultas = [
+            Consulta("por_mes", "prueba", Pesaje.objects.filter(fecha__month=1)),
+            Consulta("salidas", "prueba", EventoSalida.objects.filter(tipo_evento='venta').order_by('-fecha', '-id')),
+            Consulta("rango", "prueba", Pesaje.objects.filter(fecha__gte=date(2025, 1, 2)).order_by('-fecha', '-id')),
+        ]
+        resultados = {c.nombre: hallazgos for c, _, hallazgos in analizar(consultas, minimo_filas=0)}
+
+        self.assertIn("funcion", [h.tipo for h in resultados["por_mes"]])
+        self.assertEqual(resultados["rango"], [])
+        modelo, indice = next(h.indice for h in resultados["salidas"] if h.indice)
+        self.assertIs(modelo, EventoSalida)
+        self.assertEqual(list(indice.fields), ['tipo_evento', 'fecha', 'id'])
+
+        ruta, contenido = texto_migracion('ganaderia', list(indices_por_app(analizar(consultas, 0))['ganaderia'].values()))
+        self.assertTrue(ruta.endswith('_indices_sugeridos.py'))
+        self.assertIn("migrations.AddIndex(", contenido)
+
+    def test_comando_recorre_las_consultas_representativas(self):
+        salida = StringIO()
+        call_command('analizar_consultas', minimo_filas=0, plan=True, stdout=salida)
+        self.assertIn('pesajes (ganaderia:pesajes_list)', salida.getvalue())
+        self.assertIn('17 consultas revisadas', salida.getvalue())
+
+
+class InstrumentacionSQLTestCase(TestCase):
+    def setUp(self):
+        finca = Finca.objects.create(nombre="Finca Sql", codigo="SQL01")
+        for i in range(6):
+            Animal.objects.create(numero_arete=f'S{i:03d}', sexo='F', finca=finca)
+
+    def _peticion(self, vista, streaming=False):
+        from django.http import HttpResponse, StreamingHttpResponse
+        from django.test import RequestFactory
+        from agrotiquiza.instrumentacion import InstrumentacionSQLMiddleware
+
+        def cuerpo():
+            vista()
+            yield b"ok"
+
+        def respuesta(request):
+            if streaming:
+                return StreamingHttpResponse(cuerpo())
+            vista()
+            return HttpResponse("ok")
+
+        with self.assertLogs('agrotiquiza.sql', level='INFO') as logs, \
+                override_settings(SQL_MUESTREO=1.0, SQL_REPETIDAS_UMBRAL=3):
+            response = InstrumentacionSQLMiddleware(respuesta)(RequestFactory().get('/prueba/'))
+            if streaming:
+                b''.join(response.streaming_content)
+                response.close()
+        return response, json.loads(logs.records[-1].getMessage()), logs.records[-1].levelname
+
+    def test_marca_n_mas_1_con_origen(self):
+        def n_mas_1():
+            for animal in Animal.objects.all():
+                animal.finca.nombre
+
+        response, datos, nivel = self._peticion(n_mas_1)
+        self.assertEqual(datos['consultas'], 7)
+        self.assertEqual(nivel, 'WARNING')
+        self.assertEqual(datos['repetidas'][0]['veces'], 6)
+        self.assertIn('apps/ganaderia/tests.py', datos['repetidas'][0]['codigo'])
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('7 consultas', response['Server-Timing'])
+
+    def test_sin_repetidas(self):
+        response, datos, nivel = self._peticion(
+            lambda: [a.finca.nombre for a in Animal.objects.select_related('finca')]
+        )
+        self.assertEqual((datos['consultas'], nivel), (1, 'INFO'))
+        self.assertNotIn('repetidas', datos)
+        self.assertIn('0 repetidas', response['Server-Timing'])
+
+    def test_streaming_cuenta_el_cuerpo(self):
+        response, datos, _ = self._peticion(lambda: list(Animal.objects.all()), streaming=True)
+        # La cabecera sale antes del cuerpo; la línea de log, al cerrar.
+        self.assertIn('0 consultas (parcial)', response['Server-Timing'])
+        self.assertEqual((datos['consultas'], datos['streaming']), (1, True))
+
+
+@override_settings(EXPORTACIONES_ASINCRONAS=False, SQL_MUESTREO=0)
+class BenchTestCase(TestCase):
+    def test_escenarios_sobre_hato_sembrado(self):
+        from django.test import Client
+        from .bench import escenarios, medir, sembrar
+
+        datos = sembrar(animales=30, fincas=2, dias=5)
+        self.assertEqual(Animal.objects.count(), 30)
+        self.assertTrue(Animal.objects.exclude(clave_busqueda='').exists())
+        cliente = Client()
+        cliente.force_login(datos.usuario)
+
+        lista = {e.nombre: e for e in escenarios(datos, cliente)}
+        self.assertIn('exportar_eventos_sanitarios', lista)
+        resultado = medir(lista['dashboard'], repeticiones=3, calentamiento=1)
+        self.assertEqual(resultado['repeticiones'], 3)
+        self.assertGreater(resultado['consultas'], 0)
+        self.assertLessEqual(resultado['p50_ms'], resultado['p99_ms'])
+        medir(lista['trasladar_animales'], repeticiones=2, calentamiento=0)
+
+
+class GeneradorTestCase(TestCase):
+    def test_hato_coherente_y_determinista(self):
+        from .generador import Plan, crear_fincas, generar, simular_finca
+
+        fincas = crear_fincas(2)
+        plan = Plan(40, 700, semilla=7, usuario_id=None, fincas_ids=[f.pk for f in fincas])
+        primera = [(a.arete, a.nacimiento, a.sexo) for a in simular_finca(fincas[0], plan)[0]]
+        self.assertEqual(primera, [(a.arete, a.nacimiento, a.sexo) for a in simular_finca(fincas[0], plan)[0]])
 
+        total = generar(fincas, 40, 700, semilla=7)
+        self.assertEqual(total['Animal'], 80)
+        self.assertEqual(Animal.objects.count(), 80)
+        self.assertGreater(total['ProduccionLeche'], 0)
+        self.assertFalse(ProduccionLeche.objects.filter(animal__sexo='M').exists())
+        for cria in Animal.objects.filter(madre__isnull=False).select_related('madre'):
+            self.assertEqual(cria.madre.finca_id, cria.finca_id)
+            self.assertLess(cria.madre.fecha_nacimiento, cria.fecha_nacimiento)
+        self.assertEqual(Parto.objects.filter(cria__isnull=False).count(), Animal.objects.filter(madre__isnull=False).count())
 
+        # Fincas ya generadas no se repiten.
+        self.assertEqual(generar(fincas, 40, 700, semilla=7), {})
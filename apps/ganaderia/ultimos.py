@@ -0,0 +1,67 @@
+# apps/ganaderia/ultimos.py
+"""
+Columnas desnormalizadas de Animal con su último dato: peso y fecha del
+último Pesaje, total y fecha de la última ProduccionLeche y fecha del
+último EventoSanitario. Así animales_list ordena y filtra sin joins.
+
+- Un alta solo puede adelantar el dato: avanzar() es un UPDATE
+  condicional ("si la fecha es igual o posterior a la guardada").
+- Un cambio o una baja puede retroceder: recalcular() vuelve a leer la
+  última fila de cada animal con subconsultas correlacionadas.
+- Las cargas masivas llaman recalcular() con los animales que tocaron y
+  el comando reparar_ultimos_datos lo corre por lotes sobre todo el hato.
+
+Se escriben con update(), así que no pasan por Animal.save() (ver
+CAMPOS_ULTIMOS en models.py).
+"""
+from django.db.models import F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from apps.salud.models import EventoSanitario
+
+from .models import Animal, Pesaje, ProduccionLeche
+
+
+# fuente -> (modelo, columna de fecha en Animal,
+#            {columna en Animal: (expresión sobre la fuente, valor desde la instancia)})
+FUENTES = {
+    'pesaje': (Pesaje, 'fecha_ultimo_pesaje', {
+        'ultimo_peso': (F('peso'), lambda pesaje: pesaje.peso),
+    }),
+    'produccion': (ProduccionLeche, 'fecha_ultima_produccion', {
+        'ultima_produccion_total': (
+            Coalesce(F('peso_am'), Value(0.0)) + Coalesce(F('peso_pm'), Value(0.0)),
+            lambda produccion: produccion.total_diario,
+        ),
+    }),
+    'sanidad': (EventoSanitario, 'ultimo_evento_sanitario', {}),
+}
+
+
+def avanzar(fuente, instance):
+    """Tras crear una fila de `fuente`: solo cuenta si no es más vieja que la guardada."""
+    _, columna_fecha, columnas = FUENTES[fuente]
+    valores = {columna_fecha: instance.fecha}
+    valores.update({columna: valor(instance) for columna, (_, valor) in columnas.items()})
+    Animal.objects.filter(
+        Q(**{f'{columna_fecha}__isnull': True}) | Q(**{f'{columna_fecha}__lte': instance.fecha}),
+        pk=instance.animal_id,
+    ).update(**valores)
+
+
+def recalcular(fuente, animal_ids):
+    """Vuelve a leer la última fila de `fuente` para cada animal de `animal_ids`."""
+    animal_ids = {a for a in animal_ids if a}
+    if not animal_ids:
+        return 0
+    modelo, columna_fecha, columnas = FUENTES[fuente]
+    ultima = modelo.objects.filter(animal_id=OuterRef('pk')).order_by('-fecha', '-id')
+    valores = {columna_fecha: Subquery(ultima.values('fecha')[:1])}
+    for columna, (expresion, _) in columnas.items():
+        valores[columna] = Subquery(ultima.annotate(_valor=expresion).values('_valor')[:1])
+    return Animal.objects.filter(pk__in=animal_ids).update(**valores)
+
+
+def recalcular_todo(animal_ids):
+    for fuente in FUENTES:
+        recalcular(fuente, animal_ids)
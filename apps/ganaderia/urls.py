@@ -7,7 +7,11 @@ urlpatterns = [
     path('animales/', views.animales_list, name='animales_list'),
     path('animales/<int:pk>/', views.animal_detail, name='animal_detail'),
     path('pesajes/', views.pesajes_list_view, name='pesajes_list'),
+    path('pesajes/importar/', views.pesajes_importar, name='pesajes_importar'),
+    path('pesajes/crecimiento/', views.crecimiento_view, name='crecimiento'),
+    path('api/crecimiento/<int:finca_id>/', views.api_crecimiento, name='api_crecimiento'),
     path('ajax/buscar-animal/', views.buscar_animal_por_arete, name='buscar_animal'),
+    path('api/animales/buscar/', views.api_buscar_animales, name='api_buscar_animales'),
     path('pesajes/<int:pk>/editar/', views.pesaje_edit_view, name='pesaje_edit'),
     path('pesajes/<int:pk>/eliminar/', views.pesaje_delete_view, name='pesaje_delete'),
     path('partos/registrar/', views.registrar_parto_view, name='registrar_parto'),
@@ -20,6 +24,9 @@ urlpatterns = [
     path('produccion/am/', views.produccion_am_view, name="produccion_am"),
     path('produccion/pm/', views.produccion_pm_view, name="produccion_pm"),
     path('produccion/exportar/', views.produccion_export_excel, name="produccion_exportar"),
+    path('produccion/importar/', views.produccion_importar, name="produccion_importar"),
+    path('api/produccion/lote/', views.api_produccion_lote, name="api_produccion_lote"),
+    path('produccion/lactancias/', views.lactancias_view, name="lactancias"),
     path('produccion/detalle/', views.registrar_produccion_view, name="produccion_detalle"),
 
     path('eventos-salida/', views.eventos_salida_list_view, name='eventos_salida_list'),
@@ -1,46 +1,155 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from .models import Animal, Pesaje, Parto, ProduccionLeche, EventoSalida
-from .forms import PesajeForm, PartoForm, ProduccionForm, EventoSalidaForm, TrasladoForm, PesajeEditForm
-from .services import AnimalService
+from django.core.exceptions import ValidationError
+from .models import (
+    Animal, Pesaje, Parto, ProduccionLeche, EventoSalida, Traslado, Lactancia, Genealogia, VersionDatos,
+)
+from .forms import (
+    PesajeForm, PartoForm, ProduccionForm, EventoSalidaForm, TrasladoForm, PesajeEditForm,
+    ImportarPlanillaForm,
+)
+from .services import AnimalProfileService, AnimalService, ProduccionService, PesajeService
+from .importacion import leer_planilla
 from apps.users.decorators import role_required  
-from django.core.paginator import Paginator
-import openpyxl
-from openpyxl import Workbook
-from django.http import HttpResponse, JsonResponse
+from .exports import (
+    datos_response,
+    COLUMNAS_PESAJES, COLUMNAS_PRODUCCION, COLUMNAS_PARTOS,
+    COLUMNAS_EVENTOS_SALIDA, COLUMNAS_TRASLADOS,
+)
+from apps.exportaciones.views import exportar
+from apps.salud.models import ConfirmacionGestacion, EventoSanitario, Inseminacion
+from .paginacion import paginar
+from .periodos import filtrar_periodo
+from .busqueda import buscar_animales, filtrar_animales
+from .crecimiento import reporte_finca
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_POST
+from django.core.files.storage import default_storage
+import json
+import os
+import uuid
 from apps.ganaderia.models import Finca, Animal
-from datetime import date
 from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from datetime import timedelta
+
+# ?orden= del listado de animales -> (etiqueta, ordering). Fuera del arete
+# se ordena por las columnas de último dato y solo entran los animales que
+# lo tienen (la paginación por llave no admite NULL en el orden).
+ORDENES_ANIMALES = {
+    'arete': ('Arete', ('numero_arete',)),
+    'peso': ('Último peso', ('-ultimo_peso', 'numero_arete')),
+    'pesaje': ('Pesaje más antiguo', ('fecha_ultimo_pesaje', 'numero_arete')),
+    'produccion': ('Última producción', ('-ultima_produccion_total', 'numero_arete')),
+    'sanidad': ('Evento sanitario reciente', ('-ultimo_evento_sanitario', 'numero_arete')),
+}
+
+# Modelos de los que sale cada fragmento en caché ({% cache %} con
+# VersionDatos.sello): una escritura en cualquiera de ellos lo invalida.
+MODELOS_LISTADO_ANIMALES = (Animal, Finca, Pesaje, ProduccionLeche, EventoSanitario)
+MODELOS_FICHA_ANIMAL = (
+    Animal, Finca, Pesaje, Parto, ProduccionLeche, EventoSalida, Traslado, Lactancia, Genealogia,
+    EventoSanitario, Inseminacion, ConfirmacionGestacion,
+)
+
+
+def _numero(texto, tipo=float):
+    try:
+        return tipo(texto) if texto not in (None, '') else None
+    except ValueError:
+        return None
+
 
 @login_required
 def animales_list(request):
     q = request.GET.get('q')
-    if q:
-        animales = Animal.objects.filter(numero_arete__icontains=q) | Animal.objects.filter(nombre__icontains=q)
-    else:
-        animales = Animal.objects.all()
-    return render(request, 'ganaderia/animales_list.html', {'animales': animales})
+    animales = filtrar_animales(Animal.objects.all(), q)
+
+    peso_min = _numero(request.GET.get('peso_min'))
+    peso_max = _numero(request.GET.get('peso_max'))
+    sin_pesaje = _numero(request.GET.get('sin_pesaje'), int)
+    if peso_min is not None:
+        animales = animales.filter(ultimo_peso__gte=peso_min)
+    if peso_max is not None:
+        animales = animales.filter(ultimo_peso__lte=peso_max)
+    if sin_pesaje is not None:
+        limite = timezone.localdate() - timedelta(days=sin_pesaje)
+        animales = animales.filter(Q(fecha_ultimo_pesaje__isnull=True) | Q(fecha_ultimo_pesaje__lt=limite))
+
+    orden = request.GET.get('orden')
+    if orden not in ORDENES_ANIMALES:
+        orden = 'arete'
+    ordering = ORDENES_ANIMALES[orden][1]
+    if orden != 'arete':
+        animales = animales.filter(**{f"{ordering[0].lstrip('-')}__isnull": False})
+
+    # La página se lee solo si la tabla no está en caché.
+    return render(request, 'ganaderia/animales_list.html', {
+        'animales': SimpleLazyObject(lambda: paginar(request, animales.select_related('finca'), ordering)),
+        'version': VersionDatos.objects.sello(*MODELOS_LISTADO_ANIMALES),
+        'hoy': timezone.localdate(),
+        'orden': orden,
+        'ordenes': [(clave, etiqueta) for clave, (etiqueta, _) in ORDENES_ANIMALES.items()],
+    })
+
+GENERACIONES_LINEA = 6
+
 
 @login_required
 def animal_detail(request, pk):
-    animal = get_object_or_404(Animal, pk=pk)
-    return render(request, 'ganaderia/animal_detail.html', {'animal': animal})
+    perfil = AnimalProfileService.obtener(pk)
+    if perfil is None:
+        raise Http404("Animal no encontrado")
+    animal = perfil['animal']
+    return render(request, 'ganaderia/animal_detail.html', {
+        'animal': animal,
+        'perfil': perfil,
+        'version': VersionDatos.objects.sello(*MODELOS_FICHA_ANIMAL),
+        'lactancias': animal.lactancias.all(),
+        'linea_materna': Animal.objects.ancestros_de(animal, GENERACIONES_LINEA).order_by('profundidad'),
+        'descendientes': Animal.objects.descendientes_de(animal).order_by('profundidad', 'numero_arete'),
+    })
 
 @login_required
-def buscar_animal_por_arete(request):
+async def buscar_animal_por_arete(request):
+    # Async: se llama en cada tecla del formulario y casi siempre lo sirve
+    # el LRU de cache_aretes sin ocupar un hilo (ver README, ASGI).
     arete = request.GET.get("arete", "").strip()
 
-    try:
-        animal = Animal.objects.get_by_arete(arete)
-        return JsonResponse({
-            "existe": True,
-            "nombre": animal.nombre,
-            "finca": animal.finca.nombre,
-        })
-    except Animal.DoesNotExist:
+    animal = await Animal.objects.aget_by_arete(arete)
+    if animal is None:
         return JsonResponse({"existe": False})
 
+    return JsonResponse({
+        "existe": True,
+        "nombre": animal.nombre,
+        "finca": animal.finca.nombre,
+    })
+
+@login_required
+def api_buscar_animales(request):
+    """Autocompletado: los N animales más relevantes para ?q= (arete o nombre)."""
+    try:
+        limite = min(int(request.GET.get("limite", 10)), 25)
+    except ValueError:
+        limite = 10
+
+    animales = buscar_animales(request.GET.get("q", ""), limite=max(limite, 1))
+    return JsonResponse({
+        "resultados": [
+            {
+                "id": a.id,
+                "numero_arete": a.numero_arete,
+                "nombre": a.nombre,
+                "finca": a.finca.nombre,
+                "estado": a.estado,
+            }
+            for a in animales
+        ]
+    })
+
 @login_required
 @role_required("Gerente", "Administrador Finca")
 def pesajes_list_view(request):
@@ -55,7 +164,8 @@ def pesajes_list_view(request):
                     fecha=form.cleaned_data['fecha'],
                     peso=form.cleaned_data['peso'],
                     finca=form.cleaned_data['finca'],
-                    usuario=request.user
+                    usuario=request.user,
+                    animal=form.cleaned_data['animal'],
                 )
 
                 messages.success(request, "Pesaje registrado exitosamente")
@@ -66,19 +176,85 @@ def pesajes_list_view(request):
 
     else:
         form = PesajeForm()
-    queryset = Pesaje.objects.all()
-    mes = request.GET.get('mes')
-    if mes:
-        queryset = queryset.filter(fecha__month=mes)
+    queryset, periodo = filtrar_periodo(Pesaje.objects.all(), request.GET)
     if "exportar" in request.GET:
-        return exportar_pesajes_excel(queryset)
+        return exportar(request, "pesajes")
+
+    respuesta = datos_response(request, "pesajes", queryset, COLUMNAS_PESAJES)
+    if respuesta:
+        return respuesta
+
+    pesajes = paginar(request, queryset.select_related('animal'), ('-fecha', '-id'))
 
     return render(request, 'ganaderia/pesajes_list.html', {
-        'pesajes': queryset,
-        'mes': mes,
+        'pesajes': pesajes,
+        'periodo': periodo,
         'form': form
     })
 
+@login_required
+@role_required("Gerente", "Administrador Finca")
+def crecimiento_view(request):
+    fincas = Finca.objects.order_by("nombre")
+    finca_id = request.GET.get("finca")
+    finca = fincas.filter(pk=finca_id).first() if finca_id and finca_id.isdigit() else fincas.first()
+    return render(request, "ganaderia/crecimiento.html", {
+        "fincas": fincas,
+        "finca": finca,
+        "reporte": reporte_finca(finca) if finca else None,
+    })
+
+
+@login_required
+@role_required("Gerente", "Administrador Finca")
+def api_crecimiento(request, finca_id):
+    return JsonResponse(reporte_finca(get_object_or_404(Finca, pk=finca_id)))
+
+
+SESION_IMPORTACION_PESAJES = "importacion_pesajes"
+
+
+@login_required
+@role_required("Gerente", "Administrador Finca")
+def pesajes_importar(request):
+    """
+    Dos pasos: subir la planilla muestra una vista previa (nada se guarda
+    y el archivo queda en el storage); "Confirmar" la importa y lo borra.
+    """
+    form = ImportarPlanillaForm()
+    resumen = None
+    pendiente = request.session.get(SESION_IMPORTACION_PESAJES)
+
+    if request.method == "POST" and request.POST.get("accion") == "confirmar":
+        if not pendiente or not default_storage.exists(pendiente):
+            messages.error(request, "No hay una planilla pendiente de confirmar; vuelva a subirla.")
+            return redirect("ganaderia:pesajes_importar")
+
+        with default_storage.open(pendiente, "rb") as archivo:
+            resumen = PesajeService.importar(leer_planilla(archivo), confirmar=True)
+        default_storage.delete(pendiente)
+        del request.session[SESION_IMPORTACION_PESAJES]
+        messages.success(request, f"{resumen['guardados']} pesajes importados.")
+
+    elif request.method == "POST":
+        form = ImportarPlanillaForm(request.POST, request.FILES)
+        if form.is_valid():
+            if pendiente:
+                default_storage.delete(pendiente)
+            archivo = form.cleaned_data["archivo"]
+            extension = os.path.splitext(archivo.name)[1].lower()
+            nombre = default_storage.save(f"importaciones/pesajes/{uuid.uuid4().hex}{extension}", archivo)
+            request.session[SESION_IMPORTACION_PESAJES] = nombre
+
+            with default_storage.open(nombre, "rb") as guardado:
+                resumen = PesajeService.importar(leer_planilla(guardado), confirmar=False)
+
+    return render(request, "ganaderia/pesajes_importar.html", {
+        "form": form,
+        "resumen": resumen,
+    })
+
+
 @login_required
 @role_required("Gerente", "Administrador Finca")
 def pesaje_edit_view(request, pk):
@@ -109,30 +285,6 @@ def pesaje_delete_view(request, pk):
     return render(request, 'ganaderia/pesaje_delete.html', {'pesaje': pesaje})
 
 
-def exportar_pesajes_excel(queryset):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Pesajes"
-
-    ws.append(["Fecha", "Arete", "Nombre", "Peso (kg)", "Finca"])
-
-    for p in queryset:
-        ws.append([
-            p.fecha,
-            p.animal.numero_arete,
-            p.animal.nombre,
-            p.peso,
-            p.finca.nombre
-        ])
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response['Content-Disposition'] = 'attachment; filename=pesajes.xlsx'
-
-    wb.save(response)
-    return response
-
 @login_required
 @role_required("Gerente", "Administrador Finca")
 def partos_list(request):
@@ -142,11 +294,13 @@ def partos_list(request):
     partos = Parto.objects.select_related("madre", "cria", "finca")
 
     if madre_filter:
-        partos = partos.filter(madre__numero_arete__icontains=madre_filter)
+        partos = partos.filter(madre__in=filtrar_animales(Animal.objects.all(), madre_filter))
 
-    paginator = Paginator(partos.order_by('-fecha_nacimiento'), 10)
-    page = request.GET.get('page')
-    partos_page = paginator.get_page(page)
+    respuesta = datos_response(request, "partos", partos, COLUMNAS_PARTOS)
+    if respuesta:
+        return respuesta
+
+    partos_page = paginar(request, partos, ('-fecha_nacimiento', '-id'), per_page=10)
 
     context = {
         "partos": partos_page,
@@ -254,55 +408,30 @@ def registrar_parto_view(request):
 @login_required
 @role_required("Gerente", "Administrador Finca")
 def partos_excel(request):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Partos"
-
-    ws.append([
-        "Madre", "Fecha Nacimiento Cría", "Nombre Cría",
-        "Arete Cría", "Finca", "Raza", "Sexo", "Peso (kg)"
-    ])
-
-    for p in Parto.objects.select_related("madre", "cria", "finca"):
-        ws.append([
-            p.madre.numero_arete,
-            p.fecha_nacimiento.strftime("%d/%m/%Y"),
-            p.cria.nombre,
-            p.cria.numero_arete,
-            p.finca.nombre,
-            p.raza,
-            p.sexo,
-            p.peso,
-        ])
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = 'attachment; filename="partos.xlsx"'
-    wb.save(response)
-    return response
+    return exportar(request, "partos")
 
 
 @login_required
 @role_required("Gerente", "Administrador Finca")
 def registrar_produccion_view(request):
-    mes = request.GET.get("mes")
+    producciones, periodo = filtrar_periodo(ProduccionLeche.objects.all(), request.GET)
 
-    producciones = ProduccionLeche.objects.all()
-    if mes:
-        producciones = producciones.filter(fecha__month=mes)
+    respuesta = datos_response(request, "produccion_leche", producciones, COLUMNAS_PRODUCCION)
+    if respuesta:
+        return respuesta
+
+    producciones = paginar(
+        request, producciones.select_related("animal", "finca"), ("-fecha", "-id")
+    )
 
     form_am = ProduccionForm(turno="AM")
     form_pm = ProduccionForm(turno="PM")
 
-    meses = ["01","02","03","04","05","06","07","08","09","10","11","12"]
-
     return render(request, "ganaderia/registrar_produccion.html", {
         "form_am": form_am,
         "form_pm": form_pm,
         "producciones": producciones,
-        "mes": mes,
-        "meses": meses, 
+        "periodo": periodo,
     })
 
 def produccion_am_view(request):
@@ -310,24 +439,13 @@ def produccion_am_view(request):
         form = ProduccionForm(request.POST)
 
         if form.is_valid():
-            animal = form.cleaned_data["animal"]
-            finca = form.cleaned_data["finca"]
-            peso_am = form.cleaned_data["peso_am"]
-            fecha = form.cleaned_data["fecha"]
-
-            produccion, created = ProduccionLeche.objects.get_or_create(
-                animal=animal,
-                fecha=fecha,
-                defaults={
-                    "finca": finca,
-                    "peso_am": peso_am,
-                }
+            ProduccionService.registrar_turno(
+                form.cleaned_data["animal"],
+                form.cleaned_data["fecha"],
+                "AM",
+                form.cleaned_data["peso_am"],
             )
 
-            if not created:
-                produccion.peso_am = peso_am
-                produccion.save()
-
             messages.success(request, "Producción AM registrada correctamente.")
             return redirect("ganaderia:registrar_produccion")
 
@@ -341,24 +459,13 @@ def produccion_pm_view(request):
         form = ProduccionForm(request.POST)
 
         if form.is_valid():
-            animal = form.cleaned_data["animal"]
-            finca = form.cleaned_data["finca"]
-            peso_pm = form.cleaned_data["peso_pm"]
-            fecha = form.cleaned_data["fecha"]
-
-            produccion, created = ProduccionLeche.objects.get_or_create(
-                animal=animal,
-                fecha=fecha,
-                defaults={
-                    "finca": finca,
-                    "peso_pm": peso_pm,
-                }
+            ProduccionService.registrar_turno(
+                form.cleaned_data["animal"],
+                form.cleaned_data["fecha"],
+                "PM",
+                form.cleaned_data["peso_pm"],
             )
 
-            if not created:
-                produccion.peso_pm = peso_pm
-                produccion.save()
-
             messages.success(request, "Producción PM registrada correctamente.")
             return redirect("ganaderia:registrar_produccion")
 
@@ -369,38 +476,63 @@ def produccion_pm_view(request):
 
 @login_required
 @role_required("Gerente", "Administrador Finca")
-def produccion_export_excel(request):
+def produccion_importar(request):
+    resultado = None
+    if request.method == "POST":
+        form = ImportarPlanillaForm(request.POST, request.FILES)
+        if form.is_valid():
+            resultado = ProduccionService.importar_lote(leer_planilla(form.cleaned_data["archivo"]))
+            messages.success(
+                request,
+                f"{resultado['filas_aceptadas']} filas cargadas en {resultado['registros']} registros.",
+            )
+            if resultado["errores"]:
+                messages.warning(request, f"{len(resultado['errores'])} filas con errores.")
+    else:
+        form = ImportarPlanillaForm()
 
-    mes = request.GET.get("mes")
+    return render(request, "ganaderia/produccion_importar.html", {
+        "form": form,
+        "resultado": resultado,
+    })
 
-    datos = ProduccionLeche.objects.all()
-    if mes:
-        datos = datos.filter(fecha__month=mes)
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Producción"
+@login_required
+@role_required("Gerente", "Administrador Finca")
+@require_POST
+def api_produccion_lote(request):
+    """
+    Recibe [{"arete", "fecha", "turno", "kg"}, ...] y devuelve el resumen
+    de importar_lote; las filas se numeran desde 1 según su posición.
+    """
+    try:
+        datos = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "JSON inválido"}, status=400)
+    if not isinstance(datos, list) or not all(isinstance(d, dict) for d in datos):
+        return JsonResponse({"error": "Se esperaba un arreglo de objetos"}, status=400)
 
-    ws.append(["Fecha", "Arete", "Nombre", "Finca", "AM", "PM", "Total Diario"])
+    resultado = ProduccionService.importar_lote(enumerate(datos, start=1))
+    return JsonResponse(resultado)
 
-    for p in datos:
-        ws.append([
-            p.fecha,
-            p.animal.numero_arete,
-            p.animal.nombre,
-            p.finca.nombre,
-            p.peso_am or 0,
-            p.peso_pm or 0,
-            p.total_diario,
-        ])
 
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = "attachment; filename=produccion_leche.xlsx"
-    wb.save(response)
+@login_required
+@role_required("Gerente", "Administrador Finca")
+def lactancias_view(request):
+    fincas = Finca.objects.order_by("nombre")
+    finca_id = request.GET.get("finca")
+    finca = fincas.filter(pk=finca_id).first() if finca_id and finca_id.isdigit() else fincas.first()
+    lactancias = Lactancia.objects.filter(animal__finca=finca).select_related("animal")
+    return render(request, "ganaderia/lactancias.html", {
+        "fincas": fincas,
+        "finca": finca,
+        "lactancias": paginar(request, lactancias, ("-fecha_parto", "-id")),
+    })
 
-    return response
+@login_required
+@role_required("Gerente", "Administrador Finca")
+def produccion_export_excel(request):
+    return exportar(request, "produccion")
 
 @login_required
 @role_required("Gerente", "Auxiliar administrativa")
@@ -417,6 +549,12 @@ def eventos_salida_list_view(request):
     if tipo:
         eventos = eventos.filter(tipo_evento=tipo)
 
+    respuesta = datos_response(request, "eventos_salida", eventos, COLUMNAS_EVENTOS_SALIDA)
+    if respuesta:
+        return respuesta
+
+    eventos = paginar(request, eventos, ("-fecha", "-id"))
+
     return render(request, "ganaderia/eventos_salida_list.html", {
         "eventos": eventos,
         "fecha": fecha,
@@ -451,19 +589,16 @@ def registrar_evento_salida_view(request):
 
 
 @login_required
-def api_animal_info(request):
+async def api_animal_info(request):
     arete = request.GET.get("arete", "").strip()
 
-    try:
-        animal = Animal.objects.get(numero_arete=arete)
-    except Animal.DoesNotExist:
+    animal = await Animal.objects.aget_by_arete(arete)
+    if animal is None:
         return JsonResponse({"error": "No encontrado"}, status=404)
 
-    dias = (date.today() - animal.fecha_nacimiento).days
-
     return JsonResponse({
         "nombre": animal.nombre,
-        "dias_nacido": dias
+        "dias_nacido": animal.edad_dias
     })
 
 @login_required
@@ -487,12 +622,22 @@ def traslados_view(request):
     animales = Animal.objects.all().select_related("finca")
 
     if q:
-        animales = animales.filter(numero_arete__icontains=q)
+        animales = filtrar_animales(animales, q)
+
+    if request.method == "GET":
+        traslados = Traslado.objects.all()
+        if q:
+            traslados = traslados.filter(animal__in=filtrar_animales(Animal.objects.all(), q))
+        respuesta = datos_response(request, "traslados", traslados, COLUMNAS_TRASLADOS)
+        if respuesta:
+            return respuesta
 
     fincas = Finca.objects.all()
 
     if request.method == "POST":
         aretes = request.POST.getlist("animales_seleccionados", [])
+        # Lote pegado desde una planilla: aretes separados por coma, espacio o salto de línea.
+        aretes += request.POST.get("aretes_lote", "").replace(",", " ").split()
         finca_destino_id = request.POST.get("finca_destino")
 
         if not aretes:
@@ -506,11 +651,12 @@ def traslados_view(request):
             return redirect("ganaderia:traslados")
 
         try:
-            AnimalService.trasladar_animales(aretes, finca_destino, usuario=request.user)
-            messages.success(request, "Traslado realizado exitosamente")
+            traslados = AnimalService.trasladar_animales(aretes, finca_destino, usuario=request.user)
+            messages.success(request, f"Traslado realizado exitosamente ({len(traslados)} animales)")
             return redirect("ganaderia:traslados")
-        except Exception as e:
-            messages.error(request, str(e))
+        except ValidationError as e:
+            for mensaje in e.messages:
+                messages.error(request, mensaje)
 
     return render(request, "ganaderia/traslados.html", {
         "animales": animales,
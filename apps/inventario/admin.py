@@ -1,3 +1,9 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ResumenHato
+
+
+@admin.register(ResumenHato)
+class ResumenHatoAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'animales', 'animales_activos', 'partos', 'actualizado_en')
+    readonly_fields = ResumenHato.CONTADORES + ('actualizado_en',)
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class InventarioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'inventario'
+    name = 'apps.inventario'
+
+    def ready(self):
+        import apps.inventario.signals
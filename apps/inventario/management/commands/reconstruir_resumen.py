@@ -0,0 +1,13 @@
+# apps/inventario/management/commands/reconstruir_resumen.py
+
+from django.core.management.base import BaseCommand
+
+from apps.inventario.services import ResumenService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero los contadores del tablero (ResumenHato)'
+
+    def handle(self, *args, **options):
+        filas = ResumenService.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'✅ Resumen reconstruido ({filas} filas)'))
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:17
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+def crear_filas(apps, schema_editor):
+    # Fila global y una por finca; los contadores se llenan con reconstruir_resumen.
+    ResumenHato = apps.get_model('inventario', 'ResumenHato')
+    Finca = apps.get_model('finca', 'Finca')
+    ResumenHato.objects.create(finca=None)
+    ResumenHato.objects.bulk_create([ResumenHato(finca=finca) for finca in Finca.objects.all()])
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('finca', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenHato',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('animales', models.IntegerField(default=0)),
+                ('animales_activos', models.IntegerField(default=0)),
+                ('vacas_produccion', models.IntegerField(default=0)),
+                ('ventas', models.IntegerField(default=0)),
+                ('muertes', models.IntegerField(default=0)),
+                ('descartes', models.IntegerField(default=0)),
+                ('traslados', models.IntegerField(default=0)),
+                ('partos', models.IntegerField(default=0)),
+                ('gestantes', models.IntegerField(default=0)),
+                ('eventos_sanitarios', models.IntegerField(default=0)),
+                ('inseminaciones', models.IntegerField(default=0)),
+                ('inseminaciones_pendientes', models.IntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('finca', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resumenes', to='finca.finca')),
+            ],
+            options={
+                'verbose_name': 'Resumen del hato',
+                'verbose_name_plural': 'Resúmenes del hato',
+                'constraints': [models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('finca', models.Value(0)), name='resumen_hato_unico_por_finca')],
+            },
+        ),
+        migrations.RunPython(crear_filas, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,55 @@
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+
+from apps.finca.models import Finca
+
+
+class ResumenHato(models.Model):
+    """
+    Contadores del tablero de inicio. Hay una fila por finca y una fila
+    global (finca NULL); las señales y los servicios de carga masiva los
+    ajustan con UPDATE ... SET campo = campo + delta dentro de la misma
+    transacción que el cambio. `reconstruir_resumen` los recalcula.
+
+    Los contadores de eventos, salidas e inseminaciones se atribuyen a la
+    finca actual del animal (se mueven con él en un traslado); partos a la
+    finca del propio registro; traslados a la de destino. La producción de
+    leche vive en los rollups de ganaderia (ProduccionDiariaFinca).
+    """
+    finca = models.ForeignKey(
+        Finca, null=True, blank=True, on_delete=models.CASCADE, related_name='resumenes'
+    )
+
+    animales = models.IntegerField(default=0)
+    animales_activos = models.IntegerField(default=0)
+    vacas_produccion = models.IntegerField(default=0)
+    ventas = models.IntegerField(default=0)
+    muertes = models.IntegerField(default=0)
+    descartes = models.IntegerField(default=0)
+    traslados = models.IntegerField(default=0)
+    partos = models.IntegerField(default=0)
+    gestantes = models.IntegerField(default=0)
+    eventos_sanitarios = models.IntegerField(default=0)
+    inseminaciones = models.IntegerField(default=0)
+    inseminaciones_pendientes = models.IntegerField(default=0)
+
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    CONTADORES = (
+        'animales', 'animales_activos', 'vacas_produccion', 'ventas', 'muertes',
+        'descartes', 'traslados', 'partos', 'gestantes', 'eventos_sanitarios',
+        'inseminaciones', 'inseminaciones_pendientes',
+    )
+
+    class Meta:
+        verbose_name = 'Resumen del hato'
+        verbose_name_plural = 'Resúmenes del hato'
+        constraints = [
+            # Una sola fila por finca y una sola global (NULL -> 0).
+            models.UniqueConstraint(Coalesce('finca', Value(0)), name='resumen_hato_unico_por_finca'),
+        ]
+
+    def __str__(self):
+        return f"Resumen {self.finca.nombre if self.finca_id else 'global'}"
 
-# Create your models here.
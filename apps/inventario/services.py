@@ -0,0 +1,189 @@
+# apps/inventario/services.py
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+from apps.finca.models import Finca
+from apps.ganaderia.models import Animal, EventoSalida, Parto, Traslado, VersionDatos
+from apps.salud.models import ConfirmacionGestacion, EventoSanitario, Inseminacion
+from .models import ResumenHato
+
+ESTADOS_ACTIVOS = ('activo', 'trasladado', 'gestante')
+CONTADOR_SALIDA = {'venta': 'ventas', 'muerte': 'muertes', 'descarte': 'descartes'}
+
+
+def contribucion_animal(finca_id, estado, sexo):
+    return {finca_id: {
+        'animales': 1,
+        'animales_activos': int(estado in ESTADOS_ACTIVOS),
+        'vacas_produccion': int(estado == 'activo' and sexo == 'F'),
+    }}
+
+
+def sumar(destino, origen, signo=1):
+    """destino[finca][campo] += signo * origen[finca][campo]"""
+    for finca_id, contadores in origen.items():
+        for campo, valor in contadores.items():
+            destino[finca_id][campo] = destino[finca_id].get(campo, 0) + signo * valor
+    return destino
+
+
+def nuevos_deltas():
+    return defaultdict(dict)
+
+
+class ResumenService:
+
+    @staticmethod
+    def aplicar(deltas):
+        """
+        `deltas` es {finca_id: {campo: delta}}. Actualiza cada finca y la
+        fila global con incrementos atómicos (F), así que dos escritores
+        concurrentes no se pisan.
+        """
+        total = {}
+        for finca_id, contadores in deltas.items():
+            contadores = {c: v for c, v in contadores.items() if v}
+            if not contadores:
+                continue
+            for campo, valor in contadores.items():
+                total[campo] = total.get(campo, 0) + valor
+            if finca_id is not None:
+                ResumenService._incrementar(finca_id, contadores)
+
+        total = {c: v for c, v in total.items() if v}
+        if total:
+            ResumenService._incrementar(None, total)
+
+    @staticmethod
+    def _incrementar(finca_id, contadores):
+        filas = ResumenHato.objects.filter(
+            finca__isnull=True) if finca_id is None else ResumenHato.objects.filter(finca_id=finca_id)
+        cambios = {campo: F(campo) + valor for campo, valor in contadores.items()}
+        if filas.update(**cambios):
+            return
+        # Primera escritura para esta finca: crear la fila y repetir.
+        try:
+            with transaction.atomic():
+                ResumenHato.objects.create(finca_id=finca_id)
+        except IntegrityError:
+            pass
+        filas.update(**cambios)
+
+    @staticmethod
+    def contadores_por_animal(animal_ids=None):
+        """
+        Contadores que siguen al animal, agrupados por su finca actual.
+        Sin `animal_ids` cubre todo el hato (lo usa reconstruir).
+        """
+        def filtrar(queryset, campo='animal_id'):
+            if animal_ids is None:
+                return queryset
+            return queryset.filter(**{f'{campo}__in': animal_ids})
+
+        deltas = nuevos_deltas()
+
+        for fila in (
+            filtrar(EventoSalida.objects.all())
+            .values('animal__finca_id', 'tipo_evento').annotate(n=Count('id')).order_by()
+        ):
+            campo = CONTADOR_SALIDA.get(fila['tipo_evento'])
+            if campo:
+                sumar(deltas, {fila['animal__finca_id']: {campo: fila['n']}})
+
+        for fila in (
+            filtrar(EventoSanitario.objects.all())
+            .values('animal__finca_id').annotate(n=Count('id')).order_by()
+        ):
+            sumar(deltas, {fila['animal__finca_id']: {'eventos_sanitarios': fila['n']}})
+
+        for fila in (
+            filtrar(Inseminacion.objects.all())
+            .values('animal__finca_id')
+            .annotate(
+                n=Count('id'),
+                pendientes=Count('id', filter=Q(confirmaciongestacion__isnull=True)),
+            ).order_by()
+        ):
+            sumar(deltas, {fila['animal__finca_id']: {
+                'inseminaciones': fila['n'],
+                'inseminaciones_pendientes': fila['pendientes'],
+            }})
+
+        for fila in (
+            filtrar(ConfirmacionGestacion.objects.filter(resultado='gestante'), 'inseminacion__animal_id')
+            .values('inseminacion__animal__finca_id').annotate(n=Count('id')).order_by()
+        ):
+            sumar(deltas, {fila['inseminacion__animal__finca_id']: {'gestantes': fila['n']}})
+
+        return deltas
+
+    @staticmethod
+    def mover_animales(origen_por_finca, finca_destino_id):
+        """
+        Pasa a la finca destino los contadores que siguen al animal.
+        `origen_por_finca` es el resultado de contadores_por_animal tomado
+        antes de cambiar la finca.
+        """
+        deltas = nuevos_deltas()
+        for finca_id, contadores in origen_por_finca.items():
+            if finca_id == finca_destino_id:
+                continue
+            sumar(deltas, {finca_id: contadores}, -1)
+            sumar(deltas, {finca_destino_id: contadores})
+        return deltas
+
+    @staticmethod
+    def registrar_traslado(animales, finca_destino_id):
+        """
+        Ajuste para AnimalService.trasladar_animales, que mueve el grupo con
+        un UPDATE sin señales. `animales` son dicts con id, finca_id, estado
+        y sexo tal como estaban antes del traslado. Debe llamarse antes del
+        UPDATE para agrupar por la finca de origen.
+        """
+        deltas = ResumenService.mover_animales(
+            ResumenService.contadores_por_animal([a['id'] for a in animales]), finca_destino_id
+        )
+        for animal in animales:
+            sumar(deltas, contribucion_animal(animal['finca_id'], animal['estado'], animal['sexo']), -1)
+            sumar(deltas, contribucion_animal(finca_destino_id, 'trasladado', animal['sexo']))
+        sumar(deltas, {finca_destino_id: {'traslados': len(animales)}})
+        ResumenService.aplicar(deltas)
+
+    @staticmethod
+    @transaction.atomic
+    def reconstruir():
+        """Recalcula todos los contadores desde las tablas de origen."""
+        deltas = ResumenService.contadores_por_animal()
+
+        for fila in Animal.objects.values('finca_id').annotate(
+            n=Count('id'),
+            activos=Count('id', filter=Q(estado__in=ESTADOS_ACTIVOS)),
+            vacas=Count('id', filter=Q(estado='activo', sexo='F')),
+        ).order_by():
+            sumar(deltas, {fila['finca_id']: {
+                'animales': fila['n'],
+                'animales_activos': fila['activos'],
+                'vacas_produccion': fila['vacas'],
+            }})
+
+        for fila in Parto.objects.values('finca_id').annotate(n=Count('id')).order_by():
+            sumar(deltas, {fila['finca_id']: {'partos': fila['n']}})
+
+        for fila in Traslado.objects.values('finca_destino_id').annotate(n=Count('id')).order_by():
+            sumar(deltas, {fila['finca_destino_id']: {'traslados': fila['n']}})
+
+        ResumenHato.objects.all().delete()
+        filas = [ResumenHato(finca_id=None)]
+        filas += [ResumenHato(finca_id=finca_id) for finca_id in Finca.objects.values_list('id', flat=True)]
+        por_finca = {fila.finca_id: fila for fila in filas}
+
+        for finca_id, contadores in deltas.items():
+            for campo, valor in contadores.items():
+                for fila in (por_finca[finca_id], por_finca[None]):
+                    setattr(fila, campo, getattr(fila, campo) + valor)
+
+        ResumenHato.objects.bulk_create(filas)
+        VersionDatos.objects.incrementar_al_confirmar(ResumenHato)
+        return len(filas)
@@ -0,0 +1,122 @@
+# apps/inventario/signals.py
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.finca.models import Finca
+from apps.ganaderia.models import Animal, EventoSalida, Parto, Traslado
+from apps.salud.models import ConfirmacionGestacion, EventoSanitario, Inseminacion
+from .models import ResumenHato
+from .services import (
+    CONTADOR_SALIDA, ResumenService, contribucion_animal, nuevos_deltas, sumar,
+)
+
+
+def _finca_de_animal(animal_id):
+    return Animal.objects.filter(pk=animal_id).values_list('finca_id', flat=True).first()
+
+
+def _finca_de_inseminacion(inseminacion_id):
+    return (
+        Inseminacion.objects.filter(pk=inseminacion_id)
+        .values_list('animal__finca_id', flat=True).first()
+    )
+
+
+# modelo -> (campos que se recuerdan al cargar, {finca_id: {contador: valor}})
+SEGUIMIENTO = {
+    Animal: (
+        ('finca_id', 'estado', 'sexo'),
+        lambda v: contribucion_animal(v['finca_id'], v['estado'], v['sexo']),
+    ),
+    EventoSalida: (
+        ('animal_id', 'tipo_evento'),
+        lambda v: {_finca_de_animal(v['animal_id']): {CONTADOR_SALIDA[v['tipo_evento']]: 1}}
+        if v['tipo_evento'] in CONTADOR_SALIDA else {},
+    ),
+    Traslado: (
+        ('finca_destino_id',),
+        lambda v: {v['finca_destino_id']: {'traslados': 1}},
+    ),
+    Parto: (
+        ('finca_id',),
+        lambda v: {v['finca_id']: {'partos': 1}},
+    ),
+    EventoSanitario: (
+        ('animal_id',),
+        lambda v: {_finca_de_animal(v['animal_id']): {'eventos_sanitarios': 1}},
+    ),
+    Inseminacion: (
+        ('animal_id',),
+        lambda v: {_finca_de_animal(v['animal_id']): {'inseminaciones': 1, 'inseminaciones_pendientes': 1}},
+    ),
+    ConfirmacionGestacion: (
+        ('inseminacion_id', 'resultado'),
+        lambda v: {_finca_de_inseminacion(v['inseminacion_id']): {
+            'inseminaciones_pendientes': -1,
+            'gestantes': int(v['resultado'] == 'gestante'),
+        }},
+    ),
+}
+
+
+def _valores(instance):
+    """Valores seguidos tal como están en memoria; None si alguno está diferido."""
+    campos, _ = SEGUIMIENTO[type(instance)]
+    if any(campo not in instance.__dict__ for campo in campos):
+        return None
+    return {campo: instance.__dict__[campo] for campo in campos}
+
+
+def recordar_original(sender, instance, **kwargs):
+    instance._resumen_original = _valores(instance)
+
+
+def completar_original(sender, instance, **kwargs):
+    # Instancia cargada con .only()/.defer(): se leen los valores de la base.
+    if instance.pk and not instance._state.adding and getattr(instance, '_resumen_original', None) is None:
+        campos, _ = SEGUIMIENTO[sender]
+        instance._resumen_original = sender.objects.filter(pk=instance.pk).values(*campos).first()
+
+
+def actualizar_resumen(sender, instance, created, **kwargs):
+    _, contribucion = SEGUIMIENTO[sender]
+    actuales = _valores(instance) or sender.objects.filter(pk=instance.pk).values(
+        *SEGUIMIENTO[sender][0]).first()
+    anteriores = None if created else instance._resumen_original
+
+    deltas = nuevos_deltas()
+    if anteriores:
+        sumar(deltas, contribucion(anteriores), -1)
+    sumar(deltas, contribucion(actuales))
+
+    if sender is Animal and anteriores and anteriores['finca_id'] != actuales['finca_id']:
+        # Ya está guardado en la finca nueva: todo lo que sigue al animal
+        # (agrupado por su finca actual) viene de la anterior.
+        siguen = ResumenService.contadores_por_animal([instance.pk])
+        total = nuevos_deltas()
+        for contadores in siguen.values():
+            sumar(total, {anteriores['finca_id']: contadores})
+        sumar(deltas, ResumenService.mover_animales(total, actuales['finca_id']))
+
+    ResumenService.aplicar(deltas)
+    instance._resumen_original = actuales
+
+
+def descontar_resumen(sender, instance, **kwargs):
+    _, contribucion = SEGUIMIENTO[sender]
+    anteriores = getattr(instance, '_resumen_original', None) or _valores(instance)
+    if anteriores:
+        ResumenService.aplicar(sumar(nuevos_deltas(), contribucion(anteriores), -1))
+
+
+for modelo in SEGUIMIENTO:
+    post_init.connect(recordar_original, sender=modelo, dispatch_uid=f'resumen_init_{modelo.__name__}')
+    pre_save.connect(completar_original, sender=modelo, dispatch_uid=f'resumen_pre_{modelo.__name__}')
+    post_save.connect(actualizar_resumen, sender=modelo, dispatch_uid=f'resumen_save_{modelo.__name__}')
+    post_delete.connect(descontar_resumen, sender=modelo, dispatch_uid=f'resumen_delete_{modelo.__name__}')
+
+
+@receiver(post_save, sender=Finca)
+def crear_resumen_finca(sender, instance, created, **kwargs):
+    if created:
+        ResumenHato.objects.get_or_create(finca=instance)
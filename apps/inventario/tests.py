@@ -1,3 +1,84 @@
+from datetime import date
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from apps.finca.models import Finca
+from apps.ganaderia.models import Animal, EventoSalida, Parto
+from apps.ganaderia.services import AnimalService, ProduccionService
+from apps.salud.models import ConfirmacionGestacion, EventoSanitario, Inseminacion
+from apps.users.models import Rol, User
+from .models import ResumenHato
+from .services import ResumenService
+
+
+class ResumenHatoTestCase(TestCase):
+    def setUp(self):
+        rol = Rol.objects.create(nombre_rol="Gerente")
+        self.user = User.objects.create_user(cedula='950', email='resumen@test.com', password='pass', rol=rol)
+        self.norte = Finca.objects.create(nombre="Norte", codigo="NOR01")
+        self.sur = Finca.objects.create(nombre="Sur", codigo="SUR01")
+
+    def _contadores(self):
+        return {
+            fila.finca_id: {campo: getattr(fila, campo) for campo in ResumenHato.CONTADORES}
+            for fila in ResumenHato.objects.all()
+        }
+
+    def test_incremental_coincide_con_reconstruccion(self):
+        vacas = [
+            Animal.objects.create(numero_arete=f'R00{i}', sexo='F', finca=self.norte) for i in range(4)
+        ]
+        toro = Animal.objects.create(numero_arete='R100', sexo='M', finca=self.sur)
+        Parto.objects.create(fecha_nacimiento=date(2025, 1, 5), madre=vacas[0], finca=self.norte, sexo='F')
+        EventoSanitario.objects.create(fecha=date(2025, 2, 1), diagnostico='x', tratamiento='y',
+                                       responsable='z', animal=vacas[1])
+        inseminacion = Inseminacion.objects.create(fecha=date(2025, 2, 2), tipo_semen='s', inseminador='i',
+                                                   animal=vacas[1], responsable=self.user)
+        Inseminacion.objects.create(fecha=date(2025, 2, 3), tipo_semen='s', inseminador='i',
+                                    animal=vacas[2], responsable=self.user)
+        ConfirmacionGestacion.objects.create(fecha_confirmacion=date(2025, 3, 1), metodo_diagnostico='eco',
+                                             resultado='gestante', responsable='z', inseminacion=inseminacion)
+        EventoSalida.objects.create(fecha=date(2025, 3, 2), tipo_evento='venta', animal=toro)
+        ProduccionService.importar_lote([
+            (1, {'arete': 'R000', 'fecha': '2025-03-01', 'turno': 'AM', 'kg': 10}),
+            (2, {'arete': 'R000', 'fecha': '2025-03-01', 'turno': 'PM', 'kg': 8}),
+        ])
+        ProduccionService.registrar_turno(vacas[0], date(2025, 3, 1), 'AM', 12)
+        AnimalService.trasladar_animales(['R001', 'R002'], self.sur)
+        vacas[3].finca = self.sur
+        vacas[3].save()
+        vacas[3].delete()
+
+        incremental = self._contadores()
+        ResumenService.reconstruir()
+        self.assertEqual(incremental, self._contadores())
+
+        sur = incremental[self.sur.id]
+        self.assertEqual(sur['eventos_sanitarios'], 1)
+        self.assertEqual(sur['inseminaciones_pendientes'], 1)
+        self.assertEqual(sur['gestantes'], 1)
+
+    def test_tablero_lee_solo_el_resumen(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            Animal.objects.create(numero_arete='R200', sexo='F', finca=self.norte)
+        self.client.force_login(self.user)
+
+        # usuario (con su rol), sello de versiones, el resumen y el rollup de producción;
+        # la sesión sale de la caché
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('dashboard'))
+
+        self.assertEqual(response.context['tablero']['total_animales'], 1)
+        self.assertEqual(response.context['tablero']['total_fincas'], 2)
+
+        # Fragmento vigente: solo usuario y sello.
+        with self.assertNumQueries(2):
+            self.assertContains(self.client.get(reverse('dashboard')), 'Total de Animales')
 
-# Create your tests here.
+        with self.captureOnCommitCallbacks(execute=True):
+            Animal.objects.create(numero_arete='R201', sexo='F', finca=self.sur)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['tablero']['total_animales'], 2)
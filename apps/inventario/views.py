@@ -1,82 +1,91 @@
+from collections import defaultdict
+from datetime import timedelta
+
 from django.shortcuts import render
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from django.views import View
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
-from django.db.models import Count, Avg, F, Q, Sum, ExpressionWrapper, FloatField
 
-from apps.ganaderia.models import Animal, EventoSalida, Parto, ProduccionLeche, Traslado
-from apps.salud.models import EventoSanitario, Inseminacion, ConfirmacionGestacion
 from apps.finca.models import Finca
+from apps.ganaderia.models import (
+    Animal, EventoSalida, Parto, ProduccionDiariaFinca, ProduccionLeche, Traslado, VersionDatos,
+)
+from apps.salud.models import ConfirmacionGestacion, EventoSanitario, Inseminacion
+from .models import ResumenHato
 
-@method_decorator(login_required, name='dispatch')
-class DashboardView(View):
+DIAS_PRODUCCION = 30
 
-    def get(self, request):
+# Todo lo que alimenta el resumen y el rollup: el fragmento del tablero
+# se guarda con el sello de estos modelos (ver VersionDatos.sello).
+MODELOS_TABLERO = (
+    ResumenHato, ProduccionDiariaFinca, ProduccionLeche, Finca, Animal, Parto, Traslado,
+    EventoSalida, EventoSanitario, Inseminacion, ConfirmacionGestacion,
+)
 
-        ventas = EventoSalida.objects.filter(tipo_evento="venta").count()
-        muertes = EventoSalida.objects.filter(tipo_evento="muerte").count()
-        descartes = EventoSalida.objects.filter(tipo_evento="descarte").count()
-        traslados = Traslado.objects.count()
-        gestantes = ConfirmacionGestacion.objects.filter(resultado="gestante").count()
-        vacas_produccion = Animal.objects.filter(estado="activo", sexo="F").count()
-        ganado_por_finca = (
-            Animal.objects.values("finca__nombre")
-            .annotate(total=Count("id"))
-            .order_by("finca__nombre")
-        )
-
-        total_fincas = Finca.objects.count()
-        total_partos = Parto.objects.count()
 
-        produccion_por_finca = (
-            ProduccionLeche.objects.values(nombre=F("finca__nombre"))
-            .annotate(
-                promedio=Avg(
-                    ExpressionWrapper(
-                        (F("peso_am") + F("peso_pm")),
-                        output_field=FloatField()
-                    )
-                )
-            )
-        )
-
-        total_animales = Animal.objects.filter(
-            Q(estado="activo") | Q(estado="trasladado") | Q(estado="gestante")
-        ).count()
+@method_decorator(login_required, name='dispatch')
+class DashboardView(View):
 
-        produccion_diaria = ProduccionLeche.objects.aggregate(
-            total=Sum(F("peso_am") + F("peso_pm"))
-        )["total"] or 0
+    def get(self, request):
+        # Los datos se leen solo si el fragmento en caché del tablero no está vigente.
+        return render(request, "dashboard.html", {
+            "version": VersionDatos.objects.sello(*MODELOS_TABLERO),
+            "hoy": timezone.localdate(),
+            "tablero": SimpleLazyObject(self.datos),
+        })
 
-        eventos_salud_total = EventoSanitario.objects.count()
+    @staticmethod
+    def datos():
+        # Una sola lectura: la fila global y una por finca (ver ResumenHato).
+        resumen = ResumenHato(finca=None)
+        por_finca = []
+        for fila in ResumenHato.objects.select_related("finca").order_by("finca__nombre"):
+            if fila.finca_id is None:
+                resumen = fila
+            else:
+                por_finca.append(fila)
 
-        eventos_salud_por_finca = (
-            EventoSanitario.objects
-            .values("animal__finca__nombre")
-            .annotate(total=Count("id"))
+        # Producción: rollup por (finca, día), DIAS_PRODUCCION filas por finca como máximo.
+        desde = timezone.localdate() - timedelta(days=DIAS_PRODUCCION - 1)
+        dias = list(
+            ProduccionDiariaFinca.objects.filter(fecha__gte=desde)
+            .values_list("finca_id", "fecha", "litros", "vacas")
         )
+        ultimo_dia = max((fecha for _, fecha, _, _ in dias), default=None)
+        litros_finca, vacas_finca = defaultdict(float), defaultdict(int)
+        for finca_id, _, litros, vacas in dias:
+            litros_finca[finca_id] += litros
+            vacas_finca[finca_id] += vacas
 
-        total_inseminaciones = Inseminacion.objects.count()
-        pendientes_confirmar = Inseminacion.objects.filter(confirmaciongestacion__isnull=True).count()
-
-        context = {
-            "ventas": ventas,
-            "muertes": muertes,
-            "descarte": descartes,
-            "descartes": descartes,
-            "traslados": traslados,
-            "gestantes": gestantes,
-            "vacas_produccion": vacas_produccion,
-            "ganado_por_finca": ganado_por_finca,
-            "total_animales": total_animales,
-            "total_fincas": total_fincas,
-            "total_partos": total_partos,
-            "produccion_por_finca": produccion_por_finca,
-            "produccion_diaria": produccion_diaria,
-            "eventos_salud_total": eventos_salud_total,
-            "eventos_salud_por_finca": eventos_salud_por_finca,
-            "total_inseminaciones": total_inseminaciones,
-            "pendientes_confirmar": pendientes_confirmar,
+        return {
+            "ventas": resumen.ventas,
+            "muertes": resumen.muertes,
+            "descarte": resumen.descartes,
+            "descartes": resumen.descartes,
+            "traslados": resumen.traslados,
+            "gestantes": resumen.gestantes,
+            "vacas_produccion": resumen.vacas_produccion,
+            "ganado_por_finca": [
+                {"finca__nombre": f.finca.nombre, "total": f.animales}
+                for f in por_finca if f.animales
+            ],
+            "total_animales": resumen.animales_activos,
+            "total_fincas": len(por_finca),
+            "total_partos": resumen.partos,
+            # Promedio por vaca y día en la ventana.
+            "produccion_por_finca": [
+                {"nombre": f.finca.nombre, "promedio": litros_finca[f.finca_id] / vacas_finca[f.finca_id]}
+                for f in por_finca if vacas_finca[f.finca_id]
+            ],
+            # Total del último día con ordeño registrado.
+            "produccion_diaria": sum(litros for _, fecha, litros, _ in dias if fecha == ultimo_dia),
+            "eventos_salud_total": resumen.eventos_sanitarios,
+            "eventos_salud_por_finca": [
+                {"animal__finca__nombre": f.finca.nombre, "total": f.eventos_sanitarios}
+                for f in por_finca if f.eventos_sanitarios
+            ],
+            "total_inseminaciones": resumen.inseminaciones,
+            "pendientes_confirmar": resumen.inseminaciones_pendientes,
         }
-
-        return render(request, "dashboard.html", context)
\ No newline at end of file
@@ -4,3 +4,5 @@ class SaludConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.salud'
 
+    def ready(self):
+        import apps.salud.signals
@@ -0,0 +1,51 @@
+from apps.ganaderia.exports import CHUNK_SIZE
+
+ENCABEZADOS_EVENTOS = ["Fecha", "Arete", "Animal", "Diagnóstico", "Tratamiento", "Responsable", "Sintomas"]
+
+
+def filas_eventos_sanitarios(queryset):
+    datos = queryset.values_list(
+        "fecha", "animal__numero_arete", "animal__nombre",
+        "diagnostico", "tratamiento", "responsable", "sintomas",
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+    for fecha, arete, nombre, diagnostico, tratamiento, responsable, sintomas in datos:
+        yield [fecha, arete, nombre, diagnostico, tratamiento, responsable, sintomas or ""]
+
+
+COLUMNAS_EVENTOS_SANITARIOS = [
+    ("id", "id"),
+    ("fecha", "fecha"),
+    ("animal_id", "animal_id"),
+    ("arete", "animal__numero_arete"),
+    ("nombre", "animal__nombre"),
+    ("diagnostico", "diagnostico"),
+    ("tratamiento", "tratamiento"),
+    ("sintomas", "sintomas"),
+    ("responsable", "responsable"),
+]
+
+COLUMNAS_INSEMINACIONES = [
+    ("id", "id"),
+    ("fecha", "fecha"),
+    ("animal_id", "animal_id"),
+    ("arete", "animal__numero_arete"),
+    ("nombre", "animal__nombre"),
+    ("tipo_semen", "tipo_semen"),
+    ("inseminador", "inseminador"),
+    ("responsable_id", "responsable_id"),
+]
+
+COLUMNAS_CONFIRMACIONES = [
+    ("id", "id"),
+    ("fecha_confirmacion", "fecha_confirmacion"),
+    ("inseminacion_id", "inseminacion_id"),
+    ("fecha_inseminacion", "inseminacion__fecha"),
+    ("animal_id", "inseminacion__animal_id"),
+    ("arete", "inseminacion__animal__numero_arete"),
+    ("finca_id", "inseminacion__animal__finca_id"),
+    ("metodo_diagnostico", "metodo_diagnostico"),
+    ("resultado", "resultado"),
+    ("responsable", "responsable"),
+    ("observaciones", "observaciones"),
+]
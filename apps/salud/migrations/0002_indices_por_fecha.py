@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ganaderia', '0009_indices_por_fecha'),
+        ('salud', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='confirmaciongestacion',
+            index=models.Index(fields=['fecha_confirmacion', 'id'], name='confirmacion_fecha_id'),
+        ),
+        migrations.AddIndex(
+            model_name='eventosanitario',
+            index=models.Index(fields=['fecha', 'id'], name='evento_sanitario_fecha_id'),
+        ),
+        migrations.AddIndex(
+            model_name='eventosanitario',
+            index=models.Index(fields=['animal', 'fecha'], name='evento_sanitario_animal_fecha'),
+        ),
+        migrations.AddIndex(
+            model_name='inseminacion',
+            index=models.Index(fields=['fecha', 'id'], name='inseminacion_fecha_id'),
+        ),
+        migrations.AddIndex(
+            model_name='inseminacion',
+            index=models.Index(fields=['animal', 'fecha'], name='inseminacion_animal_fecha'),
+        ),
+    ]
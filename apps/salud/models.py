@@ -15,6 +15,10 @@ class EventoSanitario(models.Model):
 
     class Meta:
         ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['fecha', 'id'], name='evento_sanitario_fecha_id'),
+            models.Index(fields=['animal', 'fecha'], name='evento_sanitario_animal_fecha'),
+        ]
 
     def __str__(self):
         return f"{self.animal.numero_arete} - {self.fecha}"
@@ -27,6 +31,12 @@ class Inseminacion(models.Model):
     animal = models.ForeignKey(Animal, on_delete=models.CASCADE)
     responsable = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha', 'id'], name='inseminacion_fecha_id'),
+            models.Index(fields=['animal', 'fecha'], name='inseminacion_animal_fecha'),
+        ]
+
     def __str__(self):
         return f"Servicio {self.animal.numero_arete} - {self.fecha}"
 
@@ -46,5 +56,11 @@ class ConfirmacionGestacion(models.Model):
 
     inseminacion = models.OneToOneField(Inseminacion, on_delete=models.CASCADE)
 
+    class Meta:
+        # Sin animal ni finca propios: se llega por la inseminación (índice único).
+        indexes = [
+            models.Index(fields=['fecha_confirmacion', 'id'], name='confirmacion_fecha_id'),
+        ]
+
     def __str__(self):
         return f"Confirmación {self.inseminacion.animal.numero_arete}"
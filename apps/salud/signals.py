@@ -0,0 +1,47 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.ganaderia.cache import invalidar_perfiles
+from apps.ganaderia import ultimos
+from apps.ganaderia.models import VersionDatos
+from .models import EventoSanitario, Inseminacion, ConfirmacionGestacion
+
+
+@receiver(post_save, sender=EventoSanitario)
+@receiver(post_delete, sender=EventoSanitario)
+@receiver(post_save, sender=Inseminacion)
+@receiver(post_delete, sender=Inseminacion)
+@receiver(post_save, sender=ConfirmacionGestacion)
+@receiver(post_delete, sender=ConfirmacionGestacion)
+def incrementar_version_datos(sender, **kwargs):
+    VersionDatos.objects.incrementar_al_confirmar(sender)
+
+
+@receiver(post_save, sender=EventoSanitario)
+@receiver(post_delete, sender=EventoSanitario)
+@receiver(post_save, sender=Inseminacion)
+@receiver(post_delete, sender=Inseminacion)
+def invalidar_perfil_animal(sender, instance, **kwargs):
+    invalidar_perfiles(instance.animal_id)
+
+
+@receiver(post_save, sender=ConfirmacionGestacion)
+@receiver(post_delete, sender=ConfirmacionGestacion)
+def invalidar_perfil_confirmacion(sender, instance, **kwargs):
+    animal_id = (
+        Inseminacion.objects.filter(pk=instance.inseminacion_id)
+        .values_list('animal_id', flat=True).first()
+    )
+    invalidar_perfiles(animal_id)
+
+
+@receiver(post_save, sender=EventoSanitario)
+def actualizar_ultimo_evento(sender, instance, created, **kwargs):
+    if created:
+        ultimos.avanzar('sanidad', instance)
+    else:
+        ultimos.recalcular('sanidad', [instance.animal_id])
+
+
+@receiver(post_delete, sender=EventoSanitario)
+def retroceder_ultimo_evento(sender, instance, **kwargs):
+    ultimos.recalcular('sanidad', [instance.animal_id])
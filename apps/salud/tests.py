@@ -1,3 +1,36 @@
+import json
+from datetime import date
+
 from django.test import TestCase
+from django.urls import reverse
+
+from apps.finca.models import Finca
+from apps.ganaderia.models import Animal
+from apps.users.models import User, Rol
+from .models import Inseminacion, ConfirmacionGestacion
+
+
+class HistorialGestacionTestCase(TestCase):
+    def setUp(self):
+        finca = Finca.objects.create(nombre="Finca Salud", codigo="SAL01")
+        rol = Rol.objects.create(nombre_rol="Gerente")
+        self.user = User.objects.create_user(cedula='300', email='salud@test.com', password='pass', rol=rol)
+        self.client.force_login(self.user)
+        animal = Animal.objects.create(numero_arete='S001', nombre='Mora', sexo='F', finca=finca)
+        for dia, resultado in [(1, 'gestante'), (2, 'negativa')]:
+            inseminacion = Inseminacion.objects.create(
+                fecha=date(2025, 1, dia), tipo_semen='Holstein', inseminador='Pedro',
+                animal=animal, responsable=self.user,
+            )
+            ConfirmacionGestacion.objects.create(
+                inseminacion=inseminacion, fecha_confirmacion=date(2025, 3, dia),
+                metodo_diagnostico='palpación', resultado=resultado, responsable='Pedro',
+            )
+
+    def test_historial_ndjson_filtrado(self):
+        response = self.client.get(reverse('salud:gestacion_historial'), {'format': 'ndjson', 'estado': 'gestante'})
+        registros = [json.loads(l) for l in b''.join(response.streaming_content).decode().splitlines()]
 
-# Create your tests here.
+        self.assertEqual(len(registros), 1)
+        self.assertEqual(registros[0]['arete'], 'S001')
+        self.assertEqual(registros[0]['fecha_inseminacion'], '2025-01-01')
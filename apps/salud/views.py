@@ -1,26 +1,41 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from apps.users.decorators import role_required
 from .models import EventoSanitario, Inseminacion, ConfirmacionGestacion
 from .forms import EventoSanitarioForm, InseminacionForm, ConfirmacionGestacionForm
-from apps.ganaderia.models import Animal
+from apps.ganaderia.models import Animal, VersionDatos
 from apps.ganaderia.services import AnimalService
-import openpyxl
-from datetime import date
+from apps.ganaderia.exports import datos_response
+from apps.ganaderia.paginacion import paginar
+from apps.ganaderia.periodos import filtrar_periodo
+from apps.exportaciones.views import exportar
+from .exports import COLUMNAS_EVENTOS_SANITARIOS, COLUMNAS_INSEMINACIONES, COLUMNAS_CONFIRMACIONES
 from .services import EventoSanitarioService, InseminacionService, GestacionService
 
+# Sello de las tablas en caché de los listados (ver VersionDatos.sello).
+MODELOS_EVENTOS = (EventoSanitario, Animal)
+# El nombre del responsable (User) no lleva sello: un cambio se ve al vencer el fragmento.
+MODELOS_INSEMINACIONES = (Inseminacion, Animal)
+MODELOS_CONFIRMACIONES = (ConfirmacionGestacion, Inseminacion, Animal)
 
+
+@login_required
 def evento_sanitario_list(request):
-    mes = request.GET.get("mes")
-    eventos = EventoSanitario.objects.all()
+    eventos, periodo = filtrar_periodo(EventoSanitario.objects.all(), request.GET)
 
-    if mes:
-        eventos = eventos.filter(fecha__month=mes)
+    respuesta = datos_response(request, "eventos_sanitarios", eventos, COLUMNAS_EVENTOS_SANITARIOS)
+    if respuesta:
+        return respuesta
 
     return render(request, "salud/evento_sanitario_list.html", {
-        "eventos": eventos
+        "eventos": SimpleLazyObject(lambda: paginar(request, eventos.select_related("animal"), ("-fecha", "-id"))),
+        "version": VersionDatos.objects.sello(*MODELOS_EVENTOS),
+        "hoy": timezone.localdate(),
+        "periodo": periodo,
     })
 
 
@@ -48,54 +63,27 @@ def evento_sanitario_create(request):
 
     return render(request, "salud/evento_sanitario_form.html", {"form": form})
 
-def buscar_animal(request):
+async def buscar_animal(request):
     arete = request.GET.get("arete") or request.GET.get("numero_arete")
 
-    try:
-        animal = AnimalService.get_by_arete(arete)
-        edad = (date.today() - animal.fecha_nacimiento).days
-        
-        return JsonResponse({
-            "id": animal.id,
-            "nombre": animal.nombre,
-            "edad": edad,
-            "estado": animal.estado
-        })
-    except Exception:
+    animal = await AnimalService.aget_by_arete(arete)
+    if animal is None:
         return JsonResponse({"error": "No encontrado"}, status=404)
 
+    return JsonResponse({
+        "id": animal.id,
+        "nombre": animal.nombre,
+        "edad": animal.edad_dias,
+        "estado": animal.estado
+    })
+
 
 
+@login_required
 def export_eventos_excel(request):
-    mes = request.GET.get("mes")
-
-    eventos = EventoSanitario.objects.all()
-    if mes:
-        eventos = eventos.filter(fecha__month=mes)
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Eventos Sanitarios"
-
-    ws.append(["Fecha", "Arete", "Animal", "Diagnóstico", "Tratamiento", "Responsable", "Sintomas"])
-
-    for e in eventos:
-        ws.append([
-            e.fecha,
-            e.animal.numero_arete,
-            e.animal.nombre,
-            e.diagnostico,
-            e.tratamiento,
-            e.responsable,
-            e.sintomas or "",
-        ])
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = "attachment; filename=eventos_sanitarios.xlsx"
-    wb.save(response)
-    return response
+    return exportar(request, "eventos_sanitarios")
+
+
 @login_required
 @role_required("Gerente", "Auxiliar administrativa", "Administrador Finca")
 def evento_sanitario_edit(request, pk):
@@ -165,8 +153,16 @@ def inseminacion_create(request):
 
 @login_required
 def inseminacion_list(request):
-    registros = Inseminacion.objects.select_related("responsable").order_by('-fecha')
-    return render(request, "salud/inseminacion_list.html", {"registros": registros})
+    registros = Inseminacion.objects.select_related("animal", "responsable").order_by('-fecha', '-id')
+
+    respuesta = datos_response(request, "inseminaciones", registros, COLUMNAS_INSEMINACIONES)
+    if respuesta:
+        return respuesta
+
+    return render(request, "salud/inseminacion_list.html", {
+        "registros": SimpleLazyObject(lambda: paginar(request, registros, ("-fecha", "-id"))),
+        "version": VersionDatos.objects.sello(*MODELOS_INSEMINACIONES),
+    })
 
 @login_required
 @role_required("Gerente", "Administrador finca")
@@ -238,17 +234,11 @@ def confirmar_gestacion(request, id_inseminacion):
 @role_required("Gerente", "Administrador finca")
 def gestacion_historial(request):
 
-    historial = ConfirmacionGestacion.objects.all()
-    mes = request.GET.get("mes", "")
+    historial, periodo = filtrar_periodo(
+        ConfirmacionGestacion.objects.all(), request.GET, campo="fecha_confirmacion"
+    )
     estado = request.GET.get("estado", "")
     finca = request.GET.get("finca", "")
-    
-    if mes and mes.strip():
-        try:
-            mes_int = int(mes)
-            historial = historial.filter(fecha_confirmacion__month=mes_int)
-        except ValueError:
-            mes = "" 
 
     if estado and estado.strip():
         historial = historial.filter(resultado=estado)
@@ -258,11 +248,17 @@ def gestacion_historial(request):
 
     historial = historial.select_related(
         'inseminacion__animal'
-    ).order_by('-fecha_confirmacion')
+    ).order_by('-fecha_confirmacion', '-id')
+
+    respuesta = datos_response(request, "confirmaciones_gestacion", historial, COLUMNAS_CONFIRMACIONES)
+    if respuesta:
+        return respuesta
 
     return render(request, "salud/historial_confirmaciones.html", {
-        "historial": historial,
-        "mes_seleccionado": mes,
+        "historial": SimpleLazyObject(lambda: paginar(request, historial, ('-fecha_confirmacion', '-id'))),
+        "version": VersionDatos.objects.sello(*MODELOS_CONFIRMACIONES),
+        "hoy": timezone.localdate(),
+        "periodo": periodo,
         "estado_seleccionado": estado,
         "finca_seleccionada": finca,
     })
\ No newline at end of file
@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class UsuarioConRolBackend(ModelBackend):
+    """
+    ModelBackend que carga el usuario de la sesión con su rol y empresa en
+    una sola consulta; role_required, base.html y User.__str__ ya no piden
+    el Rol aparte.
+    """
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related('rol', 'empresa').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
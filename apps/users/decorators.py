@@ -8,6 +8,8 @@ def role_required(*roles_permitidos):
     Uso:
         @role_required("Gerente", "Administrador Finca", )
     """
+    permitidos = frozenset(roles_permitidos)
+
     def decorator(view_func):
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
@@ -16,13 +18,14 @@ def role_required(*roles_permitidos):
                 messages.error(request, "Debes iniciar sesión.")
                 return redirect('users:login')
 
+            # El rol llega con el usuario (UsuarioConRolBackend), sin consulta aparte.
             if not hasattr(request.user, 'rol') or not request.user.rol:
                 messages.error(request, "Tu usuario no tiene un rol asignado.")
                 return redirect('users:dashboard')
 
             rol_usuario = request.user.rol.nombre_rol
 
-            if rol_usuario not in roles_permitidos:
+            if rol_usuario not in permitidos:
                 messages.error(request, "No tienes permisos para acceder a esta sección.")
                 return redirect('users:dashboard')
 
@@ -5,3 +5,70 @@ class SimpleUserTests(TestCase):
     def test_login_page_status(self):
         response = self.client.get(reverse('users:login'))
         self.assertEqual(response.status_code, 200)
+
+
+class RolSesionTests(TestCase):
+    def setUp(self):
+        from .models import Rol, User
+        self.gerente = Rol.objects.create(nombre_rol="Gerente")
+        self.auxiliar = Rol.objects.create(nombre_rol="Auxiliar")
+        self.user = User.objects.create_user(cedula="900", email="rol@test.com", password="x", rol=self.gerente)
+        self.client.force_login(self.user)
+
+    def test_peticion_autorizada_no_consulta_rol(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.client.get(reverse('users:users_list'))
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('users:users_list'))
+        self.assertEqual(response.status_code, 200)
+        # El rol llega en el JOIN de la carga del usuario, nunca en una consulta propia.
+        self.assertFalse([c for c in consultas if c['sql'].startswith('SELECT "users_rol"')])
+
+    def test_cambio_y_renombre_de_rol(self):
+        # El nombre se compara exacto y se lee en cada petición.
+        self.gerente.nombre_rol = "GERENTE"
+        self.gerente.save()
+        self.assertEqual(self.client.get(reverse('users:users_list')).status_code, 302)
+
+        self.gerente.nombre_rol = "Gerente"
+        self.gerente.save()
+        self.assertEqual(self.client.get(reverse('users:users_list')).status_code, 200)
+
+        self.user.rol = self.auxiliar
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('users:users_list')).status_code, 302)
+
+
+class SesionSinEscriturasTests(TestCase):
+    def setUp(self):
+        from .models import Rol, User
+        rol = Rol.objects.create(nombre_rol="Gerente")
+        self.user = User.objects.create_user(cedula="901", email="ses@test.com", password="x", rol=rol)
+        self.client.force_login(self.user)
+
+    def test_consultas_no_tocan_la_tabla_de_sesiones(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('users:users_list'))
+        self.assertEqual(response.status_code, 200)
+        # cached_db: la sesión sale de la caché y una página de consulta no la guarda.
+        self.assertFalse([c for c in consultas if 'django_session' in c['sql']])
+        self.assertNotIn('sessionid', response.cookies)
+
+    def test_sesion_con_model_backend_sigue_valida(self):
+        from django.contrib.auth import BACKEND_SESSION_KEY
+
+        self.client.force_login(self.user, backend="django.contrib.auth.backends.ModelBackend")
+        self.assertEqual(self.client.session[BACKEND_SESSION_KEY], "django.contrib.auth.backends.ModelBackend")
+        self.assertEqual(self.client.get(reverse('users:users_list')).status_code, 200)
+
+    def test_mensajes_viajan_en_cookie(self):
+        from django.contrib.messages import get_messages
+
+        response = self.client.get(reverse('users:logout'))
+        self.assertIn('messages', response.cookies)
+        self.assertEqual([str(m) for m in get_messages(response.wsgi_request)], ["Sesión cerrada correctamente."])
@@ -0,0 +1,9 @@
+# conftest.py
+import pytest
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _silenciar_log_sql():
+    from agrotiquiza.pruebas import silenciar_log_sql
+
+    silenciar_log_sql()